@@ -0,0 +1,3 @@
+"""
+benchmarks of the validation stages against synthetic IMAGE submissions, run with python -m benchmarks.run
+"""
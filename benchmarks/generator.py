@@ -0,0 +1,296 @@
+"""
+generate synthetic IMAGE submissions of any size which follow the IMAGE ruleset,
+with pedigrees, specimens derived from the animals and a configurable rate of records with errors
+together with the local ontology index answering for every term they use, so that no OLS is needed
+"""
+import json
+import random
+from typing import Dict, Iterator, List, Tuple
+
+from image_validation import misc
+from image_validation import ontology_index
+
+# species: label, taxon id, breed root term and label, breeds as (label, term)
+SPECIES = [
+    ('Sus scrofa', 9823, 'LBO_0000003', 'pig breed',
+     [('Cinta Senese', 'LBO_0000347'), ('Large White', 'LBO_0000358')]),
+    ('Bos taurus', 9913, 'LBO_0000001', 'cattle breed', [('Holstein', 'LBO_0000156'), ('Charolais', 'LBO_0000094')]),
+    ('Ovis aries', 9940, 'LBO_0000004', 'sheep breed', [('Merino', 'LBO_0000572'), ('Texel', 'LBO_0000681')]),
+    ('Capra hircus', 9925, 'LBO_0000954', 'goat breed', [('Saanen', 'LBO_0001001'), ('Alpine', 'LBO_0000955')])
+]
+MALE = ('male', 'PATO_0000384')
+FEMALE = ('female', 'PATO_0000383')
+UNKNOWN_SEX = ('record of unknown sex', 'OBI_0000858')
+ORGANISM = ('organism', 'OBI_0100026')
+SPECIMEN = ('specimen from organism', 'OBI_0001479')
+SUBMITTER = ('submitter', 'EFO_0001741')
+SEMEN = ('semen', 'UBERON_0001968')
+ORGANISM_PARTS = [('blood', 'UBERON_0000178'), ('liver', 'UBERON_0002107'),
+                  ('skeletal muscle tissue', 'UBERON_0001134')]
+ADULT = ('adult', 'EFO_0001272')
+# the labels of the root terms the ruleset allows the descendants of
+ROOT_LABELS = {
+    'EFO_0002012': 'role',
+    'NCBITaxon_1': 'root',
+    'LBO_0000000': 'breed',
+    'UBERON_0001062': 'anatomical entity',
+    'EFO_0000399': 'developmental stage',
+    'PATO_0000261': 'maturity'
+}
+# the terms used by the records, under the root terms they need to be descendants of
+DATA_TERMS = [SUBMITTER + ('EFO_0002012',), ADULT + ('EFO_0000399',), SEMEN + ('UBERON_0001062',)] + \
+    [part + ('UBERON_0001062',) for part in ORGANISM_PARTS]
+COUNTRIES = [('Italy', 'NCIT_C16761'), ('France', 'NCIT_C16592'), ('Spain', 'NCIT_C17152'),
+             ('United Kingdom', 'NCIT_C17233'), ('Germany', 'NCIT_C16636')]
+STORAGES = ['frozen, liquid nitrogen', 'frozen, -80 degrees Celsius freezer', 'ambient temperature']
+# the kinds of errors introduced into the records
+ERRORS = ['project', 'date', 'units', 'missing field', 'term', 'relationship']
+
+
+def get_terms(label: str, short_term: str) -> List[Dict]:
+    """
+    Get the value of the terms keyword of an attribute
+    :param label: the label of the term
+    :param short_term: the short term
+    :return: the attribute value annotated with the term
+    """
+    return [{'value': label, 'terms': [{'url': misc.get_iri_from_short_term(short_term)}]}]
+
+
+def build_ontology_index(ruleset_file: str) -> ontology_index.OntologyIndex:
+    """
+    Build the ontology index answering for the terms of the ruleset and the terms used by the generated records
+    :param ruleset_file: the ruleset the records are generated for
+    :return: the index
+    """
+    index = ontology_index.OntologyIndex()
+    with open(ruleset_file) as infile:
+        ruleset = json.load(infile)
+    for rule_group in ruleset['rule_groups']:
+        for rule in rule_group['rules']:
+            for term in rule.get('Valid terms', []):
+                label = term.get('label', ROOT_LABELS.get(term['term'], term['term']))
+                index.add_term(term['term'], label, [], [], term['ontology_name'])
+    for label, short_term in [MALE, FEMALE, UNKNOWN_SEX]:
+        index.add_term(short_term, label, [], [], short_term.split('_')[0])
+    for label, short_term, parent in DATA_TERMS:
+        index.add_term(short_term, label, [], [parent], short_term.split('_')[0])
+    for species, taxon_id, breed_root, breed_root_label, breeds in SPECIES:
+        index.add_term(f"NCBITaxon_{taxon_id}", species, [], ['NCBITaxon_1'], 'NCBITaxon')
+        index.add_term(breed_root, breed_root_label, [], ['LBO_0000000'], 'LBO')
+        for breed, term in breeds:
+            index.add_term(term, breed, [], [breed_root], 'LBO')
+    return index
+
+
+class SubmissionGenerator:
+    """
+    Generate the records of a synthetic submission, deterministic for a given seed
+    About a third of the records are animals, some of them children of two earlier animals of the same species,
+    the others are specimens derived from one of the animals or from a record already in BioSamples
+    """
+    def __init__(self, size: int, error_rate: float = 0.0, seed: int = 0, pedigree_rate: float = 0.5,
+                 accession_rate: float = 0.05):
+        """
+        Constructor method
+        :param size: the number of records
+        :param error_rate: optional, the ratio of records with one error
+        :param seed: optional, the seed of the random generator
+        :param pedigree_rate: optional, the ratio of animals with parents in the submission
+        :param accession_rate: optional, the ratio of specimens derived from a BioSamples record
+        """
+        if type(size) is not int:
+            raise TypeError("The size parameter must be an integer")
+        if size < 0:
+            raise ValueError("The size parameter must not be negative")
+        for name, rate in [('error_rate', error_rate), ('pedigree_rate', pedigree_rate),
+                           ('accession_rate', accession_rate)]:
+            if not 0 <= rate <= 1:
+                raise ValueError(f"The {name} parameter must be between 0 and 1")
+        self.size = size
+        self.error_rate = error_rate
+        self.pedigree_rate = pedigree_rate
+        self.accession_rate = accession_rate
+        self.random = random.Random(seed)
+        # the recent animals by species and sex which can become parents or be sampled
+        self.animals: Dict[Tuple[int, str], List[Tuple[str, str]]] = {}
+        # the accessions referenced in relationships, answered by the stand-in BioSamples
+        self.accessions: List[str] = []
+
+    def __iter__(self) -> Iterator[Dict]:
+        """
+        Generate the records
+        :return: iterator of the records
+        """
+        for i in range(self.size):
+            # the first records are animals, so that specimens always have an animal to derive from
+            if i < 4 or self.random.random() < 0.35:
+                record = self.get_animal(i)
+            else:
+                record = self.get_specimen(i)
+            if self.random.random() < self.error_rate:
+                self.add_error(record)
+            yield record
+
+    def get_common_attributes(self, i: int, data_source_id: str, species: int) -> Dict[str, List[Dict]]:
+        """
+        Get the attributes shared by animals and specimens
+        :param i: the number of the record
+        :param data_source_id: the data source id of the record
+        :param species: the index of the species in SPECIES
+        :return: the attributes
+        """
+        country, country_term = COUNTRIES[i % len(COUNTRIES)]
+        species_label, taxon_id = SPECIES[species][:2]
+        return {
+            'Data source ID': [{'value': data_source_id}],
+            'Alternative id': [{'value': str(i)}],
+            'Project': [{'value': 'IMAGE'}],
+            'Submission title': [{'value': 'Synthetic benchmark submission'}],
+            'Person last name': [{'value': 'Smith'}],
+            'Person email': [{'value': 'mailto:smith@example.org'}],
+            'Person affiliation': [{'value': 'Example institute'}],
+            'Person role': get_terms(*SUBMITTER),
+            'Organization name': [{'value': 'Example institute'}],
+            'Organization role': get_terms(*SUBMITTER),
+            'Gene bank name': [{'value': 'Example gene bank'}],
+            'Gene bank country': get_terms(country, country_term),
+            'Data source type': [{'value': 'CryoWeb'}],
+            'Data source version': [{'value': 'version 1.0'}],
+            'Species': get_terms(species_label, f"NCBITaxon_{taxon_id}")
+        }
+
+    def get_animal(self, i: int) -> Dict:
+        """
+        Generate an animal, child of two earlier animals of the same species at the pedigree rate
+        :param i: the number of the record
+        :return: the record
+        """
+        species = self.random.randrange(len(SPECIES))
+        sex = self.random.choice([MALE, FEMALE, MALE, FEMALE, UNKNOWN_SEX])
+        data_source_id = f"ANIMAL:::ID:::{i}"
+        alias = f"animal_{i}"
+        attributes = self.get_common_attributes(i, data_source_id, species)
+        breed, breed_term = self.random.choice(SPECIES[species][4])
+        attributes.update({
+            'Material': get_terms(*ORGANISM),
+            'Supplied breed': [{'value': breed}],
+            'EFABIS Breed country': [{'value': COUNTRIES[i % len(COUNTRIES)][0]}],
+            'Mapped breed': get_terms(breed, breed_term),
+            'Sex': get_terms(*sex),
+            'Birth date': [{'value': f"{2000 + i % 19}-{1 + i % 12:02d}-{1 + i % 28:02d}", 'units': 'YYYY-MM-DD'}],
+            'Birth location accuracy': [{'value': 'missing geographic information'}]
+        })
+        relationships = []
+        fathers = self.animals.get((species, MALE[0]), [])
+        mothers = self.animals.get((species, FEMALE[0]), [])
+        if fathers and mothers and self.random.random() < self.pedigree_rate:
+            parents = [self.random.choice(fathers), self.random.choice(mothers)]
+            attributes['Child of'] = [{'value': parent_id} for _, parent_id in parents]
+            relationships = [{'alias': parent_alias, 'relationshipNature': 'child of'}
+                             for parent_alias, _ in parents]
+        # only the recent animals are kept, as in real submissions animals are grouped by herd
+        recent = self.animals.setdefault((species, sex[0]), [])
+        recent.append((alias, data_source_id))
+        if len(recent) > 20:
+            recent.pop(0)
+        return self.get_record(alias, data_source_id, SPECIES[species][1], attributes, relationships)
+
+    def get_specimen(self, i: int) -> Dict:
+        """
+        Generate a specimen derived from an earlier animal, or from a BioSamples record at the accession rate
+        :param i: the number of the record
+        :return: the record
+        """
+        data_source_id = f"SPECIMEN:::ID:::{i}"
+        key = self.random.choice(sorted(self.animals.keys()))
+        species = key[0]
+        attributes = self.get_common_attributes(i, data_source_id, species)
+        animal_alias, animal_id = self.random.choice(self.animals[key])
+        # semen is only taken from males
+        organism_part = SEMEN if key[1] == MALE[0] and self.random.random() < 0.5 \
+            else self.random.choice(ORGANISM_PARTS)
+        attributes.update({
+            'Material': get_terms(*SPECIMEN),
+            'Derived from': [{'value': animal_id}],
+            'Collection date': [{'value': f"{2010 + i % 9}-{1 + i % 12:02d}", 'units': 'YYYY-MM'}],
+            'Collection place accuracy': [{'value': 'country level'}],
+            'Collection place': [{'value': COUNTRIES[i % len(COUNTRIES)][0]}],
+            'Organism part': get_terms(*organism_part),
+            'Developmental stage': get_terms(*ADULT),
+            'Animal age at collection': [{'value': 1 + i % 10, 'units': 'years'}],
+            'Sample storage': [{'value': STORAGES[i % len(STORAGES)]}],
+            'Availability': [{'value': 'no longer available'}]
+        })
+        if self.random.random() < self.accession_rate:
+            accession = f"SAMEA{100000 + i}"
+            self.accessions.append(accession)
+            relationships = [{'accession': accession, 'relationshipNature': 'derived from'}]
+        else:
+            relationships = [{'alias': animal_alias, 'relationshipNature': 'derived from'}]
+        return self.get_record(f"specimen_{i}", data_source_id, SPECIES[species][1], attributes, relationships)
+
+    @staticmethod
+    def get_record(alias: str, data_source_id: str, taxon_id: int, attributes: Dict,
+                   relationships: List[Dict]) -> Dict:
+        """
+        Get the record in the USI format
+        :param alias: the alias of the record
+        :param data_source_id: the data source id used as title
+        :param taxon_id: the taxonomy id of the species
+        :param attributes: the attributes
+        :param relationships: the relationships
+        :return: the record
+        """
+        return {
+            'alias': alias,
+            'title': data_source_id,
+            'releaseDate': '2019-01-01',
+            'taxonId': taxon_id,
+            'attributes': attributes,
+            'sampleRelationships': relationships
+        }
+
+    def add_error(self, record: Dict) -> None:
+        """
+        Introduce one of the errors the validation is expected to report
+        :param record: the record to be changed
+        """
+        error = self.random.choice(ERRORS)
+        attributes = record['attributes']
+        if error == 'project':
+            attributes['Project'] = [{'value': 'OTHER'}]
+        elif error == 'date':
+            field = 'Birth date' if 'Birth date' in attributes else 'Collection date'
+            attributes[field] = [{'value': '2019-13-45', 'units': 'YYYY-MM-DD'}]
+        elif error == 'units':
+            field = 'Birth date' if 'Birth date' in attributes else 'Animal age at collection'
+            attributes[field][0]['units'] = 'decades'
+        elif error == 'missing field':
+            del attributes['Person last name']
+        elif error == 'term':
+            attributes['Species'] = get_terms(*MALE)
+        else:
+            # only one nature is allowed within a record
+            nature = 'child of' if 'Birth date' in attributes else 'derived from'
+            record['sampleRelationships'] = [{'alias': 'missing_animal', 'relationshipNature': nature}]
+
+
+def write_submission(filename: str, records: Iterator[Dict], section: str = 'sample') -> int:
+    """
+    Write the records into the JSON file one by one, so that submissions larger than the memory can be written
+    :param filename: the JSON file
+    :param records: the records
+    :param section: optional, the name of the section which contains the records
+    :return: the number of records written
+    """
+    count = 0
+    with open(filename, 'w') as outfile:
+        outfile.write(json.dumps({section: []})[:-2])
+        for record in records:
+            if count:
+                outfile.write(',')
+            outfile.write('\n' + json.dumps(record))
+            count += 1
+        outfile.write('\n]}\n')
+    return count
@@ -0,0 +1,228 @@
+"""
+run the validation stages against synthetic submissions of increasing sizes
+and report throughput, latency percentiles and peak memory as JSON, e.g.
+python -m benchmarks.run --sizes 100 1000 10000 --error-rate 0.05 --output benchmark.json
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, Iterable, List
+
+from image_validation import Submission, biosamples, http_client, stand_in_server, static_parameters
+from image_validation import use_ontology, validation
+from . import generator
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIZES = [100, 1000, 10000]
+STAGES = ['check_usi_structure', 'ruleset_validate', 'submission_validate']
+# the percentiles of the latencies reported by the stages timing every record
+PERCENTILES = [50, 90, 99]
+
+
+def get_peak_rss() -> int:
+    """
+    Get the peak resident memory of the process so far
+    :return: the peak resident memory in kilobytes
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # reported in bytes on macOS, kilobytes elsewhere
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def get_percentiles(latencies: List[float]) -> Dict[str, float]:
+    """
+    Get the latency percentiles using the nearest rank
+    :param latencies: the latencies in seconds
+    :return: the percentiles in milliseconds, with the maximum
+    """
+    if not latencies:
+        return {}
+    latencies = sorted(latencies)
+    result = {f"p{percentile}": latencies[max(0, -(-len(latencies) * percentile // 100) - 1)] * 1000
+              for percentile in PERCENTILES}
+    result['max'] = latencies[-1] * 1000
+    return result
+
+
+def measure(stage: str, size: int, run: Callable[[], Iterable[float]]) -> Dict:
+    """
+    Measure one stage
+    :param stage: the name of the stage
+    :param size: the number of records
+    :param run: the function running the stage, returning the latencies of the records if timed one by one
+    :return: the measurement
+    """
+    start = time.perf_counter()
+    latencies = list(run())
+    seconds = time.perf_counter() - start
+    result = {
+        'stage': stage,
+        'records': size,
+        'seconds': seconds,
+        'records_per_second': size / seconds if seconds else None,
+        'latency_ms': get_percentiles(latencies),
+        'peak_rss_kb': get_peak_rss()
+    }
+    logger.info(f"{stage} of {size} records: {seconds:.3f}s")
+    return result
+
+
+def use_stand_in_services(index, accessions: List[str]) -> None:
+    """
+    Answer the ontology and BioSamples lookups locally, so that the benchmark measures the validation only
+    :param index: the ontology index built for the generated records
+    :param accessions: the BioSamples accessions referenced by the generated records, all reported as existing
+    """
+    static_parameters.ontology_library = use_ontology.OntologyCache(index=index)
+    static_parameters.biosamples_library = biosamples.BioSamplesCache(memory_size=len(accessions) + 1)
+    for accession in accessions:
+        static_parameters.biosamples_library.statuses[accession] = 200
+
+
+def use_stand_in_server(server: stand_in_server.StandInServer, index, accessions: List[str]) -> None:
+    """
+    Answer the ontology and BioSamples lookups through the local stand-in server with empty caches,
+    so that the benchmark also measures the HTTP requests
+    :param server: the running stand-in server
+    :param index: the ontology index built for the generated records
+    :param accessions: the BioSamples accessions referenced by the generated records, all reported as existing
+    """
+    server.add_index(index)
+    server.accessions.update(accessions)
+    urls = server.get_urls()
+    use_ontology.OLS_URL = urls['IMAGE_VALIDATION_OLS_URL']
+    use_ontology.ZOOMA_URL = urls['IMAGE_VALIDATION_ZOOMA_URL']
+    biosamples.BIOSAMPLES_URL = urls['IMAGE_VALIDATION_BIOSAMPLES_URL']
+    static_parameters.ontology_library = use_ontology.OntologyCache()
+    static_parameters.biosamples_library = biosamples.BioSamplesCache()
+
+
+def run_size(size: int, stages: List[str], error_rate: float, seed: int, workers: int, workdir: str,
+             server: stand_in_server.StandInServer = None) -> List[Dict]:
+    """
+    Generate a submission and measure the stages against it
+    :param size: the number of records
+    :param stages: the stages to measure
+    :param error_rate: the ratio of records with an error
+    :param seed: the seed of the generator
+    :param workers: the number of processes of the submission validation
+    :param workdir: the folder where the submission is written
+    :param server: optional, the stand-in server answering the lookups, otherwise they are answered in process
+    :return: the measurements of the stages
+    """
+    filename = os.path.join(workdir, f"submission_{size}.json")
+    records = generator.SubmissionGenerator(size, error_rate=error_rate, seed=seed)
+    generator.write_submission(filename, records)
+    index = generator.build_ontology_index(static_parameters.ruleset_filename)
+    if server is None:
+        use_stand_in_services(index, records.accessions)
+    else:
+        use_stand_in_server(server, index, records.accessions)
+    http_client.stats.reset()
+    submission = Submission.Submission("benchmark")
+    submission.load_ruleset(static_parameters.ruleset_filename, snapshot_dir="")
+    results = []
+
+    def check_usi_structure():
+        validation.check_usi_records(submission.iter_records())
+        return []
+
+    def ruleset_validate():
+        for record in submission.iter_records():
+            start = time.perf_counter()
+            submission.ruleset.validate(record)
+            yield time.perf_counter() - start
+
+    def submission_validate():
+        load_result = submission.load_data(filename, section='sample', streaming=True)
+        if not submission.is_data_ready():
+            logger.error(f"The submission could not be loaded: {load_result.get_messages()[:5]}")
+        submission.validate(prefetch_workers=Submission.DEFAULT_PREFETCH_WORKERS, workers=workers)
+        return []
+
+    # the records are read from the file by every stage, as submissions may not fit in memory
+    submission.streaming = True
+    submission.data_file = filename
+    submission.data_section = 'sample'
+    for stage, run in [('check_usi_structure', check_usi_structure), ('ruleset_validate', ruleset_validate),
+                       ('submission_validate', submission_validate)]:
+        if stage in stages:
+            result = measure(stage, size, run)
+            result['error_rate'] = error_rate
+            results.append(result)
+    if 'submission_validate' in stages:
+        results[-1]['summary'] = validation.deal_with_validation_results(submission.get_validation_results())[0]
+        results[-1]['stats'] = submission.get_stats()
+    os.remove(filename)
+    return results
+
+
+def main(argv: List[str] = None) -> Dict:
+    """
+    Run the benchmarks
+    :param argv: optional, the command line arguments, default to the ones of the process
+    :return: the report
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the validation against synthetic IMAGE submissions")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="the numbers of records")
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=STAGES, help="the stages to measure")
+    parser.add_argument('--error-rate', type=float, default=0.05, help="the ratio of records with an error")
+    parser.add_argument('--seed', type=int, default=0, help="the seed of the generator")
+    parser.add_argument('--workers', type=int, default=1, help="the number of processes validating the records")
+    parser.add_argument('--output', default='', help="the JSON file of the report, default to the standard output")
+    parser.add_argument('--stand-in-server', action='store_true',
+                        help="answer the lookups through a local HTTP server, measuring the requests too")
+    parser.add_argument('--latency', type=float, default=0.0, help="the seconds the stand-in server waits to answer")
+    parser.add_argument('--verbose', action='store_true', help="log the progress of the validation")
+    args = parser.parse_args(argv)
+    package_logger = logging.getLogger('image_validation')
+    level = package_logger.level
+    if not args.verbose:
+        package_logger.setLevel(logging.WARNING)
+
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'ruleset': os.path.basename(static_parameters.ruleset_filename),
+        'seed': args.seed,
+        'workers': args.workers,
+        'stand_in_server': args.stand_in_server,
+        'latency': args.latency,
+        'results': []
+    }
+    ontology_library = static_parameters.ontology_library
+    biosamples_library = static_parameters.biosamples_library
+    urls = use_ontology.OLS_URL, use_ontology.ZOOMA_URL, biosamples.BIOSAMPLES_URL
+    server = None
+    if args.stand_in_server:
+        server = stand_in_server.StandInServer(latency=args.latency, seed=args.seed).start()
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            for size in args.sizes:
+                report['results'].extend(run_size(size, args.stages, args.error_rate, args.seed, args.workers,
+                                                  workdir, server))
+    finally:
+        if server is not None:
+            server.stop()
+        static_parameters.ontology_library = ontology_library
+        static_parameters.biosamples_library = biosamples_library
+        use_ontology.OLS_URL, use_ontology.ZOOMA_URL, biosamples.BIOSAMPLES_URL = urls
+        package_logger.setLevel(level)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as outfile:
+            outfile.write(output)
+    else:
+        print(output)
+    return report
+
+
+if __name__ == '__main__':
+    main()
@@ -8,22 +8,40 @@ the ruleset has four levels:
 """
 import logging
 import json
-from typing import List, Dict
+import time
+from typing import List, Dict, FrozenSet, Tuple
 
 from . import misc
+from . import cache_backends
 # from . import ValidationResult
 from image_validation.ValidationResult import ValidationResultColumn as VRC
 from image_validation.ValidationResult import ValidationResultRecord as VRR
 from image_validation.ValidationResult import ValidationResultConstant as VRConstants
 from . import static_parameters
+from . import instrumentation
 
 logger = logging.getLogger(__name__)
 
 
+def to_serializable(obj) -> Dict:
+    """
+    Represent the ruleset objects for json.dumps, leaving out the attributes beginning with _
+    which are derived from the others, but adding the properties listed in exported_properties
+    :param obj: the object to be represented
+    :return: the attributes of the object
+    """
+    result = {key: value for key, value in obj.__dict__.items() if not key.startswith('_')}
+    for name in getattr(obj, 'exported_properties', ()):
+        result[name] = getattr(obj, name)
+    return result
+
+
 class OntologyCondition:
     """
     the class represents conditions to be a valid ontology for the field with ontology_id type
     """
+    exported_properties = ('iri',)
+
     def __init__(self, term, include_descendant=False, only_leaf=False, include_self=True):
         """
         constructor method
@@ -44,8 +62,20 @@ class OntologyCondition:
         self.include_descendant = include_descendant
         self.only_leaf = only_leaf
         self.include_self = include_self
-        ontology = static_parameters.ontology_library.get_ontology(term)
-        self.iri = ontology.get_iri()
+        # retrieved from the ontology library only when needed, so that reading the ruleset needs no network
+        self._iri: str = None
+        self._iri_resolved = False
+
+    @property
+    def iri(self) -> str:
+        """
+        The iri of the term, retrieved on first use and then kept
+        :return: the iri, empty string if the term could not be found
+        """
+        if not self._iri_resolved:
+            self._iri = static_parameters.ontology_library.get_ontology(self.term).get_iri()
+            self._iri_resolved = True
+        return self._iri
 
     def __str__(self):
         """
@@ -92,6 +122,18 @@ class RuleField:
     allowed_required = ['mandatory', 'recommended', 'optional']
     allowed_multiple = ['yes', 'max 2', 'no']
     allowed_type = ['number', 'text', 'limited value', 'ontology_id', 'uri', 'doi', 'date']
+    # the method checking the value according to the field type
+    value_checkers = {
+        'number': 'check_number_value',
+        'text': 'check_text_value',
+        'limited value': 'check_text_value',
+        'ontology_id': 'check_ontology_id_value',
+        'uri': 'check_uri_value',
+        'doi': 'check_doi_value',
+        'date': 'check_date_value'
+    }
+    # the field types whose checks of a single value only depend on the value and its units, see validate_column
+    column_types = ['number', 'limited value', 'uri', 'doi', 'date']
 
     def __init__(self, name: str, field_type: str, required: str, multiple: str = 'no', description: str = ""):
         """
@@ -131,6 +173,16 @@ class RuleField:
         self.allowed_values: List[str] = []
         self.allowed_units: List[str] = []
         self.allowed_terms: List[OntologyCondition] = []
+        # the settings used by validate are resolved once here rather than for every entry of every record
+        # the names begin with _ so that they are not exported by to_json
+        self._mandatory: bool = required == 'mandatory'
+        self._allow_multiple: bool = self.allow_multiple()
+        self._max_two: bool = multiple == 'max 2'
+        self._check_value = getattr(self, RuleField.value_checkers[field_type])
+        # whether the ontology terms are allowed, the same terms are used by many records
+        self._decisions = cache_backends.LRUCache()
+        self.set_allowed_values([])
+        self.set_allowed_units([])
 
     def set_allowed_values(self, values: List[str]) -> None:
         """
@@ -140,6 +192,8 @@ class RuleField:
         self.allowed_values: List[str] = []
         for value in values:
             self.allowed_values.append(value)
+        self._allowed_values = frozenset(self.allowed_values)
+        self._allowed_values_str = '>, <'.join(self.allowed_values)
 
     def set_allowed_units(self, units: List[str]) -> None:
         """
@@ -149,6 +203,8 @@ class RuleField:
         self.allowed_units: List[str] = []
         for unit in units:
             self.allowed_units.append(unit)
+        self._allowed_units = frozenset(self.allowed_units)
+        self._allowed_units_str = ', '.join(self.allowed_units)
 
     def set_allowed_terms(self, terms: List[Dict[str, str]]) -> None:
         """
@@ -168,6 +224,7 @@ class RuleField:
                 descendant = True
             condition = OntologyCondition(term['term'], descendant, leaf, root)
             self.allowed_terms.append(condition)
+        self._decisions.clear()
 
     def get_allowed_values(self) -> List[str]:
         """
@@ -236,10 +293,18 @@ class RuleField:
         """
         if type(short_term) is not str:
             raise TypeError("The short_term parameter must be a string")
-        for allowed in self.allowed_terms:
-            if allowed.is_allowed(short_term):
-                return True
-        return False
+        decision = self._decisions.get(short_term)
+        if decision is None:
+            decision = any(allowed.is_allowed(short_term) for allowed in self.allowed_terms)
+            self._decisions.set(short_term, decision)
+        return decision
+
+    def get_decision_stats(self) -> Dict[str, int]:
+        """
+        Get how often check_ontology_allowed has been answered from the decisions already made for the field
+        :return: the numbers of hits, misses and stored decisions
+        """
+        return self._decisions.get_stats()
 
     def validate(self, entries, section_name: str, record_id: str):
         """
@@ -251,154 +316,91 @@ class RuleField:
         """
         results: List[VRC] = []
         section_info: str = " (" + section_name + " section)"
-        mandatory = False
-        if self.required == 'mandatory':
-            mandatory = True
+        name = self.name
 
         has_error = False
         # check cardinality
         entry_size: int = len(entries)
         if entry_size == 0:
-            if mandatory:
-                msg = f"Mandatory field {self.name} has empty value"
-                results.append(VRC(VRConstants.ERROR, msg + section_info, record_id, self.name))
+            if self._mandatory:
+                msg = f"Mandatory field {name} has empty value"
+                results.append(VRC.create(VRConstants.ERROR, msg + section_info, record_id, name))
                 has_error = True
             else:
-                msg = f"{self.required} field {self.name} has empty value, better remove the field"
-                results.append(VRC(VRConstants.WARNING, msg + section_info, record_id, self.name))
+                msg = f"{self.required} field {name} has empty value, better remove the field"
+                results.append(VRC.create(VRConstants.WARNING, msg + section_info, record_id, name))
         elif entry_size > 1:
-            if not self.allow_multiple():
-                msg = f"Multiple values supplied for field {self.name} which does not allow multiple values"
-                results.append(VRC(VRConstants.ERROR, msg + section_info, record_id, self.name))
+            if not self._allow_multiple:
+                msg = f"Multiple values supplied for field {name} which does not allow multiple values"
+                results.append(VRC.create(VRConstants.ERROR, msg + section_info, record_id, name))
                 has_error = True
             # multiple only be True (reaching here) when existing Allow Multiple, no need to check existence
-            if entry_size > 2 and self.get_multiple() == 'max 2':
-                msg = f"Maximum of 2 values allowed for field {self.name} but {str(entry_size)} values provided"
-                results.append(VRC(VRConstants.ERROR, msg + section_info, record_id, self.name))
+            if entry_size > 2 and self._max_two:
+                msg = f"Maximum of 2 values allowed for field {name} but {str(entry_size)} values provided"
+                results.append(VRC.create(VRConstants.ERROR, msg + section_info, record_id, name))
                 has_error = True
         # the errors detected above mean that there is no need to validate the actual value(s)
         if has_error:
             return results
 
+        allowed_units = self._allowed_units
+        allowed_values = self._allowed_values
         for entry in entries:
             value = entry['value']
             # check units
-            allowed_units = self.get_allowed_units()
-            allowed_units_str = ', '.join(allowed_units)
             if 'units' in entry:
                 if allowed_units:
                     if entry['units'] not in allowed_units:
-                        msg = f"{entry['units']} for field {self.name} is not " \
-                            f"in the valid units list ({allowed_units_str})"
-                        results.append(VRC(VRConstants.ERROR, msg + section_info, record_id, self.name))
+                        msg = f"{entry['units']} for field {name} is not " \
+                            f"in the valid units list ({self._allowed_units_str})"
+                        results.append(VRC.create(VRConstants.ERROR, msg + section_info, record_id, name))
                 else:  # unit not required, but exists, raise a warning
-                    msg = f"No units required but {entry['units']} is used as unit for field {self.name}"
-                    results.append(VRC(VRConstants.WARNING, msg + section_info, record_id, self.name))
+                    msg = f"No units required but {entry['units']} is used as unit for field {name}"
+                    results.append(VRC.create(VRConstants.WARNING, msg + section_info, record_id, name))
             else:
                 if allowed_units:
-                    msg = f"One of {allowed_units_str} need to be present for the field {self.name}"
-                    results.append(VRC(VRConstants.ERROR, msg + section_info, record_id, self.name))
+                    msg = f"One of {self._allowed_units_str} need to be present for the field {name}"
+                    results.append(VRC.create(VRConstants.ERROR, msg + section_info, record_id, name))
             # check allowed values
-            allowed_values = self.get_allowed_values()
             if allowed_values:
-                if value not in allowed_values:
-                    if self.name == "Availability":
+                try:
+                    not_allowed = value not in allowed_values
+                except TypeError:  # not hashable value, e.g. a list, could not be allowed
+                    not_allowed = True
+                if not_allowed:
+                    if name == "Availability":
                         # available valid values include example@a.com and no longer available, needs to check for email
-                        if not misc.is_url(value):
+                        if type(value) is not str or not misc.is_url(value):
                             msg = f'<{value}> of field Availability is neither "no longer available" nor a valid URI'
-                            results.append(VRC(VRConstants.ERROR, msg + section_info, record_id, self.name))
+                            results.append(VRC.create(VRConstants.ERROR, msg + section_info, record_id, name))
                     else:  # not availability
-                        allowed_values_str = '>, <'.join(allowed_values)
-                        msg = f"<{value}> of field {self.name} is not in the valid values list (<{allowed_values_str}>)"
-                        results.append(VRC(VRConstants.ERROR, msg + section_info, record_id, self.name))
+                        msg = f"<{value}> of field {name} is not in the valid values list " \
+                            f"(<{self._allowed_values_str}>)"
+                        results.append(VRC.create(VRConstants.ERROR, msg + section_info, record_id, name))
             if results:
                 return results
 
             if 'terms' in entry:
-                if not self.get_allowed_terms():  # allowed conditions empty
-                    msg = f"Ontology provided for field {self.name} however there is no requirement in the ruleset"
-                    results.append(VRC(VRConstants.WARNING, msg + section_info, record_id, self.name))
+                if not self.allowed_terms:  # allowed conditions empty
+                    msg = f"Ontology provided for field {name} however there is no requirement in the ruleset"
+                    results.append(VRC.create(VRConstants.WARNING, msg + section_info, record_id, name))
                 else:
                     for term in entry['terms']:
                         iri = term['url']
                         if not misc.is_url(iri):
-                            msg = f"Invalid URI value {iri} in field {self.name}"
-                            results.append(VRC(VRConstants.ERROR, msg + section_info, record_id, self.name))
+                            msg = f"Invalid URI value {iri} in field {name}"
+                            results.append(VRC.create(VRConstants.ERROR, msg + section_info, record_id, name))
                             continue
 
                         term_id = misc.extract_ontology_id_from_iri(iri)
                         if not self.check_ontology_allowed(term_id):
-                            msg = f"Not valid ontology term {term_id} in field {self.name}"
-                            results.append(VRC(VRConstants.ERROR, msg + section_info, record_id, self.name))
+                            msg = f"Not valid ontology term {term_id} in field {name}"
+                            results.append(VRC.create(VRConstants.ERROR, msg + section_info, record_id, name))
             if results:
                 return results
 
-            # check type
-            # current allowed types:
-            # numeric: number
-            # textual: text, limited value, ontology_id, uri, doi, date
-            # number type requires a unit, which is covered in the units check above
-            if self.type == 'number':
-                if type(value) is not float and type(value) is not int:
-                    msg = f"For field {self.name} the provided value {str(value)} is not represented " \
-                        f"as/of the expected type Number"
-                    results.append(VRC(VRConstants.ERROR, msg + section_info, record_id, self.name))
-            else:  # textual types
-                if type(value) is not str:
-                    msg = f"For field {self.name} the provided value {str(value)} " \
-                        f"is not of the expected type {self.type}"
-                    results.append(VRC(VRConstants.ERROR, msg + section_info, record_id, self.name))
-                    return results
-                # the following tests are based on the value is a string, so need to return above
-                if self.type == 'ontology_id':
-                    if 'terms' not in entry:
-                        msg = f"No url found for the field {self.name} which has the type of ontology_id"
-                        results.append(VRC(VRConstants.ERROR, msg + section_info, record_id, self.name))
-                    else:
-                        for term in entry['terms']:
-                            iri = term['url']
-                            term = misc.extract_ontology_id_from_iri(iri)
-                            ontology = static_parameters.ontology_library.get_ontology(term)
-                            if iri != ontology.get_iri():
-                                msg = f"Provided iri {iri} does not match the iri " \
-                                    f"retrieved from OLS in the field {self.name}"
-                                results.append(VRC(VRConstants.WARNING, msg + section_info, record_id, self.name))
-                            if not ontology.label_match_ontology(value):
-                                if ontology.label_match_ontology(value, False):
-                                    msg = f"Provided value {value} has different letter case" \
-                                        f" to the term referenced by {iri}"
-                                    results.append(VRC(VRConstants.WARNING, msg + section_info, record_id, self.name))
-                                else:
-                                    msg = f"Provided value {value} does not match to the provided ontology {iri}"
-                                    results.append(VRC(VRConstants.ERROR, msg + section_info, record_id, self.name))
-                elif self.type == "uri":
-                    url_result = misc.is_url(value)
-                    if not url_result:
-                        msg = f"Invalid URI value {value} for field {self.name}"
-                        results.append(VRC(VRConstants.ERROR, msg + section_info, record_id, self.name))
-                    else:  # is in URI
-                        # in image ruleset, when email provided, it must begin with mailto:
-                        if misc.is_email(value):
-                            if misc.is_email(value, True):  # the whole value of value is an email, which is wrong
-                                msg = f'Email address must have prefix "mailto:" in the field {self.name}'
-                                results.append(VRC(VRConstants.ERROR, msg + section_info, record_id, self.name))
-                        else:  # it is URL, but not email: could be a normal URL or wrong mailto: location
-                            if value.find("mailto:") > 0:
-                                msg = f"mailto must be at position 1 to be a valid email value in the field {self.name}"
-                                results.append(VRC(VRConstants.ERROR, msg + section_info, record_id, self.name))
-                elif self.type == 'doi':
-                    doi_result = misc.is_doi(value)
-                    if not doi_result:
-                        msg = f"Invalid DOI value supplied in the field {self.name}"
-                        results.append(VRC(VRConstants.ERROR, msg + section_info, record_id, self.name))
-                elif self.type == 'date':
-                    # there is always a format(unit) for the date type (checked in the validation.read_in_ruleset)
-                    # therefore entry[units] existence should have already been
-                    # if 'units' not in entry:
-                    date_format = entry['units']
-                    date_result = misc.get_matched_date(value, date_format)
-                    if date_result:
-                        results.append(VRC(VRConstants.ERROR, date_result + section_info, record_id, self.name))
+            # check type, the checking method has been chosen according to the field type in the constructor
+            self._check_value(value, entry, section_info, record_id, results)
 
             # it would be safer to skip the validations below as unmatched type detected
             if results:
@@ -406,6 +408,144 @@ class RuleField:
 
         return results
 
+    def validate_column(self, column: List[Tuple[str, List]], section_name: str) -> List[List[VRC]]:
+        """
+        Validate the values of the field in a batch of records, with the same results as validate for every record
+        For the field types in column_types, every distinct single value of the column is checked once and
+        the records sharing it get the same messages, most values being shared by many records
+        :param column: the ids of the records with their field data
+        :param section_name: the section the field belong to
+        :return: list of validation results of every record in the same order as the column
+        """
+        if self.type not in RuleField.column_types:
+            return [self.validate(entries, section_name, record_id) for record_id, entries in column]
+        checked: Dict[Tuple, List[Tuple[str, str]]] = {}
+        results: List[List[VRC]] = []
+        for record_id, entries in column:
+            if len(entries) != 1 or 'terms' in entries[0]:
+                results.append(self.validate(entries, section_name, record_id))
+                continue
+            entry = entries[0]
+            value = entry['value']
+            # the type is part of the key as e.g. 1 and 1.0 are checked differently
+            key = (type(value), value, 'units' in entry, entry.get('units'))
+            try:
+                messages = checked.get(key)
+            except TypeError:  # not hashable value, e.g. a list
+                results.append(self.validate(entries, section_name, record_id))
+                continue
+            if messages is None:
+                messages = [(result.get_status(), result.message)
+                            for result in self.validate(entries, section_name, "")]
+                checked[key] = messages
+            results.append([VRC.create(status, message, record_id, self.name) for status, message in messages])
+        return results
+
+    # current allowed types:
+    # numeric: number
+    # textual: text, limited value, ontology_id, uri, doi, date
+    # number type requires a unit, which is covered in the units check in validate
+    def check_number_value(self, value, entry: Dict, section_info: str, record_id: str, results: List[VRC]) -> None:
+        """
+        Check the value of number type field
+        :param value: the value to be checked
+        :param entry: the entry containing the value
+        :param section_info: the section information appended to the messages
+        :param record_id: the id of the record
+        :param results: the list where validation results are added
+        """
+        if type(value) is not float and type(value) is not int:
+            msg = f"For field {self.name} the provided value {str(value)} is not represented " \
+                f"as/of the expected type Number"
+            results.append(VRC.create(VRConstants.ERROR, msg + section_info, record_id, self.name))
+
+    def check_text_value(self, value, entry: Dict, section_info: str, record_id: str, results: List[VRC]) -> bool:
+        """
+        Check the value of textual type field is a string, parameters are the same as check_number_value
+        :return: True if the value is a string, the following checks of textual types rely on it
+        """
+        if type(value) is not str:
+            msg = f"For field {self.name} the provided value {str(value)} " \
+                f"is not of the expected type {self.type}"
+            results.append(VRC.create(VRConstants.ERROR, msg + section_info, record_id, self.name))
+            return False
+        return True
+
+    def check_ontology_id_value(self, value, entry: Dict, section_info: str, record_id: str,
+                                results: List[VRC]) -> None:
+        """
+        Check the value of ontology_id type field matches the ontology, parameters are the same as check_number_value
+        """
+        if not self.check_text_value(value, entry, section_info, record_id, results):
+            return
+        if 'terms' not in entry:
+            msg = f"No url found for the field {self.name} which has the type of ontology_id"
+            results.append(VRC.create(VRConstants.ERROR, msg + section_info, record_id, self.name))
+        else:
+            for term in entry['terms']:
+                iri = term['url']
+                term = misc.extract_ontology_id_from_iri(iri)
+                ontology = static_parameters.ontology_library.get_ontology(term)
+                if iri != ontology.get_iri():
+                    msg = f"Provided iri {iri} does not match the iri " \
+                        f"retrieved from OLS in the field {self.name}"
+                    results.append(VRC.create(VRConstants.WARNING, msg + section_info, record_id, self.name))
+                if not ontology.label_match_ontology(value):
+                    if ontology.label_match_ontology(value, False):
+                        msg = f"Provided value {value} has different letter case" \
+                            f" to the term referenced by {iri}"
+                        results.append(VRC.create(VRConstants.WARNING, msg + section_info, record_id, self.name))
+                    else:
+                        msg = f"Provided value {value} does not match to the provided ontology {iri}"
+                        results.append(VRC.create(VRConstants.ERROR, msg + section_info, record_id, self.name))
+
+    def check_uri_value(self, value, entry: Dict, section_info: str, record_id: str, results: List[VRC]) -> None:
+        """
+        Check the value of uri type field, parameters are the same as check_number_value
+        """
+        if not self.check_text_value(value, entry, section_info, record_id, results):
+            return
+        url_result = misc.is_url(value)
+        if not url_result:
+            msg = f"Invalid URI value {value} for field {self.name}"
+            results.append(VRC.create(VRConstants.ERROR, msg + section_info, record_id, self.name))
+        else:  # is in URI
+            # in image ruleset, when email provided, it must begin with mailto:
+            if misc.is_email(value):
+                if misc.is_email(value, True):  # the whole value of value is an email, which is wrong
+                    msg = f'Email address must have prefix "mailto:" in the field {self.name}'
+                    results.append(VRC.create(VRConstants.ERROR, msg + section_info, record_id, self.name))
+            else:  # it is URL, but not email: could be a normal URL or wrong mailto: location
+                if value.find("mailto:") > 0:
+                    msg = f"mailto must be at position 1 to be a valid email value in the field {self.name}"
+                    results.append(VRC.create(VRConstants.ERROR, msg + section_info, record_id, self.name))
+
+    def check_doi_value(self, value, entry: Dict, section_info: str, record_id: str, results: List[VRC]) -> None:
+        """
+        Check the value of doi type field, parameters are the same as check_number_value
+        """
+        if not self.check_text_value(value, entry, section_info, record_id, results):
+            return
+        doi_result = misc.is_doi(value)
+        if not doi_result:
+            msg = f"Invalid DOI value supplied in the field {self.name}"
+            results.append(VRC.create(VRConstants.ERROR, msg + section_info, record_id, self.name))
+
+    def check_date_value(self, value, entry: Dict, section_info: str, record_id: str, results: List[VRC]) -> None:
+        """
+        Check the value of date type field matches the format given as units, parameters are the same as
+        check_number_value
+        """
+        if not self.check_text_value(value, entry, section_info, record_id, results):
+            return
+        # there is always a format(unit) for the date type (checked in the validation.read_in_ruleset)
+        # therefore entry[units] existence should have already been
+        # if 'units' not in entry:
+        date_format = entry['units']
+        date_result = misc.get_matched_date(value, date_format)
+        if date_result:
+            results.append(VRC.create(VRConstants.ERROR, date_result + section_info, record_id, self.name))
+
 
 class RuleSection:
     """
@@ -426,6 +566,8 @@ class RuleSection:
         self.conditions: Dict[str, str] = {}
         # rules are organized by requirement first, so this serves as a shortcut
         self.rule_names: Dict[str, int] = {}
+        # increased whenever a rule or a condition is added, so that rulesets know their dispatch index is stale
+        self._version: int = 0
 
     def to_json(self):
         """
@@ -433,7 +575,7 @@ class RuleSection:
         :return: json representation
         """
         return json.dumps(
-                self, default=lambda o: o.__dict__,
+                self, default=to_serializable,
                 sort_keys=True, indent=2)
 
     def add_rule(self, rule: RuleField) -> None:
@@ -451,6 +593,7 @@ class RuleSection:
             raise ValueError("There are more than one rule related to field " + name)
         self.rules[required][name] = rule
         self.rule_names[name] = 1
+        self._version += 1
 
     def get_rules(self) -> Dict:
         """
@@ -469,6 +612,13 @@ class RuleSection:
             names.append(name)
         return names
 
+    def get_version(self) -> int:
+        """
+        Get the version of the section, increased whenever a rule or a condition is added
+        :return: the version
+        """
+        return self._version
+
     def get_section_name(self):
         """
         Get the section name
@@ -489,6 +639,7 @@ class RuleSection:
         if field in self.conditions:
             raise ValueError("Two conditions apply to the same field")
         self.conditions[field] = value
+        self._version += 1
 
     def get_conditions(self):
         """
@@ -527,14 +678,10 @@ class RuleSection:
 
         for field_name in conditions.keys():
             if field_name not in attributes:
-                logger.debug(f"{field_name} used in section conditions could not be found in attributes")
+                logger.debug("%s used in section conditions could not be found in attributes", field_name)
                 return False
-            else:
-                logger.debug("found %s in %s" % (field_name, conditions))
 
             actual_values = attributes[field_name]
-            logger.debug("actual_values is %s" % actual_values)
-
             found = False
 
             for value in actual_values:
@@ -546,38 +693,82 @@ class RuleSection:
                 return False
         return True
 
-    def validate(self, attributes: Dict, record_id: str, id_field: str) -> List[VRC]:
+    def validate(self, attributes: Dict, record_id: str, id_field: str,
+                 stats: instrumentation.Stats = None) -> List[VRC]:
         """
         Validate the record using all field rules in the section
         :param attributes: the record attribute values
         :param record_id: the id of the record
         :param id_field: the name of the id field
+        :param stats: optional, where the validation time of every field is added under field:<field name>
         :return: list of field validaitn results
         """
-        results: List[VRC] = []
         # all mandatory fields must be there, not checking details in this step
-        if 'mandatory' in self.rules:
-            mandatory_rules = self.rules['mandatory']
-            for field_name in mandatory_rules.keys():
-                if field_name == id_field:
-                    continue
-                if field_name not in attributes:
-                    msg = f"Mandatory field {field_name} in {self.get_section_name()} section could not be found"
-                    results.append(VRC(VRConstants.ERROR, msg, record_id, field_name))
-            if results:
-                return results
+        results: List[VRC] = self.check_mandatory_fields(attributes, record_id, id_field)
+        if results:
+            return results
         # check values for all required levels
         for required in self.rules.keys():
             rules = self.rules[required]
             for field_name in rules.keys():
                 if field_name in attributes:
+                    start = time.perf_counter() if stats is not None else 0
                     one_field_result = rules[field_name].validate(attributes[field_name], self.get_section_name(),
                                                                   record_id)
+                    if stats is not None:
+                        stats.observe("field:" + field_name, time.perf_counter() - start)
                     for tmp in one_field_result:
                         results.append(tmp)
 
         return results
 
+    def check_mandatory_fields(self, attributes: Dict, record_id: str, id_field: str) -> List[VRC]:
+        """
+        Check that the record has all mandatory fields of the section
+        :param attributes: the record attribute values
+        :param record_id: the id of the record
+        :param id_field: the name of the id field
+        :return: list of errors for the missing fields
+        """
+        results: List[VRC] = []
+        for field_name in self.rules.get('mandatory', {}).keys():
+            if field_name == id_field:
+                continue
+            if field_name not in attributes:
+                msg = f"Mandatory field {field_name} in {self.get_section_name()} section could not be found"
+                results.append(VRC.create(VRConstants.ERROR, msg, record_id, field_name))
+        return results
+
+    def validate_batch(self, rows: List[Tuple[Dict, str]], id_field: str,
+                       stats: instrumentation.Stats = None) -> List[List[VRC]]:
+        """
+        Validate a batch of records using all field rules in the section, with the same results as validate
+        the field data of the records are gathered into columns so that each field rule checks them all at once
+        :param rows: the attribute values of the records with their ids
+        :param id_field: the name of the id field
+        :param stats: optional, where the validation time of every column is added under field:<field name>
+        :return: list of field validation results of every record in the same order as the rows
+        """
+        results: List[List[VRC]] = [self.check_mandatory_fields(attributes, record_id, id_field)
+                                    for attributes, record_id in rows]
+        # the records missing mandatory fields are not checked further
+        complete = [index for index, one in enumerate(results) if not one]
+        section_name = self.get_section_name()
+        for required in self.rules.keys():
+            rules = self.rules[required]
+            for field_name in rules.keys():
+                indexes = [index for index in complete if field_name in rows[index][0]]
+                if not indexes:
+                    continue
+                column = [(rows[index][1], rows[index][0][field_name]) for index in indexes]
+                start = time.perf_counter() if stats is not None else 0
+                column_results = rules[field_name].validate_column(column, section_name)
+                if stats is not None:
+                    stats.observe("field:" + field_name, time.perf_counter() - start)
+                for index, one_field_result in zip(indexes, column_results):
+                    results[index].extend(one_field_result)
+        return results
+
 
 class RuleSet:
     """
@@ -588,6 +779,20 @@ class RuleSet:
         Constructor method
         """
         self.rule_sections: Dict[str, RuleSection] = {}
+        # the applicable sections by the values of the fields used in conditions, see get_applicable_sections
+        self._condition_fields: Tuple[str, ...] = ()
+        self._dispatch: cache_backends.LRUCache = None
+        # the versions of the sections when the dispatch index was started
+        self._dispatch_versions: Tuple[int, ...] = ()
+
+    def __getstate__(self) -> Dict:
+        """
+        The dispatch index is built again when first needed after unpickling
+        :return: the state to be pickled
+        """
+        state = self.__dict__.copy()
+        state['_dispatch'] = None
+        return state
 
     def to_json(self):
         """
@@ -595,7 +800,7 @@ class RuleSet:
         :return: json representation
         """
         return json.dumps(
-                self, default=lambda o: o.__dict__,
+                self, default=to_serializable,
                 sort_keys=True, indent=2)
 
     def add_rule_section(self, rule_section: RuleSection) -> None:
@@ -610,6 +815,7 @@ class RuleSet:
         if section_name in self.rule_sections:
             raise ValueError("Two rule sections use the same name")
         self.rule_sections[section_name] = rule_section
+        self._dispatch = None
 
     def get_all_section_names(self) -> List[str]:
         """
@@ -633,47 +839,121 @@ class RuleSet:
             raise ValueError("No section found according to the given name " + section_name)
         return self.rule_sections.get(section_name)
 
-    def validate(self, record: Dict, id_field: str = 'Data source ID') -> VRR:
+    def get_decision_stats(self) -> Dict[str, int]:
+        """
+        Get how often the ontology terms have been checked using the decisions already made, summed over all fields
+        :return: the numbers of hits, misses and stored decisions
+        """
+        stats = {'hits': 0, 'misses': 0, 'size': 0}
+        for rule_section in self.rule_sections.values():
+            for rules in rule_section.get_rules().values():
+                for rule in rules.values():
+                    for key, value in rule.get_decision_stats().items():
+                        stats[key] += value
+        return stats
+
+    def build_dispatch(self) -> None:
+        """
+        Start the dispatch index used by get_applicable_sections again, e.g. after the sections have changed
+        """
+        fields = []
+        for rule_section in self.rule_sections.values():
+            for field in rule_section.get_conditions():
+                if field not in fields:
+                    fields.append(field)
+        self._condition_fields = tuple(fields)
+        self._dispatch = cache_backends.LRUCache()
+        self._dispatch_versions = self.get_section_versions()
+
+    def get_section_versions(self) -> Tuple[int, ...]:
+        """
+        Get the versions of the sections, which change whenever a rule or a condition is added to one of them
+        :return: the versions in the order of the sections
+        """
+        return tuple(rule_section.get_version() for rule_section in self.rule_sections.values())
+
+    def get_applicable_sections(self, record: Dict) -> Tuple[List[RuleSection], FrozenSet[str]]:
+        """
+        Get the sections whose conditions the record meets, with the names of all fields having a rule in them
+        Whether a section applies only depends on the values of the fields used in conditions, e.g. Material,
+        so the sections are worked out once for every combination of those values and then looked up
+        :param record: the record data
+        :return: the applicable sections in the order of the ruleset and the names of their fields
+        """
+        if self._dispatch is None or self._dispatch_versions != self.get_section_versions():
+            self.build_dispatch()
+        attributes = record['attributes']
+        try:
+            key = tuple(tuple(entry['value'] for entry in attributes.get(field, ()))
+                        for field in self._condition_fields)
+            applicable = self._dispatch.get(key)
+        except TypeError:
+            # values which could not be hashed are not indexed
+            key = None
+            applicable = None
+        if applicable is None:
+            sections = [rule_section for rule_section in self.rule_sections.values()
+                        if rule_section.meet_condition(record)]
+            applicable = sections, frozenset().union(*[rule_section.rule_names for rule_section in sections])
+            if key is not None:
+                self._dispatch.set(key, applicable)
+        return applicable
+
+    def validate(self, record: Dict, id_field: str = 'Data source ID', stats: instrumentation.Stats = None) -> VRR:
         """
         Validate the record with the full ruleset
         :param record: the record data
         :param id_field: the name of the id field, in IMAGE ruleset it is Data source ID
+        :param stats: optional, where the validation time of every field is added, see RuleSection.validate
         :return: the validation result
         """
-        logger.debug(f"got record: {record}, id_field: {id_field}")
         attributes = record['attributes']
         record_id = attributes[id_field][0]['value']
         record_result = VRR(record_id)
+        # checked once per record, so that nothing is formatted for the messages not logged
+        debug = logger.isEnabledFor(logging.DEBUG)
 
-        unmapped = attributes.copy()  # create a copy and remove the ruleset-mapped columns
-        del unmapped[id_field]
-        for section_name in self.get_all_section_names():
-            logger.debug(f"Processing section_name: {section_name}")
-            section_rule = self.get_section_by_name(section_name)
-            # logger.debug("Got section_rule: %s" % (section_rule.toJSON()))
-            if section_rule.meet_condition(record):
-                logger.debug("Applying "+section_name+" ruleset to record "+record_id)
-                section_results = section_rule.validate(attributes, record_id, id_field)
-                for one in section_results:
-                    record_result.add_validation_result_column(one)
-
-                for field_name in section_rule.get_rule_names():
-                    if field_name in unmapped:
-                        del unmapped[field_name]
-
-            else:
-                logger.debug(
-                    "section_rule %s doesn't meet_condition" % section_name)
+        sections, mapped = self.get_applicable_sections(record)
+        for section_rule in sections:
+            if debug:
+                logger.debug("Applying %s ruleset to record %s", section_rule.name, record_id)
+            for one in section_rule.validate(attributes, record_id, id_field, stats):
+                record_result.add_validation_result_column(one)
 
         # unmapped column check can only be done here, not in section rule
         # validation as all section rules need to apply
-        if unmapped:
-            logger.debug("found those unmapped keys: %s" % (unmapped.keys()))
-
-            for key in unmapped.keys():
+        for key in attributes:
+            if key not in mapped and key != id_field:
                 record_result.add_validation_result_column(
-                    VRC(VRConstants.WARNING, f"Column {key} could not be found in ruleset", record_id, key))
-        else:
-            logger.debug("No unmapped columns left")
+                    VRC.create(VRConstants.WARNING, f"Column {key} could not be found in ruleset", record_id, key))
 
         return record_result
+
+    def validate_batch(self, records: List[Dict], id_field: str = 'Data source ID',
+                       stats: instrumentation.Stats = None) -> List[VRR]:
+        """
+        Validate a batch of records with the full ruleset, with the same results as validate for every record
+        the sections check the records meeting their conditions together, field by field
+        :param records: the records data
+        :param id_field: the name of the id field, in IMAGE ruleset it is Data source ID
+        :param stats: optional, where the validation time of every column is added, see RuleSection.validate_batch
+        :return: list of the validation results in the same order as the records
+        """
+        record_results: List[VRR] = [VRR(record['attributes'][id_field][0]['value']) for record in records]
+        applicable = [self.get_applicable_sections(record) for record in records]
+        for section_rule in self.rule_sections.values():
+            indexes = [index for index, (sections, _) in enumerate(applicable) if section_rule in sections]
+            if not indexes:
+                continue
+            rows = [(records[index]['attributes'], record_results[index].record_id) for index in indexes]
+            for index, section_results in zip(indexes, section_rule.validate_batch(rows, id_field, stats)):
+                for one in section_results:
+                    record_results[index].add_validation_result_column(one)
+        # unmapped column check can only be done here as all section rules need to apply
+        for record, record_result, (_, mapped) in zip(records, record_results, applicable):
+            for key in record['attributes']:
+                if key not in mapped and key != id_field:
+                    record_result.add_validation_result_column(
+                        VRC.create(VRConstants.WARNING, f"Column {key} could not be found in ruleset",
+                                   record_result.record_id, key))
+        return record_results
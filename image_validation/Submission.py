@@ -1,17 +1,88 @@
-from . import validation, Ruleset
+from . import validation, Ruleset, static_parameters, json_stream, relationship_graph, instrumentation, http_client
 from image_validation.ValidationResult import ValidationResultConstant as VRConstants
 from image_validation.ValidationResult import ValidationResultColumn as VRC
 from image_validation.ValidationResult import ValidationResultRecord as VRR
-from typing import List, Dict
+from typing import List, Dict, Iterable, Iterator, Optional, Set, Tuple
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+import asyncio
+import hashlib
 import json
 import logging
-import requests
+import time
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(
     format='%(asctime)s\t%(levelname)s:\t%(name)s line %(lineno)s\t%(message)s',
     level=logging.INFO)
 
+# the number of records validated at a time when not given
+DEFAULT_CHUNK_SIZE = 1000
+# the number of concurrent OLS and BioSamples requests of the command line validation
+DEFAULT_PREFETCH_WORKERS = 8
+
+# the loop running the current coroutine, get_event_loop returns it as well before Python 3.7
+get_running_loop = getattr(asyncio, 'get_running_loop', asyncio.get_event_loop)
+
+# the ruleset used by the current worker process of parallel validation
+worker_ruleset: Ruleset.RuleSet = None
+
+
+def init_worker(ruleset: Ruleset.RuleSet, ontology_library) -> None:
+    """
+    Set up the worker process of parallel validation, called once per worker
+    :param ruleset: the ruleset to validate against
+    :param ontology_library: the ontology cache already warmed by the parent process
+    """
+    global worker_ruleset
+    worker_ruleset = ruleset
+    static_parameters.ontology_library = ontology_library
+
+
+def validate_chunk(records: List[Dict], columnar: bool = False,
+                   field_timing: bool = False) -> Tuple[List[VRR], Optional[instrumentation.Stats]]:
+    """
+    Validate a chunk of records against the ruleset of the worker process
+    :param records: the records
+    :param columnar: optional, validate the records together field by field, see RuleSet.validate_batch
+    :param field_timing: optional, time the validation of every field
+    :return: the validation results in the same order as the records, with the validation time of every field
+    if timed
+    """
+    stats = instrumentation.Stats() if field_timing else None
+    if columnar:
+        return worker_ruleset.validate_batch(records, stats=stats), stats
+    return [worker_ruleset.validate(record, stats=stats) for record in records], stats
+
+
+def get_record_fingerprint(record: Dict) -> str:
+    """
+    Get the fingerprint of the record, which changes whenever anything in the record changes
+    :param record: the record
+    :return: the hash of the canonical JSON representation of the record
+    """
+    return hashlib.blake2b(json.dumps(record, sort_keys=True, separators=(',', ':')).encode(),
+                           digest_size=16).hexdigest()
+
+
+def tap_records(records: Iterable[Dict], fingerprints: Dict[str, str] = None,
+                graph: relationship_graph.RelationshipGraph = None) -> Iterator[Dict]:
+    """
+    Pass the records through while computing their fingerprints and adding them to the relationship graph,
+    so that one pass over the records streamed from the file serves several purposes
+    :param records: the records
+    :param fingerprints: optional, the fingerprints by alias to add to
+    :param graph: optional, the relationship graph to add the records to
+    :return: the same records
+    """
+    for record in records:
+        if fingerprints is not None:
+            fingerprints[record['alias']] = get_record_fingerprint(record)
+        if graph is not None:
+            graph.add_record(record)
+        yield record
+
 
 class Submission:
     """
@@ -27,25 +98,60 @@ class Submission:
         self.title: str = title
         self.validation_results: Dict[str, VRR] = dict()
         self.data: Dict = None
+        # in streaming mode, records are read from the file every time they are needed rather than kept in data
+        self.streaming: bool = False
+        # in columnar mode, the records are validated chunk by chunk field by field rather than one by one
+        self.columnar: bool = False
+        # the wall time of the validation stages and the number of validated records
+        self.stats: instrumentation.Stats = instrumentation.Stats()
+        # whether to add the validation time of every field to the stats, which slows down the validation
+        self.field_timing: bool = False
+        self.data_file: str = None
+        self.data_section: str = ''
         self.data_ready_flag: bool = False
         self.ruleset: Ruleset.RuleSet = None
         self.ruleset_pass_flag: bool = False
         self.id_field: str = id_field
+        # kept to validate again only the records changed since the previous validation
+        self.fingerprints: Dict[str, str] = {}
+        self.first_scan_results: Dict[str, VRR] = {}
+        self.validated_ruleset: Ruleset.RuleSet = None
+        # built by the validation, e.g. to find circular relationships
+        self.relationship_graph: relationship_graph.RelationshipGraph = None
+        # the circular relationships found by the validation by alias of the records involved
+        self.cycles: Dict[str, List[str]] = {}
         # self.general_errors = ValidationResult.ValidationResultRecord("general")
 
-    def load_data(self, data_file: str, section: str = '') -> VRR:
+    def load_data(self, data_file: str, section: str = '', streaming: bool = False) -> VRR:
         """
         Load the data from JSON file which is to be validated and
         do preliminary validation (usi structure and duplicate), if successful set data ready flag
         The preliminary validation results are stored in the general_errors class field
         :param data_file: the JSON file contains the data
         :param section: optional, the name of the section which contains data
+        :param streaming: optional, read the records one by one from the file every time
+        they are needed rather than loading the whole file into memory
         """
         self.data_ready_flag = False
+        self.streaming = streaming
+        self.data_file = data_file
+        self.data_section = section
         general_errors = VRR("general")
         try:
-            with open(data_file) as infile:
-                self.data = json.load(infile)
+            if streaming:
+                self.data = None
+                # check usi structure while reading, records are not kept
+                with self.stats.time('check_usi_structure'):
+                    usi_check_result = validation.check_usi_records(self.iter_records())
+            else:
+                with self.stats.time('read_data'), open(data_file) as infile:
+                    self.data = json.load(infile)
+                if len(section) > 0:
+                    if section in self.data:
+                        self.data = self.data[section]
+                # check usi structure
+                with self.stats.time('check_usi_structure'):
+                    usi_check_result = validation.check_usi_structure(self.data)
         except FileNotFoundError:
             msg = f"Could not find the file {data_file}"
             general_errors.add_validation_result_column(
@@ -56,15 +162,14 @@ class Submission:
             general_errors.add_validation_result_column(
                 VRC(VRConstants.ERROR, msg, general_errors.record_id, "", VRConstants.GENERAL))
             return general_errors
-        if len(section) > 0:
-            if section in self.data:
-                self.data = self.data[section]
-        # check usi structure
-        usi_check_result = validation.check_usi_structure(self.data)
+        except json_stream.NotArrayError:
+            # reported in the same way as for the data loaded into memory
+            usi_check_result = validation.check_usi_structure(None)
         if usi_check_result.get_overall_status() != "Pass":
             return usi_check_result
         # check duplicate id
-        msgs = validation.check_duplicates(self.data, self.id_field)
+        with self.stats.time('check_duplicates'):
+            msgs = validation.check_duplicates(self.iter_records(), self.id_field)
         if msgs:
             for msg in msgs:
                 # classify the error as ruleset based error
@@ -76,15 +181,25 @@ class Submission:
         self.data_ready_flag = True
         return general_errors
 
-    def load_ruleset(self, ruleset_file: str) -> VRR:
+    def load_ruleset(self, ruleset_file: str, snapshot_dir: str = None) -> VRR:
         """
         Load the ruleset from the JSON file and check the integrity of the ruleset,
         if successful, set ruleset ready flag
         if not, the results are stored in the class field general_errors
+        A ruleset passing the check is saved as a snapshot, which is loaded next time instead of the JSON file
         :param ruleset_file: the JSON file containing the ruleset
+        :param snapshot_dir: optional, the folder of ruleset snapshots, default to the one set in static_parameters,
+        empty string to disable snapshots
         """
         self.ruleset_pass_flag = False
         general_errors = VRR("general")
+        if snapshot_dir is None:
+            snapshot_dir = static_parameters.ruleset_snapshot_dir
+        if snapshot_dir:
+            self.ruleset = validation.load_ruleset_snapshot(ruleset_file, snapshot_dir)
+            if self.ruleset is not None:
+                self.ruleset_pass_flag = True
+                return general_errors
         try:
             self.ruleset = validation.read_in_ruleset(ruleset_file)
         except KeyError as e:
@@ -95,56 +210,350 @@ class Submission:
         if ruleset_check_result.get_overall_status() != "Pass":
             return ruleset_check_result
         logger.info("Ruleset loaded")
+        if snapshot_dir:
+            validation.save_ruleset_snapshot(self.ruleset, ruleset_file, snapshot_dir)
         self.ruleset_pass_flag = True
         return general_errors
 
-    def validate(self) -> None:
+    def iter_records(self) -> Iterable[Dict]:
+        """
+        Get the records either kept in memory or read on the fly from the file in streaming mode
+        :return: the records
+        """
+        if self.streaming:
+            return json_stream.iter_json_array(self.data_file, self.data_section)
+        return self.data
+
+    def validate_records(self, workers: int = 1, chunk_size: int = 0,
+                         records: Iterable[Dict] = None) -> Iterator[Tuple[Dict, VRR]]:
+        """
+        Validate every record against the ruleset, records are independent of each other at this stage
+        so that they can be shared among several processes
+        :param workers: the number of processes, 1 to validate in the current process
+        :param chunk_size: optional, the number of records sent to a process at a time, or validated together
+        in columnar mode
+        :param records: optional, the records to be validated, default to all records
+        :return: iterator of records with their validation results in the same order as the records
+        """
+        if type(workers) is not int:
+            raise TypeError("The workers parameter must be an integer")
+        if workers < 1:
+            raise ValueError("The workers parameter must be a positive integer")
+        if records is None:
+            records = self.iter_records()
+        stats = self.stats
+        field_stats = stats if self.field_timing else None
+        # the progress is summarized periodically rather than logged for every record
+        progress = instrumentation.Progress("Validated", len(records) if type(records) is list else None,
+                                            progress_logger=logger)
+        if workers == 1 and not self.columnar:
+            # timed locally and added to the shared stats at the end rather than locking them for every record
+            timer = instrumentation.Histogram(stats.bounds)
+            local_field_stats = instrumentation.Stats(stats.bounds) if self.field_timing else None
+            try:
+                for record in records:
+                    start = time.perf_counter()
+                    result = self.ruleset.validate(record, stats=local_field_stats)
+                    timer.observe(time.perf_counter() - start)
+                    progress.update()
+                    yield record, result
+            finally:
+                if timer.count:
+                    stats.merge_timer('ruleset_validate', timer)
+                if local_field_stats is not None:
+                    stats.merge(local_field_stats)
+            stats.increment('records_validated', progress.count)
+            progress.finish()
+            return
+        if workers == 1:
+            records = iter(records)
+            while True:
+                chunk = list(islice(records, chunk_size or DEFAULT_CHUNK_SIZE))
+                if not chunk:
+                    progress.finish()
+                    return
+                logger.debug("Validate %d records from %s", len(chunk), chunk[0]['alias'])
+                with stats.time('ruleset_validate_chunk'):
+                    results = self.ruleset.validate_batch(chunk, stats=field_stats)
+                stats.increment('records_validated', len(chunk))
+                progress.update(len(chunk))
+                for one in zip(chunk, results):
+                    yield one
+        if not chunk_size:
+            # several chunks per worker to balance the load, but not too many to limit the communication
+            chunk_size = max(1, -(-len(records) // (workers * 4))) if type(records) is list else DEFAULT_CHUNK_SIZE
+        records = iter(records)
+        logger.info(f"Validate records in chunks of {chunk_size} with {workers} processes")
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                 initargs=(self.ruleset, static_parameters.ontology_library)) as executor:
+            # only a limited number of chunks are waiting to be validated, to keep memory bounded when streaming
+            pending = deque()
+            while True:
+                chunk = list(islice(records, chunk_size))
+                if chunk:
+                    pending.append((chunk, executor.submit(validate_chunk, chunk, self.columnar, self.field_timing)))
+                if pending and (not chunk or len(pending) >= workers * 2):
+                    chunk, future = pending.popleft()
+                    results, worker_stats = future.result()
+                    if worker_stats is not None:
+                        stats.merge(worker_stats)
+                    stats.increment('records_validated', len(chunk))
+                    progress.update(len(chunk))
+                    for one in zip(chunk, results):
+                        yield one
+                elif not chunk:
+                    progress.finish()
+                    return
+
+    def check_ready(self) -> bool:
+        """
+        Check whether ready to carry out validation, log the reason if not
+        :return: True when both data and ruleset are ready
+        """
+        if not self.data_ready_flag:
+            logger.error("The data is not ready, abort the validation proecess")
+            return False
+        if not self.ruleset_pass_flag:
+            logger.error("The ruleset is not ready, abort the validation proecess")
+            return False
+        return True
+
+    def validate(self, prefetch_workers: int = 0, workers: int = 1, incremental: bool = False) -> None:
         """
         Validate the data against the ruleset
         the data needs to be scanned twice, first time to validate individual field in every record based on the ruleset
         second time to validate anything involving with more than one record e.g. relationships and context validation
         or more than one fields in the same record
+        When prefetching, before the scans all ontology terms used in the data are retrieved concurrently from OLS
+        and the referenced BioSamples records are checked concurrently, every accession once,
+        otherwise they are retrieved one by one by the scans when first needed
         The validation result is stored in the object's validation_results field
+        :param prefetch_workers: optional, the maximum number of concurrent OLS and BioSamples requests,
+        0 by default to disable prefetching, e.g. DEFAULT_PREFETCH_WORKERS
+        :param workers: optional, the number of processes used for the first scan
+        :param incremental: optional, only validate again the records changed since the previous validation
+        and the records referencing them, keeping the results of the others
         """
-        # check whether ready to carry out validation
-        if not self.data_ready_flag:
-            logger.error("The data is not ready, abort the validation proecess")
+        if not self.check_ready():
             return
-        if not self.ruleset_pass_flag:
-            logger.error("The ruleset is not ready, abort the validation proecess")
+        fingerprints, changed, graph = self.get_changes(incremental)
+        affected = None if changed is None else self.get_affected_records(changed, graph)
+        if prefetch_workers:
+            fingerprints, terms, pairs, accessions = self.collect_lookups(fingerprints, affected)
+            with self.stats.time('prefetch_ontologies'):
+                static_parameters.ontology_library.prefetch(terms, pairs, prefetch_workers)
+            with self.stats.time('prefetch_biosamples'):
+                static_parameters.biosamples_library.prefetch(accessions, prefetch_workers)
+        self.scan(workers, fingerprints, changed, affected, graph)
+
+    async def avalidate(self, concurrency: int = 8, incremental: bool = False) -> None:
+        """
+        Validate the data as validate does, without blocking the event loop while waiting for OLS and BioSamples
+        All remote lookups needed by the data are awaited concurrently first, then the scans check the rules
+        using the retrieved answers, the blocking steps running in the default executor of the event loop
+        :param concurrency: optional, the maximum number of concurrent requests
+        :param incremental: optional, only validate again the records changed since the previous validation
+        and the records referencing them, keeping the results of the others
+        """
+        if type(concurrency) is not int:
+            raise TypeError("The concurrency parameter must be an integer")
+        if concurrency < 1:
+            raise ValueError("The concurrency parameter must be a positive integer")
+        if not self.check_ready():
             return
-        # first scan
-        # meanwhile split data according to material type for relationship checking
-        data_by_material: Dict[str, Dict[str, Dict]] = {}
-        for record in self.data:
-            logger.info("Validate record " + record['alias'])
-            record_result = self.ruleset.validate(record)
-            self.validation_results[record['alias']] = record_result
+        loop = get_running_loop()
+        # reading the records may block, e.g. on the file when streaming
+        fingerprints, changed, graph = await loop.run_in_executor(None, self.get_changes, incremental)
+        affected = None
+        if changed is not None:
+            affected = await loop.run_in_executor(None, self.get_affected_records, changed, graph)
+        fingerprints, terms, pairs, accessions = await loop.run_in_executor(None, self.collect_lookups,
+                                                                            fingerprints, affected)
+        library = static_parameters.ontology_library
+        missing_terms, missing_children = library.get_missing_lookups(terms, pairs)
+        accessions = static_parameters.biosamples_library.get_missing(accessions)
+        logger.info(f"Retrieve {len(missing_terms)} ontologies, ancestors of {len(missing_children)} terms "
+                    f"and {len(accessions)} BioSamples records")
+        semaphore = asyncio.Semaphore(concurrency)
+        start = time.perf_counter()
+        # the terms first, the ancestors are retrieved using their detail
+        await asyncio.gather(*[self.alookup(semaphore, library.get_ontology, short_term)
+                               for short_term in missing_terms])
+        await asyncio.gather(*[self.alookup(semaphore, library.get_ancestors, child) for child in missing_children],
+                             *[self.alookup(semaphore, static_parameters.biosamples_library.get_status, accession)
+                               for accession in accessions])
+        self.stats.observe('remote_lookups', time.perf_counter() - start)
+        # the lookups not answered, e.g. failed ones, are done again by the scans
+        await loop.run_in_executor(None, self.scan, 1, fingerprints, changed, affected, graph)
+
+    @staticmethod
+    async def alookup(semaphore: asyncio.Semaphore, method, *args) -> None:
+        """
+        Run one blocking lookup in the default executor of the event loop
+        failures are only logged as the lookup will be done again by the scans which report them
+        :param semaphore: the semaphore limiting the number of concurrent lookups
+        :param method: the lookup method
+        :param args: the arguments of the method
+        """
+        async with semaphore:
             try:
-                material = record['attributes']['Material'][0]['value'].lower()
-                data_by_material.setdefault(material, {})
-                data_by_material[material][record['alias']] = record
-            except KeyError:
-                # error still exists, e.g. using material rather than Material, which needs to be caught
-                # however the reporting should have already been done by validation
-                pass
-
-        for record in self.data:
+                await get_running_loop().run_in_executor(None, method, *args)
+            except Exception as e:
+                logger.warning(f"Fail to retrieve {args}: {e}")
+
+    def get_changes(self, incremental: bool = False) -> Tuple[Dict[str, str], Optional[Set[str]],
+                                                              relationship_graph.RelationshipGraph]:
+        """
+        Get the fingerprints of the records and the aliases of the records changed since the previous validation,
+        building the relationship graph of the records in the same pass
+        :param incremental: whether to compare with the previous validation, if not every record is considered changed
+        :return: the fingerprints by alias, the aliases of records changed, added or removed and the graph,
+        all None when every record needs to be validated again, e.g. the ruleset has changed,
+        they are then computed by the next pass over the records rather than by an extra one
+        """
+        if not incremental or self.validated_ruleset is not self.ruleset:
+            return None, None, None
+        fingerprints: Dict[str, str] = {}
+        graph = relationship_graph.RelationshipGraph()
+        for _ in tap_records(self.iter_records(), fingerprints, graph):
+            pass
+        graph.check_built()
+        changed = {alias for alias, fingerprint in fingerprints.items() if self.fingerprints.get(alias) != fingerprint}
+        changed.update(alias for alias in self.fingerprints if alias not in fingerprints)
+        logger.info(f"{len(changed)} records changed since the previous validation")
+        return fingerprints, changed, graph
+
+    def collect_lookups(self, fingerprints: Optional[Dict[str, str]], affected: Optional[List[Dict]]
+                        ) -> Tuple[Dict[str, str], Set[str], Set[Tuple[str, str]], Set[str]]:
+        """
+        Collect the ontology lookups and the BioSamples accessions needed by the records to be validated
+        in one pass over the records, also computing their fingerprints in that pass when not known yet
+        :param fingerprints: the fingerprints by alias as given by get_changes, None to compute them
+        :param affected: the records to be validated again as given by get_affected_records, None for every record
+        :return: the fingerprints by alias, the short terms, the (child term, parent term) pairs and the accessions
+        """
+        if affected is not None:
+            records = affected
+        elif fingerprints is None:
+            fingerprints = {}
+            records = tap_records(self.iter_records(), fingerprints)
+        else:
+            records = self.iter_records()
+        with self.stats.time('collect_lookups'):
+            terms, pairs, accessions = validation.collect_remote_lookups(records, self.ruleset)
+        return fingerprints, terms, pairs, accessions
+
+    def get_affected_records(self, changed: Optional[Set[str]],
+                             graph: relationship_graph.RelationshipGraph = None) -> Iterable[Dict]:
+        """
+        Get the records which need to be validated again, the records referencing the changed ones are found
+        from the reverse edges of the relationship graph, e.g. the children of a changed animal,
+        or of the previous validation graph for the records removed since
+        :param changed: the aliases of the records changed, None if every record needs to be validated again
+        :param graph: the relationship graph of the records as given by get_changes
+        :return: the records changed and the records referencing them, in the order of the records
+        """
+        if changed is None:
+            return self.iter_records()
+        aliases = set(changed)
+        for one in (graph, self.relationship_graph):
+            if one is None:
+                continue
+            for alias in changed:
+                if alias in one.index:
+                    aliases.update(one.get_sources(alias))
+        if self.streaming:
+            return [record for record in self.iter_records() if record['alias'] in aliases]
+        # the nodes are numbered in the order of the records kept in memory
+        return [self.data[node] for node in sorted(graph.index[alias] for alias in aliases if alias in graph.index)]
+
+    def scan(self, workers: int = 1, fingerprints: Dict[str, str] = None, changed: Set[str] = None,
+             affected: List[Dict] = None, graph: relationship_graph.RelationshipGraph = None) -> None:
+        """
+        Scan the data twice to validate it once the remote lookups have been done, see validate
+        When every record streamed from the file is validated, the first scan also computes the fingerprints
+        and builds the relationship graph, so that the file is only read twice
+        :param workers: optional, the number of processes used for the first scan
+        :param fingerprints: optional, the fingerprints of the records, computed if not given
+        :param changed: optional, the aliases of the records changed since the previous validation as given by
+        get_changes, only those and the records referencing them are validated again, None to validate every record
+        :param affected: optional, the records changed and the records referencing them as given by
+        get_affected_records, read again from the data if not given
+        :param graph: optional, the relationship graph of the records as given by get_changes, built if not given
+        """
+        # the relationships between records for relationship checking and context validation
+        if graph is None:
+            graph = relationship_graph.RelationshipGraph()
+        if changed is None:
+            self.first_scan_results = {}
+            records = self.iter_records()
+            if self.streaming:
+                # rather than reading the file again for each of them
+                if fingerprints is None:
+                    fingerprints = {}
+                    records = tap_records(records, fingerprints, graph)
+                else:
+                    records = tap_records(records, graph=graph)
+        else:
+            for alias in changed:
+                self.first_scan_results.pop(alias, None)
+            if not graph:
+                for record in self.iter_records():
+                    graph.add_record(record)
+            if affected is None:
+                affected = self.get_affected_records(changed, graph)
+            records = [record for record in affected if record['alias'] in changed]
+        if fingerprints is None:
+            fingerprints = {record['alias']: get_record_fingerprint(record) for record in self.iter_records()}
+        stats = self.stats
+        # first scan
+        # the results are kept separately, as the second scan adds to them
+        with stats.time('first_scan'):
+            for record, record_result in self.validate_records(workers, records=records):
+                self.first_scan_results[record['alias']] = record_result
+        with stats.time('relationship_graph'):
+            if not graph:
+                # not filled while reading the records for the first scan
+                for record in self.iter_records():
+                    graph.add_record(record)
+            graph.check_built()
+        self.relationship_graph = graph
+
+        second_scan_start = time.perf_counter()
+        # the pedigree-wide checks, reported on every record involved
+        previous_cycles = self.cycles
+        self.cycles = {}
+        for cycle in graph.find_cycles():
+            for alias in cycle:
+                self.cycles.setdefault(alias, cycle)
+        orphans = set(graph.get_orphaned_specimens())
+        # timed locally and added to the shared stats at the end rather than locking them for every record
+        relationships_timer = instrumentation.Histogram(stats.bounds)
+        context_timer = instrumentation.Histogram(stats.bounds)
+        previous_results = self.validation_results
+        affected_aliases = None if changed is None else {record['alias'] for record in affected}
+        # in the same order as the records
+        self.validation_results = {}
+        for record in self.iter_records():
+            alias = record['alias']
+            # a cycle may also be made or broken by a change to another record of the cycle
+            if affected_aliases is not None and alias not in affected_aliases and alias not in self.cycles \
+                    and alias not in previous_cycles:
+                self.validation_results[alias] = previous_results[alias]
+                continue
+            self.validation_results[alias] = self.first_scan_results[alias]
             # if the record is with status Error, no more validation will be done
-            if self.validation_results[record['alias']].get_overall_status() == VRConstants.ERROR:
+            if self.validation_results[alias].get_overall_status() == VRConstants.ERROR:
                 continue
-            record_result = self.validation_results[record['alias']]
+            record_result = self.validation_results[alias].copy()
             record_id = record['attributes'][self.id_field][0]['value']
+            start = time.perf_counter()
             # check relationship
-            relationships = record.get('sampleRelationships', [])
-            related: List[Dict] = []
-            for relationship in relationships:
+            for relationship in record.get('sampleRelationships', []):
                 if 'accession' in relationship:
                     # target is biosample accession which is checked in validation.check_usi_structure
                     target = relationship['accession']
-                    url = f"https://www.ebi.ac.uk/biosamples/samples/{target}"
-                    response = requests.get(url)
-                    status = response.status_code
+                    status = static_parameters.biosamples_library.get_status(target)
                     if status != 200:
                         record_result.add_validation_result_column(
                             VRC(VRConstants.WARNING, f"Fail to retrieve record {target} from "
@@ -155,29 +564,74 @@ class Submission:
                         # check project = IMAGE
                         # parse into memory
                         pass
+            related: List[Dict] = []
+            # in the current ruleset, derived from only from organism to specimen,
+            # so safe to only check organism
+            for target in graph.get_targets(alias):
+                related_record = graph.get_organism(target)
+                if related_record is not None:
+                    # context validation only reads the related records, so they are not copied
+                    related.append(related_record)
                 else:
-                    # in the current ruleset, derived from only from organism to specimen,
-                    # so safe to only check organism
-                    target: str = relationship['alias']
-                    if target in data_by_material['organism']:
-                        related.append(dict(data_by_material['organism'][target]))
-                    else:
-                        record_result.add_validation_result_column(
-                            VRC(VRConstants.ERROR, f"Could not locate the referenced record {target}",
-                                record_id, 'sampleRelationships', VRConstants.RELATIONSHIP))
-                self.validation_results[record['alias']] = record_result
+                    record_result.add_validation_result_column(
+                        VRC(VRConstants.ERROR, f"Could not locate the referenced record {target}",
+                            record_id, 'sampleRelationships', VRConstants.RELATIONSHIP))
+            if alias in self.cycles:
+                cycle = " -> ".join(self.cycles[alias] + self.cycles[alias][:1])
+                record_result.add_validation_result_column(
+                    VRC(VRConstants.ERROR, f"Circular relationships found: {cycle}",
+                        record_id, 'sampleRelationships', VRConstants.RELATIONSHIP))
+            if alias in orphans:
+                record_result.add_validation_result_column(
+                    VRC(VRConstants.ERROR, "Specimen is not derived from any animal",
+                        record_id, 'sampleRelationships', VRConstants.RELATIONSHIP))
+            self.validation_results[alias] = record_result
+            relationships_timer.observe(time.perf_counter() - start)
 
             # if error found during relationship checking, skip context validation
             # because some context validation (relationship check etc) could not be carried out
-            if self.validation_results[record['alias']].get_overall_status() == VRConstants.ERROR:
+            if self.validation_results[alias].get_overall_status() == VRConstants.ERROR:
                 continue
 
+            start = time.perf_counter()
             record_result = validation.context_validation(record, record_result, related)
+            context_timer.observe(time.perf_counter() - start)
 
             if record_result.is_empty():
                 record_result.add_validation_result_column(VRC("Pass", "", record_result.record_id, "",
                                                                VRConstants.EMPTY))
-            self.validation_results[record['alias']] = record_result
+            self.validation_results[alias] = record_result
+        for name, timer in [('check_relationships', relationships_timer), ('context_validation', context_timer)]:
+            if timer.count:
+                stats.merge_timer(name, timer)
+        stats.observe('second_scan', time.perf_counter() - second_scan_start)
+        self.fingerprints = fingerprints
+        self.validated_ruleset = self.ruleset
+
+    def get_stats(self) -> Dict[str, Dict]:
+        """
+        Get the statistics of the validation: the wall time of the stages, the latencies of the HTTP requests
+        made by the process, the numbers of records and failed requests and the hits and misses of the caches
+        :return: the timers and counters as given by instrumentation.Stats.get_stats, with the caches statistics
+        """
+        result = self.stats.get_stats()
+        http_stats = http_client.stats.get_stats()
+        result['timers'].update(http_stats['timers'])
+        result['counters'].update(http_stats['counters'])
+        caches = {'biosamples': static_parameters.biosamples_library.get_stats()}
+        caches.update(static_parameters.ontology_library.get_stats())
+        if self.ruleset is not None:
+            caches['ontology_decisions'] = self.ruleset.get_decision_stats()
+        result['caches'] = caches
+        return result
+
+    def get_prometheus_metrics(self, prefix: str = "image_validation") -> str:
+        """
+        Get the statistics of the validation in the Prometheus text format, see instrumentation.format_prometheus
+        :param prefix: optional, the prefix of the metric names
+        :return: the metrics
+        """
+        return instrumentation.format_prometheus(self.get_stats(), prefix)
 
     def get_validation_results(self) -> List[VRR]:
         """
@@ -4,7 +4,7 @@ Validation results are represented in three levels
 2. record level: one record has multiple fields, therefore a list of field validation results
 3. submission level: using built-in list of record validation records
 """
-from typing import List
+from typing import List, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
@@ -32,13 +32,17 @@ class ValidationResultConstant:
     PASS = "Pass"
     WARNING = "Warning"
     ERROR = "Error"
+    # the statuses are kept as numbers, the overall status of a record being the product of its field statuses
+    STATUS_IDS = {PASS: 1, ERROR: 0, WARNING: 2}
+    STATUS_NAMES = {1: "pass", 0: "error", 2: "warning"}
 
 
 class ValidationResultColumn:
     """
     The validation result for one field
+    Many results are built for a large submission, so only the attributes below are kept, without a __dict__
     """
-    status_id: int = -1
+    __slots__ = ('status_id', 'message', 'record_id', 'field_name', 'source')
 
     def __init__(self, status: str, message: str, record_id: str, field_name: str,
                  source: str = ValidationResultConstant.RULESET_BASED):
@@ -61,20 +65,43 @@ class ValidationResultColumn:
         if type(source) is not str:
             raise TypeError("Source must be a string")
 
-        self.status = status.lower()
-        if self.status == "pass":
-            self.status_id = 1
-        elif self.status == "error":
-            self.status_id = 0
-        elif self.status == "warning":
-            self.status_id = 2
-        else:
+        status_id = ValidationResultConstant.STATUS_IDS.get(status.capitalize())
+        if status_id is None:
             raise ValueError(f'invalid status value {status} which can only be pass, error or warning')
+        self.status_id = status_id
         self.message = message
         self.record_id = record_id
         self.field_name = field_name
         self.source = source
 
+    @classmethod
+    def create(cls, status: str, message: str, record_id: str, field_name: str,
+               source: str = ValidationResultConstant.RULESET_BASED) -> 'ValidationResultColumn':
+        """
+        Build the result without checking the parameters, for the results built by the validation itself
+        :param status: one of ValidationResultConstant.PASS, WARNING or ERROR
+        :param message: the detail of the warning or error, expected to be empty for pass
+        :param record_id: the record id
+        :param field_name: the field name
+        :param source: the source of the validation result
+        :return: the validation result
+        """
+        result = cls.__new__(cls)
+        result.status_id = ValidationResultConstant.STATUS_IDS[status]
+        result.message = message
+        result.record_id = record_id
+        result.field_name = field_name
+        result.source = source
+        return result
+
+    @property
+    def status(self) -> str:
+        """
+        Get the status in lower case, one of pass, error or warning
+        :return: the status
+        """
+        return ValidationResultConstant.STATUS_NAMES[self.status_id]
+
     # self.field_name is contained in the self.message
     def __str__(self) -> str:
         """
@@ -172,6 +199,7 @@ class ValidationResultRecord:
     """
     The validation result for one record which has one or more fields
     """
+    __slots__ = ('record_id', 'result_set', 'results_by_status')
     result_set: List[ValidationResultColumn]
 
     def __init__(self, record_id: str):
@@ -183,6 +211,8 @@ class ValidationResultRecord:
             raise TypeError("Record id must be a string")
         self.record_id = record_id
         self.result_set = []
+        # the field results also kept by status id as they are added, so that the status is known without a scan
+        self.results_by_status: Tuple[List[ValidationResultColumn], ...] = ([], [], [])
 
     def add_validation_result_column(self, result: ValidationResultColumn) -> None:
         """
@@ -195,21 +225,29 @@ class ValidationResultRecord:
             raise ValueError('Record ids do not match, fail to add result for %s to the result set of %s'
                              % (result.record_id, self.record_id))
         self.result_set.append(result)
+        self.results_by_status[result.status_id].append(result)
+
+    def copy(self) -> 'ValidationResultRecord':
+        """
+        Get a copy which can be extended without changing this result
+        :return: the copy sharing the same field results
+        """
+        result = ValidationResultRecord(self.record_id)
+        result.result_set = list(self.result_set)
+        result.results_by_status = tuple(list(one) for one in self.results_by_status)
+        return result
 
     def get_overall_status(self) -> str:
         """
         Get the status of validation result for the record which is computed from all related field results
+        i.e. error if any field result is an error, otherwise warning if any is a warning
         :return: record validation status, one of pass, warning or error
         """
-        result = 1
-        for one in self.result_set:
-            result = result * one.status_id
-        if result == 1:
-            return ValidationResultConstant.PASS
-        elif result == 0:
+        if self.results_by_status[ValidationResultConstant.STATUS_IDS[ValidationResultConstant.ERROR]]:
             return ValidationResultConstant.ERROR
-        else:
+        elif self.results_by_status[ValidationResultConstant.STATUS_IDS[ValidationResultConstant.WARNING]]:
             return ValidationResultConstant.WARNING
+        return ValidationResultConstant.PASS
 
     def get_size(self) -> int:
         """
@@ -222,18 +260,14 @@ class ValidationResultRecord:
         """
         Get list of field validation results with same status
         :param status: status the results share
-        :return: a list of field validation results
+        :return: a copy of the list of field validation results
         """
         if type(status) is not str:
             raise TypeError("The status parameter must be a string")
-        status = status.lower()
-        if status != 'pass' and status != 'warning' and status != 'error':
+        status_id = ValidationResultConstant.STATUS_IDS.get(status.capitalize())
+        if status_id is None:
             raise ValueError("status must be one of Pass, Warning, or Error")
-        result: List[ValidationResultColumn] = []
-        for one in self.result_set:
-            if one.status == status:
-                result.append(one)
-        return result
+        return list(self.results_by_status[status_id])
 
     # inclusive indicates whether include warning message if status is error
     def get_messages(self, inclusive=True) -> List[str]:
@@ -0,0 +1,100 @@
+"""
+check whether the records referenced by accession in relationships exist in BioSamples
+"""
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Optional, Set
+
+import requests
+
+from . import http_client
+from . import cache_backends
+
+logger = logging.getLogger(__name__)
+
+# the base URL of the records, e.g. to use image_validation.stand_in_server
+BIOSAMPLES_URL = os.environ.get("IMAGE_VALIDATION_BIOSAMPLES_URL", "https://www.ebi.ac.uk/biosamples/samples/")
+# existing records are kept for the default time to live of the backend, missing ones may be published soon
+MISSING_TTL = 24 * 3600
+# the number of statuses kept in memory by BioSamplesCache
+DEFAULT_MEMORY_SIZE = 65536
+# only the statuses telling whether the record exists are kept, not e.g. rate limiting or server errors
+CACHED_STATUSES = (200, 404)
+
+
+class BioSamplesCache:
+    """
+    The cache of the HTTP statuses of BioSamples records, so that every accession is only checked once
+    Optionally backed by a persistent storage shared across processes and runs
+    """
+    def __init__(self, backend=None, memory_size: int = DEFAULT_MEMORY_SIZE):
+        """
+        Constructor method
+        :param backend: optional, the storage shared with other processes e.g. cache_backends.SQLiteCacheBackend
+        :param memory_size: optional, the maximum number of statuses kept in memory by the cache itself
+        """
+        self.statuses: cache_backends.LRUCache = cache_backends.LRUCache(memory_size)
+        self.backend = backend
+
+    def get_missing(self, accessions: Iterable[str]) -> Set[str]:
+        """
+        Get the accessions not checked yet in the current process
+        :param accessions: the accessions
+        :return: the accessions to be checked
+        """
+        return {accession for accession in accessions if accession not in self.statuses}
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Get the numbers of hits, misses and stored statuses
+        :return: the statistics
+        """
+        return self.statuses.get_stats()
+
+    def get_status(self, accession: str) -> Optional[int]:
+        """
+        Get the HTTP status of the BioSamples record, 200 when the record exists
+        :param accession: the BioSamples accession
+        :return: the HTTP status, None if BioSamples could not be contacted
+        """
+        if type(accession) is not str:
+            raise TypeError("The accession parameter must be a string")
+        status = self.statuses.get(accession)
+        if status is not None:
+            return status
+        if self.backend is not None:
+            status = self.backend.get('biosamples', accession)
+        if status is None:
+            try:
+                status = http_client.get(BIOSAMPLES_URL + accession).status_code
+            except requests.exceptions.RequestException as e:
+                # not kept, so that it is tried again
+                logger.warning("Fail to connect to BioSamples for %s: %s", accession, e)
+                return None
+            # rate limiting and server errors are not kept either
+            if status not in CACHED_STATUSES:
+                logger.warning("BioSamples returned %d for %s", status, accession)
+                return status
+            if self.backend is not None:
+                self.backend.set('biosamples', accession, status, None if status == 200 else MISSING_TTL)
+        self.statuses[accession] = status
+        return status
+
+    def prefetch(self, accessions: Iterable[str], max_workers: int = 8) -> None:
+        """
+        Check concurrently the accessions not checked yet, so that the following lookups do not need to wait
+        :param accessions: the accessions, duplicates are only checked once
+        :param max_workers: the maximum number of concurrent BioSamples requests
+        """
+        if type(max_workers) is not int:
+            raise TypeError("The max_workers parameter must be an integer")
+        if max_workers < 1:
+            raise ValueError("The max_workers parameter must be a positive integer")
+        missing = self.get_missing(accessions)
+        if not missing:
+            return
+        logger.info("Check %d records in BioSamples", len(missing))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for _ in executor.map(self.get_status, missing):
+                pass
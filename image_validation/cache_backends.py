@@ -0,0 +1,453 @@
+"""
+storage backends used by the ontology and BioSamples caches to keep remote lookups across processes and runs
+"""
+import json
+import logging
+from abc import ABC, abstractmethod
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# one month, ontology terms used by IMAGE ruleset rarely change
+DEFAULT_TTL = 30 * 24 * 3600
+# default number of entries kept by LRUCache
+DEFAULT_MAXSIZE = 4096
+DEFAULT_REDIS_URL = "redis://localhost:6379/0"
+DEFAULT_REDIS_PREFIX = "image_validation"
+
+
+class LRUCache:
+    """
+    Keep at most maxsize values in memory, dropping the least recently used one when full
+    The numbers of hits and misses of get are counted to assess how effective the cache is
+    The entries can also be accessed like in a dict, the cache can be shared by several threads
+    """
+    def __init__(self, maxsize: int = DEFAULT_MAXSIZE):
+        """
+        Constructor method
+        :param maxsize: the maximum number of entries
+        """
+        if type(maxsize) is not int:
+            raise TypeError("The maxsize parameter must be an integer")
+        if maxsize < 1:
+            raise ValueError("The maxsize parameter must be a positive integer")
+        self.maxsize = maxsize
+        self.entries: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def __getstate__(self):
+        """
+        Locks could not be pickled
+        :return: the state to be pickled
+        """
+        state = self.__dict__.copy()
+        del state['lock']
+        return state
+
+    def __setstate__(self, state):
+        """
+        Restore the pickled state with a new lock
+        :param state: the pickled state
+        """
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.entries
+
+    def __getitem__(self, key: Hashable) -> Any:
+        with self.lock:
+            value = self.entries[key]
+            self.entries.move_to_end(key)
+            return value
+
+    def __setitem__(self, key: Hashable, value: Any) -> None:
+        self.set(key, value)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Get the value stored under the key and mark it as the most recently used
+        :param key: the key
+        :param default: the value returned when the key is not stored
+        :return: the stored value, default if not existing
+        """
+        with self.lock:
+            try:
+                value = self.entries[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """
+        Store the value under the key, dropping the least recently used entry if full
+        :param key: the key
+        :param value: the value
+        """
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            if len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def setdefault(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Get the value stored under the key, storing the default value first if not existing
+        :param key: the key
+        :param default: the value stored when the key is not stored
+        :return: the stored value
+        """
+        # checked and stored under the same lock, so that two threads never store different values
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return self.entries[key]
+            self.entries[key] = default
+            if len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+            return default
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Remove the value stored under the key
+        :param key: the key
+        :param default: the value returned when the key is not stored
+        :return: the removed value, default if not existing
+        """
+        with self.lock:
+            return self.entries.pop(key, default)
+
+    def items(self) -> List[Tuple[Hashable, Any]]:
+        """
+        Get a copy of all entries, from the least recently used one
+        :return: the list of keys and values
+        """
+        with self.lock:
+            return list(self.entries.items())
+
+    def clear(self) -> None:
+        """
+        Remove all entries, the counters are kept
+        """
+        with self.lock:
+            self.entries.clear()
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Get the numbers of hits, misses and stored entries
+        :return: the statistics
+        """
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self.entries)}
+
+
+class CacheBackend(ABC):
+    """
+    The storage interface used by the ontology and BioSamples caches, values must be JSON serializable
+    and are grouped by namespace, e.g. terms, every entry expires after its time to live
+    """
+    @abstractmethod
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        """
+        Get the value stored under the key
+        :param namespace: the group of values the key belongs to, e.g. terms
+        :param key: the key
+        :return: the stored value, None if not existing or expired
+        """
+
+    @abstractmethod
+    def set(self, namespace: str, key: str, value: Any, ttl: int = None) -> None:
+        """
+        Store the value under the key, replacing any existing one
+        :param namespace: the group of values the key belongs to, e.g. terms
+        :param key: the key
+        :param value: the value which must be JSON serializable
+        :param ttl: optional, the time to live in seconds, default to the one given to the constructor
+        """
+
+    def purge(self) -> None:
+        """
+        Remove all expired entries
+        """
+        pass
+
+    @abstractmethod
+    def clear(self) -> None:
+        """
+        Remove all entries
+        """
+
+    def close(self) -> None:
+        """
+        Release the connection if any, it will be opened again by the next lookup
+        """
+        pass
+
+
+class MemoryCacheBackend(CacheBackend):
+    """
+    Keep at most maxsize entries in the memory of the current process, dropping the least recently used one when full
+    """
+    def __init__(self, maxsize: int = DEFAULT_MAXSIZE, ttl: int = DEFAULT_TTL):
+        """
+        Constructor method
+        :param maxsize: the maximum number of entries
+        :param ttl: the default time to live of the entries in seconds
+        """
+        if type(ttl) is not int:
+            raise TypeError("The ttl parameter must be an integer")
+        self.entries = LRUCache(maxsize)
+        self.ttl = ttl
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        entry = self.entries.get((namespace, key))
+        if entry is None or entry[1] <= time.time():
+            return None
+        # values are copied as the other backends do
+        return json.loads(entry[0])
+
+    def set(self, namespace: str, key: str, value: Any, ttl: int = None) -> None:
+        if ttl is None:
+            ttl = self.ttl
+        self.entries.set((namespace, key), (json.dumps(value), time.time() + ttl))
+
+    def purge(self) -> None:
+        now = time.time()
+        for key, entry in self.entries.items():
+            if entry[1] <= now:
+                self.entries.pop(key)
+
+    def clear(self) -> None:
+        self.entries.clear()
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Store JSON serializable values into a Redis compatible key-value server, which can be shared by many workers
+    Expired entries are removed by the server itself
+    The redis package is only needed when no client is provided
+    """
+    def __init__(self, url: str = DEFAULT_REDIS_URL, ttl: int = DEFAULT_TTL, prefix: str = DEFAULT_REDIS_PREFIX,
+                 client=None):
+        """
+        Constructor method
+        :param url: the url of the server, e.g. redis://localhost:6379/0
+        :param ttl: the default time to live of the entries in seconds
+        :param prefix: the prefix of all keys, to share the server with other applications
+        :param client: optional, the client connected to the server, having the get, set, scan_iter and delete methods
+        of redis.Redis, created from the url when first used if not provided
+        """
+        if type(url) is not str:
+            raise TypeError("The url parameter must be a string")
+        if type(ttl) is not int:
+            raise TypeError("The ttl parameter must be an integer")
+        if type(prefix) is not str:
+            raise TypeError("The prefix parameter must be a string")
+        self.url = url
+        self.ttl = ttl
+        self.prefix = prefix
+        self.client = client
+
+    def __getstate__(self):
+        """
+        Clients could not be pickled, the copy will connect to the url when first used
+        :return: the state to be pickled
+        """
+        state = self.__dict__.copy()
+        state['client'] = None
+        return state
+
+    def get_client(self):
+        """
+        Get the client, connect to the server if not done yet
+        :return: the client
+        """
+        if self.client is None:
+            try:
+                import redis
+            except ImportError:
+                raise ImportError("The redis package is required to connect to " + self.url)
+            logger.debug("Connect to cache server " + self.url)
+            self.client = redis.Redis.from_url(self.url)
+        return self.client
+
+    def get_key(self, namespace: str, key: str) -> str:
+        """
+        Get the key used on the server
+        :param namespace: the group of values the key belongs to, e.g. terms
+        :param key: the key
+        :return: the key on the server
+        """
+        return f"{self.prefix}:{namespace}:{key}"
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        value = self.get_client().get(self.get_key(namespace, key))
+        if value is None:
+            return None
+        return json.loads(value)
+
+    def set(self, namespace: str, key: str, value: Any, ttl: int = None) -> None:
+        if ttl is None:
+            ttl = self.ttl
+        self.get_client().set(self.get_key(namespace, key), json.dumps(value), ex=ttl)
+
+    def clear(self) -> None:
+        client = self.get_client()
+        for key in client.scan_iter(match=self.prefix + ":*"):
+            client.delete(key)
+
+    def close(self) -> None:
+        if self.client is not None and hasattr(self.client, 'close'):
+            self.client.close()
+        self.client = None
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """
+    Store JSON serializable values into a SQLite file, every entry expires after its time to live
+    The file can be shared by several worker processes: the connection is only opened on the first lookup
+    and opened again in a forked child, SQLite takes care of the locking.
+    Within one process the connection is shared by all threads and protected by a lock
+    """
+    def __init__(self, filename: str, ttl: int = DEFAULT_TTL):
+        """
+        Constructor method
+        :param filename: the SQLite file, created if not existing
+        :param ttl: the default time to live of the entries in seconds
+        """
+        if type(filename) is not str:
+            raise TypeError("The filename parameter must be a string")
+        if type(ttl) is not int:
+            raise TypeError("The ttl parameter must be an integer")
+        self.filename = filename
+        self.ttl = ttl
+        self.connection: sqlite3.Connection = None
+        self.pid: int = None
+        self.lock = threading.RLock()
+
+    def __getstate__(self):
+        """
+        Connections and locks could not be pickled, the copy will open its own connection when first used
+        :return: the state to be pickled
+        """
+        state = self.__dict__.copy()
+        state['connection'] = None
+        state['pid'] = None
+        del state['lock']
+        return state
+
+    def __setstate__(self, state):
+        """
+        Restore the pickled state with a new lock
+        :param state: the pickled state
+        """
+        self.__dict__.update(state)
+        self.lock = threading.RLock()
+
+    def get_connection(self) -> sqlite3.Connection:
+        """
+        Get the connection to the SQLite file, open it if not done yet in the current process
+        :return: the connection
+        """
+        if self.connection is None or self.pid != os.getpid():
+            logger.debug("Open ontology cache file " + self.filename)
+            self.connection = sqlite3.connect(self.filename, timeout=30, isolation_level=None,
+                                              check_same_thread=False)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS cache (namespace TEXT NOT NULL, key TEXT NOT NULL, "
+                                    "value TEXT NOT NULL, expires REAL NOT NULL, PRIMARY KEY (namespace, key))")
+            self.pid = os.getpid()
+        return self.connection
+
+    def execute(self, sql: str, parameters: tuple = ()) -> list:
+        """
+        Execute the statement while holding the lock
+        :param sql: the SQL statement
+        :param parameters: the values bound to the statement
+        :return: the rows returned by the statement
+        """
+        with self.lock:
+            return self.get_connection().execute(sql, parameters).fetchall()
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        """
+        Get the value stored under the key
+        :param namespace: the group of values the key belongs to, e.g. terms
+        :param key: the key
+        :return: the stored value, None if not existing or expired
+        """
+        rows = self.execute("SELECT value FROM cache WHERE namespace = ? AND key = ? AND expires > ?",
+                            (namespace, key, time.time()))
+        if not rows:
+            return None
+        return json.loads(rows[0][0])
+
+    def set(self, namespace: str, key: str, value: Any, ttl: int = None) -> None:
+        """
+        Store the value under the key, replacing any existing one
+        :param namespace: the group of values the key belongs to, e.g. terms
+        :param key: the key
+        :param value: the value which must be JSON serializable
+        :param ttl: optional, the time to live in seconds, default to the one given to the constructor
+        """
+        if ttl is None:
+            ttl = self.ttl
+        self.execute(
+            "INSERT OR REPLACE INTO cache (namespace, key, value, expires) VALUES (?, ?, ?, ?)",
+            (namespace, key, json.dumps(value), time.time() + ttl))
+
+    def purge(self) -> None:
+        """
+        Remove all expired entries
+        """
+        self.execute("DELETE FROM cache WHERE expires <= ?", (time.time(),))
+
+    def clear(self) -> None:
+        """
+        Remove all entries
+        """
+        self.execute("DELETE FROM cache")
+
+    def close(self) -> None:
+        """
+        Close the connection, it will be opened again by the next lookup
+        """
+        with self.lock:
+            if self.connection is not None and self.pid == os.getpid():
+                self.connection.close()
+            self.connection = None
+            self.pid = None
+
+
+def create_backend(name: str, filename: str = "", url: str = DEFAULT_REDIS_URL, ttl: int = DEFAULT_TTL,
+                   maxsize: int = DEFAULT_MAXSIZE) -> Optional[CacheBackend]:
+    """
+    Create the backend selected by its name, the options not used by the backend are ignored
+    :param name: sqlite, redis, memory, or empty for no backend
+    :param filename: the SQLite file
+    :param url: the url of the Redis compatible server
+    :param ttl: the default time to live of the entries in seconds
+    :param maxsize: the maximum number of entries kept in memory
+    :return: the backend, None if no name given
+    """
+    if not name:
+        return None
+    if name == 'sqlite':
+        return SQLiteCacheBackend(filename, ttl)
+    if name == 'redis':
+        return RedisCacheBackend(url, ttl)
+    if name == 'memory':
+        return MemoryCacheBackend(maxsize, ttl)
+    raise ValueError(f"Unknown cache backend {name}, it must be one of sqlite, redis and memory")
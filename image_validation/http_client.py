@@ -0,0 +1,108 @@
+"""
+shared HTTP client used for all requests to OLS, Zooma and BioSamples
+connections are kept alive and pooled, requests time out and are retried with exponential backoff
+"""
+import logging
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from . import instrumentation
+
+logger = logging.getLogger(__name__)
+
+# seconds to wait for the connection and for the response
+DEFAULT_TIMEOUT = (5, 60)
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF_FACTOR = 0.5
+# maximum number of connections kept alive to each host
+DEFAULT_POOL_SIZE = 16
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+settings = {
+    'timeout': DEFAULT_TIMEOUT,
+    'retries': DEFAULT_RETRIES,
+    'backoff_factor': DEFAULT_BACKOFF_FACTOR,
+    'pool_size': DEFAULT_POOL_SIZE
+}
+
+_session: requests.Session = None
+_session_pid: int = None
+_lock = threading.Lock()
+# the latency of the requests by host, including the retries, and the numbers of failed requests
+stats = instrumentation.Stats()
+
+
+def configure(timeout=None, retries: int = None, backoff_factor: float = None, pool_size: int = None) -> None:
+    """
+    Change the settings of the HTTP client, the session is created again on the next request
+    :param timeout: seconds to wait for the server, either one number or a (connect, read) tuple
+    :param retries: the number of retries on connection errors and 429/5xx responses
+    :param backoff_factor: the retries wait backoff_factor * 2 ^ (retry number - 1) seconds
+    :param pool_size: the maximum number of connections kept alive to each host
+    """
+    global _session
+    if retries is not None and type(retries) is not int:
+        raise TypeError("The retries parameter must be an integer")
+    if pool_size is not None and type(pool_size) is not int:
+        raise TypeError("The pool_size parameter must be an integer")
+    with _lock:
+        if timeout is not None:
+            settings['timeout'] = timeout
+        if retries is not None:
+            settings['retries'] = retries
+        if backoff_factor is not None:
+            settings['backoff_factor'] = backoff_factor
+        if pool_size is not None:
+            settings['pool_size'] = pool_size
+        if _session is not None:
+            _session.close()
+        _session = None
+
+
+def get_session() -> requests.Session:
+    """
+    Get the session shared by the current process, a forked process creates its own one
+    :return: the session
+    """
+    global _session, _session_pid
+    with _lock:
+        if _session is None or _session_pid != os.getpid():
+            logger.debug("Create HTTP session")
+            retry = Retry(total=settings['retries'], backoff_factor=settings['backoff_factor'],
+                          status_forcelist=RETRY_STATUSES, raise_on_status=False)
+            adapter = HTTPAdapter(pool_connections=settings['pool_size'], pool_maxsize=settings['pool_size'],
+                                  max_retries=retry)
+            session = requests.Session()
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+            _session_pid = os.getpid()
+        return _session
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    """
+    Send a GET request using the shared session
+    :param url: the url
+    :param kwargs: other parameters accepted by requests, timeout defaults to the configured one
+    :return: the response
+    """
+    kwargs.setdefault('timeout', settings['timeout'])
+    host = urlsplit(url).netloc
+    start = time.perf_counter()
+    try:
+        response = get_session().get(url, **kwargs)
+    except requests.exceptions.RequestException:
+        stats.increment(f"http_failed:{host}")
+        raise
+    finally:
+        stats.observe(f"http:{host}", time.perf_counter() - start)
+    if response.status_code >= 500:
+        stats.increment(f"http_failed:{host}")
+    return response
@@ -0,0 +1,299 @@
+"""
+timings and counters of the validation, e.g. the wall time of every stage and the latency of the HTTP requests,
+reported as a dict or as Prometheus text, and periodic progress summaries of long running loops
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Sequence
+
+logger = logging.getLogger(__name__)
+
+# the upper bounds in seconds of the latency histograms
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 60.0)
+# the minimum number of seconds between two progress summaries
+DEFAULT_PROGRESS_INTERVAL = 10.0
+# the number of items between two checks of the time elapsed since the previous progress summary
+PROGRESS_CHECK_EVERY = 100
+
+
+class Histogram:
+    """
+    The number and the total time of the timed operations, with the number of operations by duration
+    """
+    __slots__ = ('bounds', 'buckets', 'count', 'seconds')
+
+    def __init__(self, bounds: Sequence[float] = DEFAULT_BUCKETS):
+        """
+        Constructor method
+        :param bounds: optional, the sorted upper bounds of the buckets in seconds
+        """
+        self.bounds = tuple(bounds)
+        # one more bucket for the operations longer than the last bound
+        self.buckets: List[int] = [0] * (len(self.bounds) + 1)
+        self.count: int = 0
+        self.seconds: float = 0.0
+
+    def observe(self, seconds: float) -> None:
+        """
+        Add one operation
+        :param seconds: the duration of the operation
+        """
+        self.buckets[bisect_left(self.bounds, seconds)] += 1
+        self.count += 1
+        self.seconds += seconds
+
+    def merge(self, other: 'Histogram') -> None:
+        """
+        Add the operations of the other histogram, which must use the same bounds
+        :param other: the other histogram
+        """
+        if other.bounds != self.bounds:
+            raise ValueError("The histograms do not use the same bounds")
+        for index, count in enumerate(other.buckets):
+            self.buckets[index] += count
+        self.count += other.count
+        self.seconds += other.seconds
+
+    def get_stats(self) -> Dict:
+        """
+        Get the number and the total time of the operations with the cumulative number of operations by bound
+        :return: the statistics
+        """
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip(self.bounds, self.buckets):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        buckets['+Inf'] = self.count
+        return {'count': self.count, 'seconds': self.seconds, 'buckets': buckets}
+
+
+class Stats:
+    """
+    The timers and counters of one validation, safe to be updated from several threads
+    The timed stages are also reported as spans when an OpenTelemetry tracer is given
+    """
+    def __init__(self, bounds: Sequence[float] = DEFAULT_BUCKETS, tracer=None):
+        """
+        Constructor method
+        :param bounds: optional, the upper bounds in seconds of the histogram buckets
+        :param tracer: optional, the OpenTelemetry tracer e.g. opentelemetry.trace.get_tracer(__name__)
+        """
+        self.bounds = tuple(bounds)
+        self.tracer = tracer
+        self.timers: Dict[str, Histogram] = {}
+        self.counters: Dict[str, int] = {}
+        self.lock = threading.Lock()
+
+    def __getstate__(self) -> Dict:
+        """
+        Locks and tracers could not be pickled, e.g. to send the stats back from a worker process
+        :return: the state to be pickled
+        """
+        state = self.__dict__.copy()
+        del state['lock']
+        state['tracer'] = None
+        return state
+
+    def __setstate__(self, state: Dict) -> None:
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    def observe(self, name: str, seconds: float) -> None:
+        """
+        Add one timed operation
+        :param name: the name of the timer
+        :param seconds: the duration of the operation
+        """
+        with self.lock:
+            timer = self.timers.get(name)
+            if timer is None:
+                timer = self.timers[name] = Histogram(self.bounds)
+            timer.observe(seconds)
+
+    def increment(self, name: str, count: int = 1) -> None:
+        """
+        Increment the counter
+        :param name: the name of the counter
+        :param count: optional, the increment
+        """
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + count
+
+    @contextmanager
+    def time(self, name: str) -> Iterator[None]:
+        """
+        Time the enclosed block, including when it raises an exception
+        :param name: the name of the timer
+        """
+        start = time.perf_counter()
+        try:
+            if self.tracer is None:
+                yield
+            else:
+                with self.tracer.start_as_current_span(name):
+                    yield
+        finally:
+            seconds = time.perf_counter() - start
+            self.observe(name, seconds)
+            logger.debug("%s took %.3fs", name, seconds)
+
+    def merge_timer(self, name: str, timer: Histogram) -> None:
+        """
+        Add the operations of the histogram, e.g. timed by a loop without locking the stats for every operation
+        :param name: the name of the timer
+        :param timer: the histogram, which must use the same bounds
+        """
+        with self.lock:
+            if name not in self.timers:
+                self.timers[name] = Histogram(self.bounds)
+            self.timers[name].merge(timer)
+
+    def merge(self, other: 'Stats') -> None:
+        """
+        Add the timers and counters of the other stats, e.g. collected by a worker process
+        :param other: the other stats
+        """
+        with self.lock:
+            for name, timer in other.timers.items():
+                if name not in self.timers:
+                    self.timers[name] = Histogram(self.bounds)
+                self.timers[name].merge(timer)
+            for name, count in other.counters.items():
+                self.counters[name] = self.counters.get(name, 0) + count
+
+    def reset(self) -> None:
+        """
+        Remove all timers and counters
+        """
+        with self.lock:
+            self.timers = {}
+            self.counters = {}
+
+    def get_stats(self) -> Dict[str, Dict]:
+        """
+        Get the statistics of the timers and the counters
+        :return: the timers and the counters by name
+        """
+        with self.lock:
+            return {
+                'timers': {name: timer.get_stats() for name, timer in self.timers.items()},
+                'counters': dict(self.counters)
+            }
+
+
+class Progress:
+    """
+    The periodic summary of a long running loop, logging the rate and the expected remaining time
+    instead of one message per item
+    """
+    def __init__(self, action: str, total: int = None, interval: float = DEFAULT_PROGRESS_INTERVAL,
+                 progress_logger: logging.Logger = logger, level: int = logging.INFO):
+        """
+        Constructor method
+        :param action: what is done to the items, e.g. Validated
+        :param total: optional, the number of items, to log the expected remaining time
+        :param interval: optional, the minimum number of seconds between two summaries
+        :param progress_logger: optional, the logger of the summaries
+        :param level: optional, the level of the summaries
+        """
+        if total is not None and type(total) is not int:
+            raise TypeError("The total parameter must be an integer")
+        if interval < 0:
+            raise ValueError("The interval parameter must not be negative")
+        self.action = action
+        self.total = total
+        self.interval = interval
+        self.logger = progress_logger
+        self.level = level
+        self.count = 0
+        self.start = time.perf_counter()
+        self.next_log = self.start + interval
+        # the clock is only read every few items
+        self.next_check = PROGRESS_CHECK_EVERY
+
+    def update(self, count: int = 1) -> None:
+        """
+        Add the items done, logging a summary if the interval has elapsed since the previous one
+        :param count: optional, the number of items done
+        """
+        self.count += count
+        if self.count < self.next_check:
+            return
+        self.next_check = self.count + PROGRESS_CHECK_EVERY
+        now = time.perf_counter()
+        if now >= self.next_log:
+            self.next_log = now + self.interval
+            self.log(now)
+
+    def finish(self) -> None:
+        """
+        Log the final summary
+        """
+        self.log(time.perf_counter(), finished=True)
+
+    def log(self, now: float, finished: bool = False) -> None:
+        """
+        Log the summary
+        :param now: the current time as given by time.perf_counter
+        :param finished: whether all items are done
+        """
+        if not self.logger.isEnabledFor(self.level):
+            return
+        seconds = now - self.start
+        rate = self.count / seconds if seconds else 0.0
+        if finished:
+            self.logger.log(self.level, "%s %d records in %.1fs, %.1f records/s", self.action, self.count, seconds,
+                            rate)
+        elif self.total and rate:
+            self.logger.log(self.level, "%s %d/%d records, %.1f records/s, ETA %.0fs", self.action, self.count,
+                            self.total, rate, max(0, self.total - self.count) / rate)
+        else:
+            self.logger.log(self.level, "%s %d records, %.1f records/s", self.action, self.count, rate)
+
+
+def escape_label(value: str) -> str:
+    """
+    Escape the label value for the Prometheus text format
+    :param value: the label value
+    :return: the escaped value
+    """
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_prometheus(stats: Dict[str, Dict], prefix: str = "image_validation") -> str:
+    """
+    Format the statistics in the Prometheus text exposition format
+    the timers become the histogram {prefix}_duration_seconds and the counters the counter {prefix}_events_total,
+    both labelled by name, the caches become the counters {prefix}_cache_hits_total and _misses_total
+    and the gauge {prefix}_cache_size labelled by cache
+    :param stats: the statistics as given by Stats.get_stats, optionally with the statistics of the caches by name
+    under caches
+    :param prefix: optional, the prefix of the metric names
+    :return: the metrics
+    """
+    lines: List[str] = []
+    if stats.get('timers'):
+        metric = f"{prefix}_duration_seconds"
+        lines.append(f"# TYPE {metric} histogram")
+        for name, timer in sorted(stats['timers'].items()):
+            label = escape_label(name)
+            for bound, count in timer['buckets'].items():
+                lines.append(f'{metric}_bucket{{name="{label}",le="{bound}"}} {count}')
+            lines.append(f'{metric}_sum{{name="{label}"}} {timer["seconds"]}')
+            lines.append(f'{metric}_count{{name="{label}"}} {timer["count"]}')
+    if stats.get('counters'):
+        metric = f"{prefix}_events_total"
+        lines.append(f"# TYPE {metric} counter")
+        for name, count in sorted(stats['counters'].items()):
+            lines.append(f'{metric}{{name="{escape_label(name)}"}} {count}')
+    if stats.get('caches'):
+        for key, metric_type in [('hits', 'counter'), ('misses', 'counter'), ('size', 'gauge')]:
+            metric = f"{prefix}_cache_{key}_total" if metric_type == 'counter' else f"{prefix}_cache_{key}"
+            lines.append(f"# TYPE {metric} {metric_type}")
+            for name, cache_stats in sorted(stats['caches'].items()):
+                lines.append(f'{metric}{{cache="{escape_label(name)}"}} {cache_stats[key]}')
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,158 @@
+"""
+incremental reading of the records stored in a JSON array,
+so that very large submissions do not need to be loaded into memory at once
+"""
+import json
+import logging
+from typing import Any, Dict, Iterator
+
+logger = logging.getLogger(__name__)
+
+# characters read from the file at a time
+CHUNK_SIZE = 1 << 16
+# the maximum number of characters of one value, so that a malformed file is not read into memory
+MAX_VALUE_SIZE = 1 << 26
+# the errors this close to the end of the buffer may be caused by a value continuing in the next chunk
+# e.g. a literal or an escape sequence cut in the middle
+TRUNCATION_MARGIN = 16
+WHITESPACE = ' \t\n\r'
+
+
+class NotArrayError(ValueError):
+    """
+    Raised when the records to be read are not stored in a JSON array
+    """
+    pass
+
+
+class JSONStreamReader:
+    """
+    Decode JSON values one by one from a file, keeping in memory only the part of the file not decoded yet
+    """
+    decoder = json.JSONDecoder()
+
+    def __init__(self, infile, chunk_size: int = CHUNK_SIZE, max_value_size: int = MAX_VALUE_SIZE):
+        """
+        Constructor method
+        :param infile: the file opened in text mode
+        :param chunk_size: the number of characters read at a time
+        :param max_value_size: the maximum number of characters of one value
+        """
+        self.infile = infile
+        self.chunk_size = chunk_size
+        self.max_value_size = max_value_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def read_more(self, size: int = 0) -> bool:
+        """
+        Append the next chunk of the file to the buffer, dropping the already decoded part
+        :param size: optional, the number of characters to read if more than the chunk size
+        :return: False when the end of file has been reached
+        """
+        if self.eof:
+            return False
+        chunk = self.infile.read(max(size, self.chunk_size))
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """
+        Skip the whitespaces and get the next character without consuming it
+        :return: the next character, empty at the end of file
+        """
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.read_more():
+                return ""
+
+    def expect(self, char: str) -> None:
+        """
+        Consume the next character which must be the expected one
+        :param char: the expected character, e.g. a comma
+        """
+        if self.peek() != char:
+            raise json.JSONDecodeError(f"Expecting '{char}' delimiter", self.buffer, self.pos)
+        self.pos += 1
+
+    def decode(self) -> Any:
+        """
+        Decode the next JSON value, reading more of the file until the value is complete
+        :return: the decoded value
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError as e:
+                # only a value cut at the end of the buffer may be completed by reading more
+                truncated = e.pos >= len(self.buffer) - TRUNCATION_MARGIN or e.msg.startswith("Unterminated string")
+                if truncated and self.read_pending():
+                    continue
+                raise
+            # a number at the end of buffer may continue in the next chunk
+            if end == len(self.buffer) and self.read_pending():
+                continue
+            self.pos = end
+            return value
+
+    def read_pending(self) -> bool:
+        """
+        Read more of the value being decoded, as much as already read, so that the value is decoded
+        a number of times logarithmic in its size
+        :return: False when the end of file has been reached
+        """
+        pending = len(self.buffer) - self.pos
+        if pending >= self.max_value_size:
+            raise json.JSONDecodeError(f"Value longer than {self.max_value_size} characters", self.buffer, self.pos)
+        return self.read_more(min(pending, self.max_value_size - pending))
+
+
+def iter_json_array(filename: str, section: str = '', chunk_size: int = CHUNK_SIZE,
+                    max_value_size: int = MAX_VALUE_SIZE) -> Iterator[Dict]:
+    """
+    Iterate over the elements of the JSON array stored in the file
+    The file either contains the array, or an object having the array as the value of the section
+    Other sections are decoded to be skipped, so they are expected to be small
+    :param filename: the JSON file
+    :param section: optional, the name of the section which contains the array
+    :param chunk_size: the number of characters read at a time
+    :param max_value_size: the maximum number of characters of one element
+    :return: iterator of the elements
+    """
+    with open(filename) as infile:
+        reader = JSONStreamReader(infile, chunk_size, max_value_size)
+        if section and reader.peek() == '{':
+            reader.expect('{')
+            while reader.peek() != '}':
+                key = reader.decode()
+                reader.expect(':')
+                if key == section:
+                    break
+                logger.debug(f"Skip section {key}")
+                reader.decode()
+                if reader.peek() == ',':
+                    reader.expect(',')
+            else:
+                raise NotArrayError(f"Could not find section {section}")
+        char = reader.peek()
+        if char == '':
+            raise json.JSONDecodeError("Expecting value", reader.buffer, reader.pos)
+        if char != '[':
+            raise NotArrayError("The data is not stored in an array")
+        reader.expect('[')
+        if reader.peek() == ']':
+            return
+        while True:
+            yield reader.decode()
+            if reader.peek() == ']':
+                return
+            reader.expect(',')
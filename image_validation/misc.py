@@ -1,6 +1,21 @@
 import re
+import calendar
 import datetime
-import dateutil.parser
+from functools import lru_cache
+
+# the number of distinct values remembered by each validator below, the same values are used by many records
+MEMO_SIZE = 4096
+
+EMAIL_PATTERN = re.compile(r"^(mailto:)?[a-z0-9._%+-]+@[a-z0-9.-]+\.[a-z]{2,}$")
+EMAIL_ONLY_PATTERN = re.compile(r"^[a-z0-9._%+-]+@[a-z0-9.-]+\.[a-z]{2,}$")
+# https://stackoverflow.com/questions/161738/what-is-the-best-regular-expression-to-check-if-a-string-is-a-valid-url
+URL_PATTERN = re.compile(r"^((http|ftp)s?:\/\/)?(www\.)?[-a-zA-Z0-9@:%._\+~#=]{2,256}\.[a-z]{2,6}\b"
+                         r"([-a-zA-Z0-9@:%_\+.~#?&\/=]*)$")
+# the number after "10." starts from 1000, so \d{4,}
+DOI_PREFIX_PATTERN = re.compile(r"^(doi:)?10\.(\d{4,})(\.\d+)?$")
+BIOSAMPLE_PATTERN = re.compile(r"^SAM(N|D|EA)\d+$")
+# YYYY, YYYY-MM or YYYY-MM-DD
+DATE_PATTERN = re.compile(r"^(\d{4})(?:-(\d{2})(?:-(\d{2}))?)?$", re.ASCII)
 
 
 def get_today() -> str:
@@ -41,6 +56,7 @@ def from_lower_camel_case(lower_camel: str) -> str:
 # https://www.regular-expressions.info/email.html
 # more sophisticated case below, probably over kill
 # https://stackoverflow.com/questions/201323/how-to-validate-an-email-address-using-a-regular-expression
+@lru_cache(maxsize=MEMO_SIZE)
 def is_email(email: str, only: bool = False) -> bool:
     """
     check whether a string is a valid email address
@@ -55,15 +71,14 @@ def is_email(email: str, only: bool = False) -> bool:
     # if only:
     # pattern = re.compile(
     # "^(?:[a-z0-9!#$%&'*+\/=?^_`{|}~-]+(?:\.[a-z0-9!#$%&'*+\/=?^_`{|}~-]+)*|\"(?:[\x01-\x08\x0b\x0c\x0e-\x1f\x21\x23-\x5b\x5d-\x7f]|\\[\x01-\x09\x0b\x0c\x0e-\x7f])*\")@(?:(?:[a-z0-9](?:[a-z0-9-]*[a-z0-9])?\.)+[a-z0-9](?:[a-z0-9-]*[a-z0-9])?|\[(?:(?:(2(5[0-5]|[0-4][0-9])|1[0-9][0-9]|[1-9]?[0-9]))\.){3}(?:(2(5[0-5]|[0-4][0-9])|1[0-9][0-9]|[1-9]?[0-9])|[a-z0-9-]*[a-z0-9]:(?:[\x01-\x08\x0b\x0c\x0e-\x1f\x21-\x5a\x53-\x7f]|\\[\x01-\x09\x0b\x0c\x0e-\x7f])+)\])$")
-    pattern = re.compile(r"^(mailto:)?[a-z0-9._%+-]+@[a-z0-9.-]+\.[a-z]{2,}$")
-    if only:
-        pattern = re.compile(r"^[a-z0-9._%+-]+@[a-z0-9.-]+\.[a-z]{2,}$")
-    m = re.search(pattern, email.lower())
+    pattern = EMAIL_ONLY_PATTERN if only else EMAIL_PATTERN
+    m = pattern.match(email.lower())
     if m:
         return True
     return False
 
 
+@lru_cache(maxsize=MEMO_SIZE)
 def is_url(url: str) -> bool:
     """
     check whether a string is a valid URI
@@ -72,16 +87,14 @@ def is_url(url: str) -> bool:
     """
     if type(url) is not str:
         raise TypeError("The method only take str as its input")
-    # https://stackoverflow.com/questions/161738/what-is-the-best-regular-expression-to-check-if-a-string-is-a-valid-url
-    pattern = re.compile(r"^((http|ftp)s?:\/\/)?(www\.)?[-a-zA-Z0-9@:%._\+~#=]{2,256}\.[a-z]{2,6}\b"
-                         r"([-a-zA-Z0-9@:%_\+.~#?&\/=]*)$")
-    m = re.search(pattern, url)
+    m = URL_PATTERN.match(url)
     if m:
         return True
     return False
 
 
 # https://www.doi.org/doi_handbook/2_Numbering.html#2.2
+@lru_cache(maxsize=MEMO_SIZE)
 def is_doi(doi: str) -> bool:
     """
     check whether a string is a valid DOI
@@ -94,10 +107,8 @@ def is_doi(doi: str) -> bool:
     parts = doi.split('/')
     if len(parts) != 2:
         return False
-    # the number after "10." starts from 1000, so \d{4,}
-    pattern = re.compile(r"^(doi:)?10\.(\d{4,})(\.\d+)?$")
     # group(1) could be None
-    m = re.search(pattern, parts[0])
+    m = DOI_PREFIX_PATTERN.match(parts[0])
     if m:
         return True
     else:
@@ -112,8 +123,7 @@ def is_biosample_record(accession: str) -> bool:
     """
     if type(accession) is not str:
         raise TypeError("The method only takes str as its input")
-    pattern = re.compile(r"^SAM(N|D|EA)\d+$")
-    m = re.search(pattern, accession)
+    m = BIOSAMPLE_PATTERN.match(accession)
     if m:
         return True
     else:
@@ -121,6 +131,7 @@ def is_biosample_record(accession: str) -> bool:
 
 
 # date_format is validated in the allowed value of units
+@lru_cache(maxsize=MEMO_SIZE)
 def get_matched_date(date: str, date_format: str) -> str:
     """
     Check whether the date string matches the date format.
@@ -144,10 +155,20 @@ def get_matched_date(date: str, date_format: str) -> str:
         elmt_format = elmts_format[i]
         if len(val) != len(elmt_format):
             return not_matched_str
-    try:
-        dateutil.parser.parse(date, yearfirst=True)
-    except ValueError:
+    # strict parsing of the structure already checked, a valid date has only digits for a year, month and day
+    m = DATE_PATTERN.match(date)
+    if not m:
+        return "Unrecognized date value " + date
+    year, month, day = m.groups()
+    year = int(year)
+    if year < datetime.MINYEAR:
         return "Unrecognized date value " + date
+    if month is not None:
+        month = int(month)
+        if not 1 <= month <= 12:
+            return "Unrecognized date value " + date
+        if day is not None and not 1 <= int(day) <= calendar.monthrange(year, month)[1]:
+            return "Unrecognized date value " + date
     return ""
 
 
@@ -164,3 +185,21 @@ def extract_ontology_id_from_iri(url: str) -> str:
         return elmts[-1]
     else:
         return url
+
+
+# ontologies not published under the OBO PURL namespace
+IRI_PREFIXES = {
+    'EFO': 'http://www.ebi.ac.uk/efo/'
+}
+
+
+def get_iri_from_short_term(short_term: str) -> str:
+    """
+    Build the iri of ontology from its short term following the OBO convention
+    :param short_term: short term of ontology, e.g. PATO_0000384
+    :return: iri of ontology, e.g. http://purl.obolibrary.org/obo/PATO_0000384
+    """
+    if type(short_term) is not str:
+        raise TypeError("The method only take str as its input")
+    prefix = short_term.split('_', 1)[0]
+    return IRI_PREFIXES.get(prefix, 'http://purl.obolibrary.org/obo/') + short_term
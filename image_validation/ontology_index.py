@@ -0,0 +1,220 @@
+"""
+local index of ontology terms loaded from OBO or OBO Graphs JSON dumps
+which allows to validate ontology terms without contacting OLS
+"""
+import json
+import logging
+from typing import Any, Dict, FrozenSet, List, Set
+
+from . import misc
+
+logger = logging.getLogger(__name__)
+
+
+class OntologyIndex:
+    """
+    The in memory index of ontology terms and their ancestors
+    The ancestors of a term (transitive closure of is_a relationships) are computed the first time
+    the term is queried and kept, so that checking whether one term is the descendant of another one is a set lookup
+    """
+    def __init__(self):
+        """
+        Constructor method
+        """
+        # term details represented in the same way as OLS does
+        self.terms: Dict[str, Dict[str, Any]] = {}
+        # direct parents (is_a) of each term
+        self.parents: Dict[str, Set[str]] = {}
+        # terms which are the direct parent of at least one term
+        self.with_children: Set[str] = set()
+        # transitive closure of parents, memoised per queried term
+        self.ancestors: Dict[str, FrozenSet[str]] = {}
+
+    def load(self, filename: str) -> None:
+        """
+        Load terms from the file, the format is determined by the extension: .json for OBO Graphs, OBO otherwise
+        :param filename: the ontology dump
+        """
+        if type(filename) is not str:
+            raise TypeError("The filename parameter must be a string")
+        logger.info("Load ontology terms from " + filename)
+        if filename.lower().endswith(".json"):
+            self.load_obographs(filename)
+        else:
+            self.load_obo(filename)
+
+    def load_obo(self, filename: str) -> None:
+        """
+        Load terms from an OBO flat file
+        :param filename: the OBO file
+        """
+        ontology_name = ""
+        current: Dict[str, Any] = None
+        with open(filename) as infile:
+            for line in infile:
+                line = line.strip()
+                if not line or line.startswith('!'):
+                    continue
+                if line.startswith('['):
+                    self.add_obo_stanza(current, ontology_name)
+                    current = {'synonyms': [], 'is_a': []} if line == '[Term]' else None
+                    continue
+                if ':' not in line:
+                    continue
+                tag, value = line.split(':', 1)
+                value = value.split(' ! ', 1)[0].strip()
+                if current is None:
+                    if tag == 'ontology' and not ontology_name:
+                        ontology_name = value.lower()
+                elif tag == 'id':
+                    current['id'] = value
+                elif tag == 'name':
+                    current['name'] = value
+                elif tag == 'synonym':
+                    # synonym: "text" EXACT []
+                    current['synonyms'].append(value.split('"')[1])
+                elif tag == 'is_a':
+                    current['is_a'].append(value.split()[0])
+                elif tag == 'is_obsolete' and value == 'true':
+                    current['obsolete'] = True
+            self.add_obo_stanza(current, ontology_name)
+
+    def add_obo_stanza(self, stanza: Dict[str, Any], ontology_name: str) -> None:
+        """
+        Add the term described in one OBO [Term] stanza
+        :param stanza: the parsed stanza, None for not term stanzas
+        :param ontology_name: the name of the ontology the term is defined in
+        """
+        if not stanza or 'id' not in stanza or stanza.get('obsolete', False):
+            return
+        short_term = stanza['id'].replace(':', '_')
+        parents = [parent.replace(':', '_') for parent in stanza['is_a']]
+        self.add_term(short_term, stanza.get('name', ""), stanza['synonyms'], parents,
+                      ontology_name or short_term.split('_', 1)[0].lower())
+
+    def load_obographs(self, filename: str) -> None:
+        """
+        Load terms from an OBO Graphs JSON file
+        :param filename: the JSON file
+        """
+        with open(filename) as infile:
+            data = json.load(infile)
+        for graph in data['graphs']:
+            ontology_name = misc.extract_ontology_id_from_iri(graph.get('id', '')).split('.')[0].lower()
+            parents: Dict[str, List[str]] = {}
+            for edge in graph.get('edges', []):
+                if edge['pred'] == 'is_a':
+                    parents.setdefault(edge['sub'], []).append(misc.extract_ontology_id_from_iri(edge['obj']))
+            for node in graph.get('nodes', []):
+                if node.get('type', 'CLASS') != 'CLASS':
+                    continue
+                meta = node.get('meta', {})
+                if meta.get('deprecated', False):
+                    continue
+                synonyms = [synonym['val'] for synonym in meta.get('synonyms', [])]
+                short_term = misc.extract_ontology_id_from_iri(node['id'])
+                self.add_term(short_term, node.get('lbl', ""), synonyms, parents.get(node['id'], []),
+                              ontology_name or short_term.split('_', 1)[0].lower(), node['id'])
+
+    def add_term(self, short_term: str, label: str, synonyms: List[str], parents: List[str],
+                 ontology_name: str, iri: str = "") -> None:
+        """
+        Add one term to the index
+        :param short_term: the short term, e.g. PATO_0000384
+        :param label: the label of the term
+        :param synonyms: the synonyms of the term
+        :param parents: the short terms of the direct parents
+        :param ontology_name: the name of ontology defining the term
+        :param iri: optional, the iri of the term, built from the short term if not provided
+        """
+        if not iri:
+            iri = misc.get_iri_from_short_term(short_term)
+        self.terms[short_term] = {
+            'iri': iri,
+            'label': label,
+            'synonyms': synonyms,
+            'ontology_name': ontology_name,
+            'short_form': short_term,
+            'is_defining_ontology': True,
+            'has_children': short_term in self.with_children
+        }
+        self.parents.setdefault(short_term, set()).update(parents)
+        for parent in parents:
+            self.with_children.add(parent)
+            if parent in self.terms:
+                self.terms[parent]['has_children'] = True
+        # memoised closures may be extended by the new relationships
+        self.ancestors = {}
+
+    def contains(self, short_term: str) -> bool:
+        """
+        Check whether the index contains the term
+        :param short_term: short term or iri
+        :return: True if the term is in the index
+        """
+        return misc.extract_ontology_id_from_iri(short_term) in self.terms
+
+    def get_detail(self, short_term: str) -> Dict[str, Any]:
+        """
+        Get the detail of the term represented in the same way as OLS does
+        :param short_term: short term or iri
+        :return: the term detail, None if not in the index
+        """
+        short_term = misc.extract_ontology_id_from_iri(short_term)
+        if short_term not in self.terms:
+            return None
+        return self.terms[short_term]
+
+    def get_ancestors(self, short_term: str) -> FrozenSet[str]:
+        """
+        Get all ancestors of the term, not including the term itself
+        :param short_term: short term or iri
+        :return: the set of ancestor short terms
+        """
+        short_term = misc.extract_ontology_id_from_iri(short_term)
+        ancestors = self.ancestors.get(short_term)
+        if ancestors is None:
+            if short_term not in self.parents:
+                return frozenset()
+            ancestors = self.compute_ancestors(short_term)
+        return ancestors
+
+    def compute_ancestors(self, short_term: str) -> FrozenSet[str]:
+        """
+        Compute the ancestors of the term, memoising the closure of the term and of every ancestor visited
+        :param short_term: the short term
+        :return: the set of ancestor short terms
+        """
+        ancestors = self.ancestors
+        # iterative depth first visit, parents are resolved before their children
+        stack = [short_term]
+        visiting = set()
+        while stack:
+            current = stack[-1]
+            if current in ancestors:
+                stack.pop()
+                continue
+            pending = [parent for parent in self.parents.get(current, ())
+                       if parent not in ancestors and parent not in visiting]
+            if pending and current not in visiting:
+                visiting.add(current)
+                stack.extend(pending)
+                continue
+            closure = set()
+            for parent in self.parents.get(current, ()):
+                closure.add(parent)
+                closure.update(ancestors.get(parent, ()))
+            closure.discard(current)
+            ancestors[current] = frozenset(closure)
+            visiting.discard(current)
+            stack.pop()
+        return ancestors[short_term]
+
+    def has_parent(self, child_term: str, parent_term: str) -> bool:
+        """
+        check whether two ontology terms have parent-child relationship
+        :param child_term: the child term
+        :param parent_term: the parent term
+        :return: True if the child term is a descendant of the parent term
+        """
+        return misc.extract_ontology_id_from_iri(parent_term) in self.get_ancestors(child_term)
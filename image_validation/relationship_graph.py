@@ -0,0 +1,256 @@
+"""
+the graph of relationships between the records of a submission, built once and then used by the context validation
+nodes are records identified by their aliases, edges are the relationships typed by their nature
+the edges are stored in adjacency arrays in both directions, so that the records related to
+or referencing a record are found and the pedigree-wide checks are done without scanning the submission again
+"""
+import logging
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+ORGANISM = 'organism'
+SPECIMEN = 'specimen from organism'
+DERIVED_FROM = 'derived from'
+CHILD_OF = 'child of'
+# the relationships which must not lead back to the record itself
+PEDIGREE_NATURES = (DERIVED_FROM, CHILD_OF)
+# the target of an edge referencing a record not in the submission
+MISSING = -1
+# the states of the nodes in the cycle search, other than their position on the current path
+NOT_VISITED = -1
+DONE = -2
+
+
+class RelationshipGraph:
+    """
+    The relationships between records referenced by alias, relationships referencing BioSamples accessions
+    are only counted as they are checked against BioSamples
+    Only organism records are kept, as they are the only ones related records can be, which keeps the memory bounded
+    when the records are streamed
+    """
+    def __init__(self, records: Iterable[Dict] = ()):
+        """
+        Constructor method
+        :param records: optional, the records to be added, the graph is built once they are all added
+        """
+        self.aliases: List[str] = []
+        self.index: Dict[str, int] = {}
+        self.organisms: Dict[str, Dict] = {}
+        self.specimens: List[int] = []
+        self.natures: List[str] = []
+        self.nature_ids: Dict[str, int] = {}
+        # the relationships by alias as added, resolved into the adjacency arrays by build
+        self.pending: List[Tuple[int, str, int]] = []
+        # the number of relationships referencing BioSamples accessions by record and nature
+        self.accessions: Dict[Tuple[int, int], int] = {}
+        # adjacency arrays: the edges of node i are from offsets[i] to offsets[i + 1]
+        self.offsets = array('l', [0])
+        self.targets = array('l')
+        # the aliases the relationships reference, also for the records not in the submission
+        self.target_aliases: List[str] = []
+        self.edge_natures = array('l')
+        # reverse adjacency arrays: the records referencing node i are from reverse_offsets[i] to reverse_offsets[i + 1]
+        self.reverse_offsets = array('l', [0])
+        self.sources = array('l')
+        self.reverse_natures = array('l')
+        self.built = False
+        for record in records:
+            self.add_record(record)
+        if self.aliases:
+            self.build()
+
+    def __len__(self):
+        return len(self.aliases)
+
+    def get_nature_id(self, nature: str) -> int:
+        """
+        Get the number standing for the relationship nature in the adjacency arrays
+        :param nature: the relationship nature, e.g. derived from
+        :return: the number of the nature
+        """
+        if nature not in self.nature_ids:
+            self.nature_ids[nature] = len(self.natures)
+            self.natures.append(nature)
+        return self.nature_ids[nature]
+
+    def add_record(self, record: Dict) -> None:
+        """
+        Add the record and its relationships, the records referenced may be added later
+        :param record: the record which has passed the usi structure check
+        """
+        if type(record) is not dict:
+            raise TypeError("The record needs to be represented as a Dict")
+        alias = record['alias']
+        if alias in self.index:
+            raise ValueError(f"Two records use the same alias {alias}")
+        node = len(self.aliases)
+        self.index[alias] = node
+        self.aliases.append(alias)
+        self.built = False
+        try:
+            material = record['attributes']['Material'][0]['value'].lower()
+            if material == ORGANISM:
+                self.organisms[alias] = record
+            elif material == SPECIMEN:
+                self.specimens.append(node)
+        except KeyError:
+            # error still exists, e.g. using material rather than Material, which needs to be caught
+            # however the reporting should have already been done by validation
+            pass
+        for relationship in record.get('sampleRelationships', []):
+            nature_id = self.get_nature_id(relationship.get('relationshipNature', ''))
+            if 'alias' in relationship:
+                self.pending.append((node, relationship['alias'], nature_id))
+            else:
+                key = (node, nature_id)
+                self.accessions[key] = self.accessions.get(key, 0) + 1
+
+    def build(self) -> None:
+        """
+        Resolve the relationships into the adjacency arrays in both directions, in linear time
+        """
+        size = len(self.aliases)
+        counts = [0] * (size + 1)
+        reverse_counts = [0] * (size + 1)
+        resolved = []
+        for source, target_alias, nature_id in self.pending:
+            target = self.index.get(target_alias, MISSING)
+            resolved.append((source, target, target_alias, nature_id))
+            counts[source + 1] += 1
+            if target != MISSING:
+                reverse_counts[target + 1] += 1
+        for i in range(size):
+            counts[i + 1] += counts[i]
+            reverse_counts[i + 1] += reverse_counts[i]
+        self.offsets = array('l', counts)
+        self.reverse_offsets = array('l', reverse_counts)
+        self.targets = array('l', [0] * len(resolved))
+        self.target_aliases = [''] * len(resolved)
+        self.edge_natures = array('l', [0] * len(resolved))
+        self.sources = array('l', [0] * reverse_counts[size])
+        self.reverse_natures = array('l', [0] * reverse_counts[size])
+        # the relationships are added in the order of the records, which keeps them in order within a record
+        filled = counts[:size]
+        reverse_filled = reverse_counts[:size]
+        for source, target, target_alias, nature_id in resolved:
+            position = filled[source]
+            self.targets[position] = target
+            self.target_aliases[position] = target_alias
+            self.edge_natures[position] = nature_id
+            filled[source] += 1
+            if target != MISSING:
+                position = reverse_filled[target]
+                self.sources[position] = source
+                self.reverse_natures[position] = nature_id
+                reverse_filled[target] += 1
+        self.built = True
+
+    def check_built(self) -> None:
+        """
+        Build the adjacency arrays if records have been added since they were built
+        """
+        if not self.built:
+            self.build()
+
+    def get_node(self, alias: str) -> int:
+        """
+        Get the node of the record
+        :param alias: the alias of the record
+        :return: the node number
+        """
+        if alias not in self.index:
+            raise ValueError(f"No record found with the alias {alias}")
+        return self.index[alias]
+
+    def get_targets(self, alias: str, nature: Optional[str] = None) -> List[str]:
+        """
+        Get the records referenced by the record, including the ones not in the submission
+        :param alias: the alias of the record
+        :param nature: optional, only the relationships of this nature
+        :return: the aliases of the referenced records in the order of the relationships
+        """
+        self.check_built()
+        node = self.get_node(alias)
+        nature_id = self.nature_ids.get(nature, MISSING) if nature is not None else None
+        return [self.target_aliases[position] for position in range(self.offsets[node], self.offsets[node + 1])
+                if nature_id is None or self.edge_natures[position] == nature_id]
+
+    def get_sources(self, alias: str, nature: Optional[str] = None) -> List[str]:
+        """
+        Get the records referencing the record, i.e. the reverse edges
+        :param alias: the alias of the record
+        :param nature: optional, only the relationships of this nature
+        :return: the aliases of the records referencing the record
+        """
+        self.check_built()
+        node = self.get_node(alias)
+        nature_id = self.nature_ids.get(nature, MISSING) if nature is not None else None
+        start, end = self.reverse_offsets[node], self.reverse_offsets[node + 1]
+        return [self.aliases[self.sources[position]] for position in range(start, end)
+                if nature_id is None or self.reverse_natures[position] == nature_id]
+
+    def get_organism(self, alias: str) -> Optional[Dict]:
+        """
+        Get the organism record
+        :param alias: the alias of the record
+        :return: the record, None if no organism record uses the alias
+        """
+        return self.organisms.get(alias)
+
+    def find_cycles(self, natures: Iterable[str] = PEDIGREE_NATURES) -> List[List[str]]:
+        """
+        Find the records which are their own ancestors following the relationships, in linear time
+        :param natures: optional, the natures of the relationships followed, default to derived from and child of
+        :return: the cycles, each as the list of aliases along the relationships, starting from the first record
+        """
+        self.check_built()
+        followed = {self.nature_ids[nature] for nature in natures if nature in self.nature_ids}
+        size = len(self.aliases)
+        # the position of the node on the current path, NOT_VISITED before and DONE after
+        on_path = array('l', [NOT_VISITED]) * size
+        cycles: List[List[str]] = []
+        for start in range(size):
+            if on_path[start] != NOT_VISITED:
+                continue
+            # iterative depth first search, every node and edge is visited once
+            path = [start]
+            positions = [self.offsets[start]]
+            on_path[start] = 0
+            while path:
+                node = path[-1]
+                position = positions[-1]
+                if position == self.offsets[node + 1]:
+                    on_path[node] = DONE
+                    path.pop()
+                    positions.pop()
+                    continue
+                positions[-1] += 1
+                target = self.targets[position]
+                if target == MISSING or self.edge_natures[position] not in followed:
+                    continue
+                if on_path[target] >= 0:
+                    cycles.append([self.aliases[one] for one in path[on_path[target]:]])
+                elif on_path[target] == NOT_VISITED:
+                    on_path[target] = len(path)
+                    path.append(target)
+                    positions.append(self.offsets[target])
+        return cycles
+
+    def get_orphaned_specimens(self) -> List[str]:
+        """
+        Get the specimens from organism without any derived from relationship, neither to a record of the submission
+        nor to a BioSamples record, the relationships to records which are not organisms are reported
+        by the relationship check
+        :return: the aliases of the specimens
+        """
+        self.check_built()
+        derived_from = self.nature_ids.get(DERIVED_FROM, MISSING)
+        orphans = []
+        for node in self.specimens:
+            if self.accessions.get((node, derived_from)):
+                continue
+            if derived_from not in self.edge_natures[self.offsets[node]:self.offsets[node + 1]]:
+                orphans.append(self.aliases[node])
+        return orphans
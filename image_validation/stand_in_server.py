@@ -0,0 +1,303 @@
+"""
+a lightweight local stand-in for OLS, Zooma and BioSamples answering from fixtures,
+so that the validation can be run and benchmarked offline and reproducibly, including its network behaviour
+the services are used by setting the base URLs to the ones of the server, e.g.
+python -m image_validation.stand_in_server --fixtures fixtures.json --port 8080
+IMAGE_VALIDATION_OLS_URL=http://127.0.0.1:8080/ols/api
+IMAGE_VALIDATION_ZOOMA_URL=http://127.0.0.1:8080/spot/zooma/v2/api
+IMAGE_VALIDATION_BIOSAMPLES_URL=http://127.0.0.1:8080/biosamples/samples/
+"""
+import argparse
+import json
+import logging
+import random
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Any, Dict, Iterable, List, Tuple
+from urllib.parse import parse_qs, unquote, urlencode, urlsplit
+
+from . import misc
+
+logger = logging.getLogger(__name__)
+
+OLS_PATH = "/ols/api"
+ZOOMA_PATH = "/spot/zooma/v2/api"
+BIOSAMPLES_PATH = "/biosamples/samples/"
+# the page size of OLS when none is requested
+DEFAULT_PAGE_SIZE = 20
+
+
+class ThreadingHTTPServer(socketserver.ThreadingMixIn, HTTPServer):
+    """
+    The HTTP server answering every connection in its own thread, as the validation sends concurrent requests
+    """
+    daemon_threads = True
+
+
+class StandInServer:
+    """
+    The stand-in services, with optional latency added to every response
+    and a ratio of requests answered with an error status, to exercise the retries
+    """
+    def __init__(self, fixtures: Dict[str, Any] = None, host: str = "127.0.0.1", port: int = 0,
+                 latency: float = 0.0, error_rate: float = 0.0, error_status: int = 503, seed: int = 0):
+        """
+        Constructor method
+        :param fixtures: optional, the answers of the services, see add_fixtures
+        :param host: optional, the address the server listens to
+        :param port: optional, the port the server listens to, any free port by default
+        :param latency: optional, the seconds waited before every response
+        :param error_rate: optional, the ratio of requests answered with the error status
+        :param error_status: optional, the HTTP status of the injected errors
+        :param seed: optional, the seed deciding which requests fail
+        """
+        if latency < 0:
+            raise ValueError("The latency parameter must not be negative")
+        if not 0 <= error_rate <= 1:
+            raise ValueError("The error_rate parameter must be between 0 and 1")
+        # term details represented in the same way as OLS does, with the short terms of their ancestors
+        self.terms: Dict[str, Dict[str, Any]] = {}
+        self.ancestors: Dict[str, List[str]] = {}
+        # Zooma annotations by lower case property value
+        self.annotations: Dict[str, List[Dict[str, Any]]] = {}
+        self.accessions = set()
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.random = random.Random(seed)
+        # the number of requests received by path
+        self.requests: Dict[str, int] = {}
+        self.lock = threading.Lock()
+        if fixtures:
+            self.add_fixtures(fixtures)
+        self.server = ThreadingHTTPServer((host, port), self.get_handler())
+        self.thread: threading.Thread = None
+
+    @property
+    def url(self) -> str:
+        """
+        The base URL of the server
+        :return: the URL
+        """
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def get_urls(self) -> Dict[str, str]:
+        """
+        Get the base URLs of the services as the environment variables setting them
+        :return: the URLs by environment variable
+        """
+        return {
+            'IMAGE_VALIDATION_OLS_URL': self.url + OLS_PATH,
+            'IMAGE_VALIDATION_ZOOMA_URL': self.url + ZOOMA_PATH,
+            'IMAGE_VALIDATION_BIOSAMPLES_URL': self.url + BIOSAMPLES_PATH
+        }
+
+    def add_term(self, short_term: str, label: str, ontology_name: str, synonyms: List[str] = None,
+                 ancestors: Iterable[str] = (), iri: str = "", has_children: bool = False) -> None:
+        """
+        Add the term answered by OLS and annotated by Zooma for its label
+        :param short_term: the short term
+        :param label: the label
+        :param ontology_name: the name of the ontology defining the term
+        :param synonyms: optional, the synonyms
+        :param ancestors: optional, the short terms of all ancestors
+        :param iri: optional, the iri, built from the short term if not provided
+        :param has_children: optional, whether the term has children
+        """
+        if type(short_term) is not str:
+            raise TypeError("The short_term parameter must be a string")
+        iri = iri or misc.get_iri_from_short_term(short_term)
+        self.terms[short_term] = {
+            'iri': iri,
+            'label': label,
+            'synonyms': synonyms or [],
+            'ontology_name': ontology_name,
+            'short_form': short_term,
+            'obo_id': short_term.replace('_', ':', 1),
+            'is_defining_ontology': True,
+            'has_children': has_children
+        }
+        self.ancestors[short_term] = list(ancestors)
+        self.annotations.setdefault(label.lower(), []).append({
+            'annotatedProperty': {'propertyType': None, 'propertyValue': label},
+            'confidence': 'HIGH',
+            '_links': {'olslinks': [{'href': f"{OLS_PATH}/terms?iri={iri}", 'semanticTag': iri}]}
+        })
+
+    def add_fixtures(self, fixtures: Dict[str, Any]) -> None:
+        """
+        Add the answers of the services
+        :param fixtures: the terms by short term with their label, ontology_name, and optionally synonyms, ancestors,
+        iri and has_children, the Zooma annotations by property value in the format Zooma returns them
+        and the accessions of the existing BioSamples records, each section being optional
+        """
+        if type(fixtures) is not dict:
+            raise TypeError("The fixtures parameter must be a dict")
+        for short_term, term in fixtures.get('terms', {}).items():
+            self.add_term(short_term, term['label'], term['ontology_name'], term.get('synonyms'),
+                          term.get('ancestors', ()), term.get('iri', ""), term.get('has_children', False))
+        for value, annotations in fixtures.get('zooma', {}).items():
+            self.annotations[value.lower()] = annotations
+        self.accessions.update(fixtures.get('biosamples', []))
+
+    def load(self, filename: str) -> None:
+        """
+        Add the answers of the services from the JSON file, see add_fixtures
+        :param filename: the JSON file
+        """
+        with open(filename) as infile:
+            self.add_fixtures(json.load(infile))
+
+    def add_index(self, index) -> None:
+        """
+        Add all terms of the local ontology index
+        :param index: the ontology_index.OntologyIndex
+        """
+        for short_term in index.terms:
+            detail = index.get_detail(short_term)
+            self.add_term(short_term, detail['label'], detail['ontology_name'], detail['synonyms'],
+                          index.get_ancestors(short_term), detail['iri'], detail['has_children'])
+
+    def start(self) -> 'StandInServer':
+        """
+        Start answering requests in a background thread
+        :return: the server itself
+        """
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        logger.info(f"Stand-in services listening on {self.url}")
+        return self
+
+    def stop(self) -> None:
+        """
+        Stop answering requests and release the port
+        """
+        if self.thread is not None:
+            self.server.shutdown()
+            self.thread.join()
+            self.thread = None
+        self.server.server_close()
+
+    def __enter__(self) -> 'StandInServer':
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.stop()
+
+    def answer(self, path: str, query: Dict[str, List[str]]) -> Tuple[int, Any]:
+        """
+        Get the answer of the services to the request
+        :param path: the path of the request
+        :param query: the parameters of the request
+        :return: the HTTP status and the JSON body
+        """
+        with self.lock:
+            self.requests[path] = self.requests.get(path, 0) + 1
+            failed = self.error_rate and self.random.random() < self.error_rate
+        if self.latency:
+            time.sleep(self.latency)
+        if failed:
+            return self.error_status, {'error': "Injected error"}
+        if path == OLS_PATH + "/terms":
+            short_term = misc.extract_ontology_id_from_iri(query.get('id', query.get('iri', [""]))[0])
+            if short_term not in self.terms:
+                return 200, {'page': {'totalElements': 0}}
+            return 200, {'_embedded': {'terms': [self.terms[short_term]]}, 'page': {'totalElements': 1}}
+        if path == OLS_PATH + "/search":
+            text = query.get('q', [""])[0].lower()
+            docs = [term for term in self.terms.values()
+                    if text and (text == term['label'].lower() or text == term['short_form'].lower())]
+            return 200, {'response': {'numFound': len(docs), 'start': 0, 'docs': docs}}
+        if path.startswith(OLS_PATH + "/ontologies/") and path.endswith("/ancestors"):
+            # the iri is encoded twice in the path
+            short_term = misc.extract_ontology_id_from_iri(unquote(unquote(path.split('/')[-2])))
+            if short_term not in self.terms:
+                return 404, {'error': "Not Found"}
+            return 200, self.get_ancestors_page(path, short_term, query)
+        if path == ZOOMA_PATH + "/services/annotate":
+            return 200, self.annotations.get(query.get('propertyValue', [""])[0].lower(), [])
+        if path.startswith(BIOSAMPLES_PATH):
+            accession = path[len(BIOSAMPLES_PATH):]
+            if accession in self.accessions:
+                return 200, {'accession': accession}
+            return 404, {'error': "Not Found"}
+        return 404, {'error': "Not Found"}
+
+    def get_ancestors_page(self, path: str, short_term: str, query: Dict[str, List[str]]) -> Dict[str, Any]:
+        """
+        Get one page of the ancestors of the term, linking to the next page as OLS does
+        :param path: the path of the request
+        :param short_term: the short term
+        :param query: the parameters of the request
+        :return: the JSON body
+        """
+        size = int(query.get('size', [DEFAULT_PAGE_SIZE])[0])
+        page = int(query.get('page', [0])[0])
+        ancestors = self.ancestors[short_term]
+        terms = [self.terms.get(ancestor, {'short_form': ancestor})
+                 for ancestor in ancestors[page * size:(page + 1) * size]]
+        body = {'_embedded': {'terms': terms}, '_links': {},
+                'page': {'size': size, 'totalElements': len(ancestors), 'number': page}}
+        if (page + 1) * size < len(ancestors):
+            body['_links']['next'] = {'href': self.url + path + "?" + urlencode({'page': page + 1, 'size': size})}
+        return body
+
+    def get_handler(self):
+        """
+        Get the class handling the requests of the server
+        :return: the request handler class
+        """
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # keep the connections alive, as the HTTP client pools them
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                status, body = stand_in.answer(url.path, parse_qs(url.query))
+                content = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, message_format, *args):
+                logger.debug(message_format % args)
+
+        return Handler
+
+
+def main(argv: List[str] = None) -> None:
+    """
+    Run the stand-in services until interrupted
+    :param argv: optional, the command line arguments, default to the ones of the process
+    """
+    parser = argparse.ArgumentParser(description="Local stand-in for OLS, Zooma and BioSamples")
+    parser.add_argument('--fixtures', nargs='*', default=[], help="the JSON files of the answers")
+    parser.add_argument('--host', default="127.0.0.1", help="the address to listen to")
+    parser.add_argument('--port', type=int, default=8080, help="the port to listen to")
+    parser.add_argument('--latency', type=float, default=0.0, help="the seconds waited before every response")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="the ratio of requests failing")
+    parser.add_argument('--error-status', type=int, default=503, help="the HTTP status of the failed requests")
+    args = parser.parse_args(argv)
+    server = StandInServer(host=args.host, port=args.port, latency=args.latency, error_rate=args.error_rate,
+                           error_status=args.error_status)
+    for filename in args.fixtures:
+        server.load(filename)
+    for name, url in server.get_urls().items():
+        print(f"{name}={url}")
+    try:
+        server.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server.server_close()
+
+
+if __name__ == '__main__':
+    main()
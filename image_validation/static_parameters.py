@@ -4,11 +4,40 @@ static objects used across the application
 import os
 
 from . import use_ontology
+from . import biosamples
+from . import cache_backends
+from . import ontology_index
 
 # ruleset file
 ruleset_filename = os.path.join(
     os.path.dirname(use_ontology.__file__),
     "sample_ruleset_v3a0ee76.json")
 
+# folder keeping the snapshots of checked rulesets to skip parsing at start up, disabled if not set
+ruleset_snapshot_dir = os.environ.get("IMAGE_VALIDATION_RULESET_SNAPSHOT_DIR", "")
+
+# storage shared by the ontology and BioSamples caches across processes and runs: sqlite, redis or memory
+# the SQLite file is used when set without selecting a storage, disabled if none set
+cache_filename = os.environ.get("IMAGE_VALIDATION_CACHE_FILE", "")
+cache_backend_name = os.environ.get("IMAGE_VALIDATION_CACHE_BACKEND", "sqlite" if cache_filename else "")
+cache_url = os.environ.get("IMAGE_VALIDATION_CACHE_URL", cache_backends.DEFAULT_REDIS_URL)
+cache_ttl = int(os.environ.get("IMAGE_VALIDATION_CACHE_TTL", cache_backends.DEFAULT_TTL))
+# the maximum number of entries kept in memory by each cache of the current process
+cache_memory_size = int(os.environ.get("IMAGE_VALIDATION_CACHE_MEMORY_SIZE", use_ontology.DEFAULT_MEMORY_SIZE))
+cache_backend = cache_backends.create_backend(cache_backend_name, filename=cache_filename, url=cache_url,
+                                              ttl=cache_ttl, maxsize=cache_memory_size)
+
+# local OBO/OBO Graphs JSON dumps separated by os.pathsep, when set validation runs offline without OLS
+ontology_index_filenames = [filename for filename in
+                            os.environ.get("IMAGE_VALIDATION_ONTOLOGY_FILES", "").split(os.pathsep) if filename]
+local_ontology_index = None
+if ontology_index_filenames:
+    local_ontology_index = ontology_index.OntologyIndex()
+    for ontology_filename in ontology_index_filenames:
+        local_ontology_index.load(ontology_filename)
+
 # ontology cache
-ontology_library = use_ontology.OntologyCache()
+ontology_library = use_ontology.OntologyCache(cache_backend, local_ontology_index, cache_memory_size)
+
+# BioSamples records referenced in relationships
+biosamples_library = biosamples.BioSamplesCache(cache_backend, cache_memory_size)
@@ -1,13 +1,25 @@
 """
 encapsulate everything related to ontology
 """
-import requests
 import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
 from . import misc
-from typing import Dict, List
+from . import http_client
+from . import cache_backends
+from typing import Any, Dict, FrozenSet, Iterable, List, Set, Tuple
 
 logger = logging.getLogger(__name__)
 
+# the base URLs of the services, e.g. to use a mirror or image_validation.stand_in_server
+OLS_URL = os.environ.get("IMAGE_VALIDATION_OLS_URL", "https://www.ebi.ac.uk/ols/api")
+ZOOMA_URL = os.environ.get("IMAGE_VALIDATION_ZOOMA_URL", "https://www.ebi.ac.uk/spot/zooma/v2/api")
+# the number of ancestors retrieved from OLS per request
+ANCESTORS_PAGE_SIZE = 500
+# the number of terms kept in memory by OntologyCache
+DEFAULT_MEMORY_SIZE = 65536
+
 
 # search against zooma and return the matched ontology
 def use_zooma(term: str, category: str) -> Dict[str, str]:
@@ -22,11 +34,10 @@ def use_zooma(term: str, category: str) -> Dict[str, str]:
     if type(category) is not str:
         raise TypeError("The method only take string for category parameter")
     new_term = term.replace(" ", "+")
-    # main production server
-    host = "https://www.ebi.ac.uk/spot/zooma/v2/api/services/annotate?propertyValue=" + new_term
+    # main production server unless another one is set
+    host = ZOOMA_URL + "/services/annotate?propertyValue=" + new_term
     logger.debug(host)
-    # test zooma server
-    # host = "http://snarf.ebi.ac.uk:8480/spot/zooma/v2/api/services/annotate?propertyValue="+newTerm
+    # test zooma server: IMAGE_VALIDATION_ZOOMA_URL=http://snarf.ebi.ac.uk:8480/spot/zooma/v2/api
     # add filter: configure datasource and ols libraries
     category = misc.from_lower_camel_case(category)
     if category == "species":  # necessary if
@@ -45,7 +56,7 @@ def use_zooma(term: str, category: str) -> Dict[str, str]:
     high_result = {}
     good_result = {}
     result = {}
-    request = requests.get(host)
+    request = http_client.get(host)
     # print (json.dumps(request.json(), indent=4, sort_keys=True))
     for elem in request.json():
         detected_type = elem['annotatedProperty']['propertyType']
@@ -145,6 +156,30 @@ def get_general_breed_by_species(species: str, cross: bool = False) -> Dict[str,
     return ontology
 
 
+def retrieve_ancestors(detail: Dict[str, Any]) -> List[str]:
+    """
+    Retrieve from OLS all ancestors of the term through is_a relationships, following every result page
+    :param detail: the term detail as returned by OLS
+    :return: the short terms of the ancestors
+    """
+    if '_links' in detail and 'ancestors' in detail['_links']:
+        host = detail['_links']['ancestors']['href']
+    else:
+        # iri needs to be encoded twice in the path according to OLS documentation
+        iri = quote(quote(detail['iri'], safe=''), safe='')
+        host = f"{OLS_URL}/ontologies/{detail['ontology_name']}/terms/{iri}/ancestors"
+    params = {'size': ANCESTORS_PAGE_SIZE}
+    ancestors: List[str] = []
+    while host:
+        response = http_client.get(host, params=params).json()
+        for term in response.get('_embedded', {}).get('terms', []):
+            ancestors.append(term['short_form'])
+        # the link to the next page already contains the parameters
+        host = response.get('_links', {}).get('next', {}).get('href')
+        params = None
+    return ancestors
+
+
 class Ontology:
     found: bool = False
     """
@@ -167,8 +202,8 @@ class Ontology:
         if type(short_term) is not str:
             raise TypeError("The ontology object can only be initialzed with a string value")
         self.short_term = short_term
-        host = "http://www.ebi.ac.uk/ols/api/terms?id=" + short_term
-        request = requests.get(host)
+        host = OLS_URL + "/terms?id=" + short_term
+        request = http_client.get(host)
 
         response = request.json()
         num = response['page']['totalElements']
@@ -176,7 +211,7 @@ class Ontology:
         if num:
             if num > 20:
                 host = host + "&size=" + str(num)
-                request = requests.get(host)
+                request = http_client.get(host)
                 response = request.json()
             terms = response['_embedded']['terms']
             for term in terms:
@@ -186,6 +221,27 @@ class Ontology:
         else:
             logger.error("Could not find information for " + short_term)
 
+    @classmethod
+    def from_detail(cls, short_term: str, detail: Dict[str, Any]) -> 'Ontology':
+        """
+        Build the ontology from the term detail previously retrieved from OLS, without contacting OLS again
+        :param short_term: the short term or iri the ontology has been searched with
+        :param detail: the term detail as returned by OLS, None if the term could not be found
+        :return: the ontology
+        """
+        if type(short_term) is not str:
+            raise TypeError("The ontology object can only be initialzed with a string value")
+        if detail is not None and type(detail) is not dict:
+            raise TypeError("The detail parameter must be a dict")
+        ontology = cls.__new__(cls)
+        ontology.short_term = short_term
+        if detail is None:
+            logger.error("Could not find information for " + short_term)
+        else:
+            ontology.found = True
+            ontology.detail = detail
+        return ontology
+
     def __eq__(self, other):
         """
         Override the equal function which compares two objects to see them are equal
@@ -285,16 +341,22 @@ class Ontology:
 class OntologyCache:
     """
     The cache of ontologies retrieved from OLS to avoid checking with OLS every time
+    Optionally backed by a persistent storage shared across processes and runs,
+    or by a local ontology index for offline validation
     """
-    cache: Dict[str, Ontology]
-    children_checked: Dict[str, Dict[str, bool]] = {}
-    # parents_checked: Dict[str, Dict[str, bool]] = {}
-
-    def __init__(self):
+    def __init__(self, backend=None, index=None, memory_size: int = DEFAULT_MEMORY_SIZE):
         """
         Consturctor class of ontology cache
+        :param backend: optional, the storage shared with other processes e.g. cache_backends.SQLiteCacheBackend
+        :param index: optional, the local ontology_index.OntologyIndex, when provided OLS is never contacted
+        :param memory_size: optional, the maximum number of terms kept in memory by the cache itself
         """
-        self.cache = {}
+        # the least recently used terms are dropped to keep the memory bounded, the backend still keeps them
+        self.cache: cache_backends.LRUCache = cache_backends.LRUCache(memory_size)
+        # the short terms of all ancestors of the terms checked by has_parent, answering any parent of those terms
+        self.ancestors: cache_backends.LRUCache = cache_backends.LRUCache(memory_size)
+        self.backend = backend
+        self.index = index
         logger.debug("Initializing ontology cache")
 
     def contains(self, short_term: str) -> bool:
@@ -316,28 +378,41 @@ class OntologyCache:
             raise TypeError("The method only take Ontology type as its input")
         short_term = ontology.get_short_term()
         self.cache[short_term] = ontology
-        if short_term not in self.children_checked:
-            self.children_checked[short_term] = {}
 
     def get_ontology(self, short_term: str) -> Ontology:
         """
         Get the ontology based on the short term
         If already existing, return the one in the cache
-        if not, retrieve the ontology, return it while saving it into the cache
+        if not, retrieve the ontology from the persistent storage or from OLS, return it while saving it into the cache
         :param short_term: the short term
         :return: the corresponding ontology
         """
         if type(short_term) is not str:
             raise TypeError("The method only take string as its input")
-        if short_term in self.cache:
-            logger.debug("load from cache "+short_term)
-            return self.cache[short_term]
-        else:
-            logger.debug("OLS search for new term "+short_term)
-            ontology = Ontology(short_term)
+        ontology = self.cache.get(short_term)
+        if ontology is not None:
+            logger.debug("load from cache %s", short_term)
+            return ontology
+        if self.index is not None:
+            logger.debug("load from local ontology index %s", short_term)
+            ontology = Ontology.from_detail(short_term, self.index.get_detail(short_term))
             self.add_ontology(ontology)
-            logger.debug("Save the new ontology into cache")
             return ontology
+        detail = None
+        if self.backend is not None:
+            detail = self.backend.get('terms', short_term)
+        if detail is not None:
+            logger.debug("load from persistent cache %s", short_term)
+            ontology = Ontology.from_detail(short_term, detail)
+        else:
+            logger.debug("OLS search for new term %s", short_term)
+            ontology = Ontology(short_term)
+            # only found terms are persisted, the missing ones may be added to OLS later
+            if self.backend is not None and ontology.found:
+                self.backend.set('terms', short_term, ontology.detail)
+        self.add_ontology(ontology)
+        logger.debug("Save the new ontology into cache")
+        return ontology
 
     # the method should not be here, but have not got a solution to retrieve ontology from cache
     # while not wanting to maintain checked parent-children relationship
@@ -352,24 +427,102 @@ class OntologyCache:
             raise TypeError("The method only take string as child term parameter")
         if type(parent_term) is not str:
             raise TypeError("The method only take string as parent term parameter")
-        # not in, means not in the cache
-        if child_term not in self.children_checked:
-            self.get_ontology(child_term)
-        if parent_term not in self.children_checked[child_term]:  # not checked parent relation before
-            child_detail = self.get_ontology(child_term)
-            parent_detail = self.get_ontology(parent_term)
-            host = "https://www.ebi.ac.uk/ols/api/search?q=" + child_detail.get_iri()\
-                   + "&queryFields=iri&childrenOf=" + parent_detail.get_iri()
-            # print(host)
-            request = requests.get(host)
-            # print(request.text) # check content while getting simplejson.errors.JSONDecodeError
-            response = request.json()
-            # print (json.dumps(response['response'], indent=4, sort_keys=True))
-            num_found = response['response']['numFound']
-
-            if num_found == 0:
-                self.children_checked[child_term][parent_term] = False
-            else:
-                self.children_checked[child_term][parent_term] = True
-
-        return self.children_checked[child_term][parent_term]
+        return misc.extract_ontology_id_from_iri(parent_term) in self.get_ancestors(child_term)
+
+    def get_ancestors(self, short_term: str) -> FrozenSet[str]:
+        """
+        Get all ancestors of the term, retrieved from OLS with a single lookup and then kept,
+        so that any number of parents can be checked for the term without contacting OLS again
+        :param short_term: the short term or iri
+        :return: the short terms of the ancestors, not including the term itself
+        """
+        if type(short_term) is not str:
+            raise TypeError("The method only take string as its input")
+        ancestors = self.ancestors.get(short_term)
+        if ancestors is not None:
+            return ancestors
+        if self.index is not None:
+            ancestors = self.index.get_ancestors(short_term)
+        else:
+            stored = None
+            if self.backend is not None:
+                stored = self.backend.get('ancestors', short_term)
+            if stored is None:
+                ontology = self.get_ontology(short_term)
+                stored = []
+                if ontology.found:
+                    logger.debug("OLS search for ancestors of %s", short_term)
+                    stored = retrieve_ancestors(ontology.detail)
+                    if self.backend is not None:
+                        self.backend.set('ancestors', short_term, stored)
+            ancestors = frozenset(stored)
+        self.ancestors[short_term] = ancestors
+        return ancestors
+
+    def get_stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        Get the numbers of hits, misses and stored entries of the terms and the ancestors
+        :return: the statistics by kind of lookup
+        """
+        return {
+            'ontology_terms': self.cache.get_stats(),
+            'ontology_ancestors': self.ancestors.get_stats()
+        }
+
+    def get_missing_lookups(self, short_terms: Iterable[str],
+                            pairs: Iterable[Tuple[str, str]] = ()) -> Tuple[Set[str], Set[str]]:
+        """
+        Get the lookups which would need OLS to get the given terms and to check the given relationships
+        :param short_terms: the terms
+        :param pairs: the (child term, parent term) relationships
+        :return: the terms to be retrieved and the terms whose ancestors are to be retrieved,
+        the latter are retrieved using the detail of the former
+        """
+        # nothing to retrieve when all answers are local
+        if self.index is not None:
+            return set(), set()
+        missing_terms = {short_term for short_term in short_terms if short_term not in self.cache}
+        # the relationships are answered from the ancestors of the children, retrieved once per child
+        missing_children = {child for child, _ in pairs if child not in self.ancestors}
+        for child in missing_children:
+            if child not in self.cache:
+                missing_terms.add(child)
+        return missing_terms, missing_children
+
+    def prefetch(self, short_terms: Iterable[str], pairs: Iterable[Tuple[str, str]] = (),
+                 max_workers: int = 8) -> None:
+        """
+        Retrieve concurrently the ontologies and parent-child relationships not in the cache yet,
+        so that the following lookups do not need to wait for OLS
+        :param short_terms: the terms to be retrieved
+        :param pairs: the (child term, parent term) relationships to be checked
+        :param max_workers: the maximum number of concurrent OLS requests
+        """
+        if type(max_workers) is not int:
+            raise TypeError("The max_workers parameter must be an integer")
+        if max_workers < 1:
+            raise ValueError("The max_workers parameter must be a positive integer")
+        missing_terms, missing_children = self.get_missing_lookups(short_terms, pairs)
+        if not missing_terms and not missing_children:
+            return
+        logger.info("Prefetch %d ontologies and ancestors of %d terms from OLS", len(missing_terms),
+                    len(missing_children))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # terms first, the ancestors are retrieved using their detail
+            for _ in executor.map(self.prefetch_one, [(self.get_ontology, (short_term,))
+                                                      for short_term in missing_terms]):
+                pass
+            for _ in executor.map(self.prefetch_one, [(self.get_ancestors, (child,)) for child in missing_children]):
+                pass
+
+    @staticmethod
+    def prefetch_one(task: Tuple) -> None:
+        """
+        Run one prefetch lookup, failures are only logged as the lookup will be done again during validation
+        :param task: the lookup method and its arguments
+        """
+        method, args = task
+        try:
+            method(*args)
+        except Exception as e:
+            logger.warning("Fail to prefetch %s from OLS: %s", args, e)
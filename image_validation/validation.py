@@ -4,9 +4,14 @@ The results are represented in two types: strings and ValidationResult objects
 The ValidationResult objects are for record values validated against ruleset
 All other errors are represented as strings, e.g. ruleset error
 """
+import hashlib
 import json
 import logging
-from typing import Dict, List, Set
+import os
+import pickle
+import tempfile
+from itertools import chain
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 
 from image_validation.ValidationResult import ValidationResultConstant as VRConstant
 from image_validation.ValidationResult import ValidationResultColumn as VRC
@@ -18,8 +23,11 @@ from . import static_parameters
 
 RULESET_CHECK_ID = "ruleset check"
 USI_CHECK_ID = "usi structure check"
+USI_ERROR_PREFIX = 'Wrong JSON structure:'
 SPECIES = 'Species'
 ALLOWED_RELATIONSHIP_NATURE = ['derived from', 'child of', 'same as', 'recurated from']
+# to be increased whenever the classes in Ruleset change, so that older snapshots are not loaded
+RULESET_SNAPSHOT_VERSION = 3
 
 logger = logging.getLogger(__name__)
 
@@ -67,6 +75,79 @@ def read_in_ruleset(file: str) -> Ruleset.RuleSet:
     return result
 
 
+def get_ruleset_snapshot_filename(file: str, snapshot_dir: str) -> str:
+    """
+    Get the name of the snapshot file of the ruleset, which is named after the hash of the ruleset file content
+    so that any change of the ruleset file leads to a new snapshot
+    :param file: the ruleset file name
+    :param snapshot_dir: the folder where snapshots are stored
+    :return: the snapshot file name
+    """
+    with open(file, 'rb') as infile:
+        digest = hashlib.sha256(infile.read()).hexdigest()
+    return os.path.join(snapshot_dir, f"ruleset_{digest}_v{RULESET_SNAPSHOT_VERSION}.pickle")
+
+
+def load_ruleset_snapshot(file: str, snapshot_dir: str) -> Optional[Ruleset.RuleSet]:
+    """
+    Load the snapshot of the ruleset stored in the file, which has already been checked by check_ruleset
+    Snapshots are pickled, so the folder must only be writable by trusted users
+    :param file: the ruleset file name
+    :param snapshot_dir: the folder where snapshots are stored
+    :return: the ruleset, None if there is no usable snapshot
+    """
+    if type(file) is not str:
+        raise TypeError("File name must be a string")
+    snapshot_file = get_ruleset_snapshot_filename(file, snapshot_dir)
+    try:
+        with open(snapshot_file, 'rb') as infile:
+            ruleset = pickle.load(infile)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Could not load the ruleset snapshot {snapshot_file}: {e}")
+        return None
+    if type(ruleset) is not Ruleset.RuleSet:
+        logger.warning(f"The ruleset snapshot {snapshot_file} does not contain a ruleset")
+        return None
+    logger.info("Loaded ruleset snapshot " + snapshot_file)
+    return ruleset
+
+
+def save_ruleset_snapshot(ruleset: Ruleset.RuleSet, file: str, snapshot_dir: str) -> None:
+    """
+    Save the snapshot of the ruleset read from the file, only rulesets passing check_ruleset should be saved
+    The snapshot is written into a temporary file first, so concurrent processes never read a partial snapshot
+    :param ruleset: the ruleset
+    :param file: the ruleset file name
+    :param snapshot_dir: the folder where snapshots are stored
+    """
+    if type(ruleset) is not Ruleset.RuleSet:
+        raise TypeError("The parameter must be of a RuleSet object")
+    snapshot_file = get_ruleset_snapshot_filename(file, snapshot_dir)
+    # resolve the iris of allowed terms beforehand, so that they are not retrieved again after loading the snapshot
+    for section_name in ruleset.get_all_section_names():
+        rules = ruleset.get_section_by_name(section_name).get_rules()
+        for required in rules.keys():
+            for rule in rules[required].values():
+                for condition in rule.get_allowed_terms():
+                    condition.iri
+    try:
+        os.makedirs(snapshot_dir, exist_ok=True)
+        fd, tmp_file = tempfile.mkstemp(dir=snapshot_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as outfile:
+                pickle.dump(ruleset, outfile, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_file, snapshot_file)
+        except BaseException:
+            os.remove(tmp_file)
+            raise
+    except OSError as e:
+        logger.warning(f"Could not save the ruleset snapshot {snapshot_file}: {e}")
+        return
+    logger.info("Saved ruleset snapshot " + snapshot_file)
+
+
 # check on the integrity of ruleset
 # number and date types must have units
 # ontology_id must have allowed terms, but no allowed values
@@ -151,14 +232,25 @@ def check_usi_structure(sample: List[Dict]) -> VRR:
     :return: the list of error messages
     """
     logger.debug("Check whether data meets USI data format standard")
-    count: Dict[str, int] = {}
-    result: VRR = VRR(USI_CHECK_ID)
-    error_prefix = 'Wrong JSON structure:'
     if type(sample) is not list:
+        result: VRR = VRR(USI_CHECK_ID)
         result.add_validation_result_column(
-            VRC(VRConstant.ERROR, f"{error_prefix} all data need to be encapsulated in an array", USI_CHECK_ID,
+            VRC(VRConstant.ERROR, f"{USI_ERROR_PREFIX} all data need to be encapsulated in an array", USI_CHECK_ID,
                 "", VRConstant.USI_CHECK))
         return result
+    return check_usi_records(sample)
+
+
+def check_usi_records(sample: Iterable[Dict]) -> VRR:
+    """
+    Check the records one by one as check_usi_structure does,
+    records can be read on the fly as only their aliases are kept in memory
+    :param sample: the records represented in JSON
+    :return: the list of error messages
+    """
+    count: Dict[str, int] = {}
+    result: VRR = VRR(USI_CHECK_ID)
+    error_prefix = USI_ERROR_PREFIX
     for one in sample:
         # check the structure, if wrong, could not continue, so directly skip to next record
         # rather than setting error flag
@@ -345,10 +437,10 @@ def check_usi_structure(sample: List[Dict]) -> VRR:
 
 
 # not checking alias duplicates as alias is USI concept and dealt with within check_usi_structure
-def check_duplicates(sample: List, id_field: str = 'Data source ID') -> List[str]:
+def check_duplicates(sample: Iterable, id_field: str = 'Data source ID') -> List[str]:
     """
     Check whether two records have the same in the id field
-    :param sample: list of records
+    :param sample: list of records, or any iterable of records e.g. read on the fly
     :param id_field: optional, the name of the field which is used as id
     :return: the list of error messages
     """
@@ -378,6 +470,67 @@ def check_duplicates(sample: List, id_field: str = 'Data source ID') -> List[str
     return result
 
 
+def get_ontology_conditions(ruleset: Ruleset.RuleSet) -> Dict[str, List[Ruleset.OntologyCondition]]:
+    """
+    Get the allowed terms of the ruleset by field name
+    :param ruleset: the ruleset
+    :return: the ontology conditions of every section by field name
+    """
+    conditions: Dict[str, List[Ruleset.OntologyCondition]] = {}
+    for section_name in ruleset.get_all_section_names():
+        rules = ruleset.get_section_by_name(section_name).get_rules()
+        for required in rules.keys():
+            for field_name in rules[required].keys():
+                conditions.setdefault(field_name, []).extend(rules[required][field_name].get_allowed_terms())
+    return conditions
+
+
+def add_ontology_lookups(record: Dict, conditions: Dict[str, List[Ruleset.OntologyCondition]], terms: Set[str],
+                         pairs: Set[Tuple[str, str]]) -> None:
+    """
+    Add the ontology terms used in the record and the parent-child relationships to be checked
+    :param record: the record which has passed the usi structure check
+    :param conditions: the allowed terms by field name as given by get_ontology_conditions
+    :param terms: the set of short terms to add to
+    :param pairs: the set of (child term, parent term) pairs to add to
+    """
+    attrs = record['attributes']
+    for field_name in attrs:
+        for attr_value in attrs[field_name]:
+            for term in attr_value.get('terms', []):
+                # malformed values are reported by the validation itself
+                if type(term) is not dict or type(term.get('url')) is not str or not misc.is_url(term['url']):
+                    continue
+                term_id = misc.extract_ontology_id_from_iri(term['url'])
+                terms.add(term_id)
+                for condition in conditions.get(field_name, []):
+                    terms.add(condition.term)
+                    if condition.include_descendant:
+                        pairs.add((term_id, condition.term))
+
+
+def collect_remote_lookups(sample: Iterable[Dict],
+                           ruleset: Ruleset.RuleSet) -> Tuple[Set[str], Set[Tuple[str, str]], Set[str]]:
+    """
+    Collect the ontology terms used in the records and the parent-child relationships which will be checked
+    against the allowed terms of the ruleset, and the BioSamples accessions referenced in the relationships,
+    so that they can be retrieved in advance. The records are read only once, e.g. when streamed from the file
+    :param sample: the records which have passed the usi structure check
+    :param ruleset: the ruleset
+    :return: the set of short terms, the set of (child term, parent term) pairs and the distinct accessions
+    """
+    conditions = get_ontology_conditions(ruleset)
+    terms: Set[str] = set()
+    pairs: Set[Tuple[str, str]] = set()
+    accessions: Set[str] = set()
+    for record in sample:
+        add_ontology_lookups(record, conditions, terms, pairs)
+        for relationship in record.get('sampleRelationships', []):
+            if 'accession' in relationship:
+                accessions.add(relationship['accession'])
+    return terms, pairs, accessions
+
+
 # example codes consuming the validation result
 # expected to be replaced by some codes displaying on the web pages
 def deal_with_validation_results(results: List[VRR], verbose=False) -> Dict:
@@ -396,8 +549,8 @@ def deal_with_validation_results(results: List[VRR], verbose=False) -> Dict:
         if verbose and overall != "Pass":
             logger.info(result.get_messages())
 
-        for vrc in result.get_specific_result_type(VRConstant.ERROR) +\
-                   result.get_specific_result_type(VRConstant.WARNING):
+        for vrc in chain(result.get_specific_result_type(VRConstant.ERROR),
+                         result.get_specific_result_type(VRConstant.WARNING)):
             vrc_summary.setdefault(vrc, 0)
             vrc_summary[vrc] += 1
             vrc_details.setdefault(vrc, set())
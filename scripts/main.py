@@ -38,7 +38,7 @@ if not submission.is_ruleset_ready():
         logger.error(error)
     exit(1)
 
-submission.validate()
+submission.validate(prefetch_workers=Submission.DEFAULT_PREFETCH_WORKERS)
 
 summary, vrc_summary, vrc_detail = validation.deal_with_validation_results(submission.get_validation_results())
 logger.info("Summary of records validation result")
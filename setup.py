@@ -35,7 +35,7 @@ with open('README.rst') as readme_file:
 with open('HISTORY.rst') as history_file:
     history = history_file.read()
 
-requirements = ['python-dateutil', 'requests']
+requirements = ['requests']
 
 setup_requirements = ['pytest-runner', ]
 
@@ -1,6 +1,8 @@
+import pickle
 import unittest
 
 from image_validation import ValidationResult
+from image_validation.ValidationResult import ValidationResultConstant as VRConstant
 
 
 class TestValidationResult(unittest.TestCase):
@@ -35,6 +37,18 @@ class TestValidationResult(unittest.TestCase):
         self.assertRaises(ValueError, ValidationResult.ValidationResultColumn,
                           'something', 'another thing', 'record', 'field')
 
+    def test_create(self):
+        created = ValidationResult.ValidationResultColumn.create(
+            VRConstant.ERROR, 'value used in field b is not allowed', 'sample_1', 'error field')
+        self.assertEqual(created, self.column_error)
+        self.assertEqual(str(created), str(self.column_error))
+        self.assertEqual(created.status, 'error')
+        self.assertEqual(created.get_source(), VRConstant.RULESET_BASED)
+        # compact representation without a __dict__
+        self.assertFalse(hasattr(created, '__dict__'))
+        self.assertFalse(hasattr(ValidationResult.ValidationResultRecord('sample_1'), '__dict__'))
+        self.assertEqual(pickle.loads(pickle.dumps(created)), created)
+
     def test_str(self):
         self.assertEqual(str(self.column_pass), "")
         self.assertEqual(str(self.column_warning_2),
@@ -133,6 +147,20 @@ class TestValidationResult(unittest.TestCase):
         self.assertRaises(TypeError, collection.get_specific_result_type, -12.34)
         self.assertRaises(TypeError, collection.get_specific_result_type, True)
         self.assertRaises(ValueError, collection.get_specific_result_type, 'wrong')
+        for column in [self.column_warning, self.column_error, self.column_pass, self.column_error]:
+            collection.add_validation_result_column(column)
+        self.assertListEqual(collection.get_specific_result_type('error'), [self.column_error, self.column_error])
+        self.assertListEqual(collection.get_specific_result_type('Warning'), [self.column_warning])
+        self.assertListEqual(collection.get_specific_result_type('PASS'), [self.column_pass])
+        # the results kept by the record could not be changed through the returned list
+        collection.get_specific_result_type('error').clear()
+        self.assertEqual(collection.get_overall_status(), 'Error')
+        # the copy is extended on its own
+        copied = collection.copy()
+        copied.add_validation_result_column(self.column_warning)
+        self.assertEqual(len(copied.get_specific_result_type('warning')), 2)
+        self.assertEqual(len(collection.get_specific_result_type('warning')), 1)
+        self.assertEqual(copied.get_size(), 5)
 
     def test_get_messages(self):
         collection = ValidationResult.ValidationResultRecord('sample_1')
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from benchmarks import generator, run
+from image_validation import Submission, static_parameters, use_ontology, biosamples
+
+
+class TestBenchmarks(unittest.TestCase):
+    def test_generator(self):
+        records = list(generator.SubmissionGenerator(200, seed=1))
+        self.assertEqual(len(records), 200)
+        self.assertEqual(records, list(generator.SubmissionGenerator(200, seed=1)))
+        self.assertEqual(len({record['alias'] for record in records}), 200)
+        natures = {relationship['relationshipNature'] for record in records
+                   for relationship in record['sampleRelationships']}
+        self.assertSetEqual(natures, {'child of', 'derived from'})
+        self.assertRaises(TypeError, generator.SubmissionGenerator, '200')
+        self.assertRaises(ValueError, generator.SubmissionGenerator, -1)
+        self.assertRaises(ValueError, generator.SubmissionGenerator, 10, error_rate=2)
+
+    def test_generated_submission(self):
+        index = generator.build_ontology_index(static_parameters.ruleset_filename)
+        for error_rate in [0, 1]:
+            records = generator.SubmissionGenerator(100, error_rate=error_rate, seed=2)
+            with tempfile.TemporaryDirectory() as workdir:
+                filename = os.path.join(workdir, 'submission.json')
+                self.assertEqual(generator.write_submission(filename, records), 100)
+                library = biosamples.BioSamplesCache()
+                for accession in records.accessions:
+                    library.statuses[accession] = 200
+                ontology_library = use_ontology.OntologyCache(index=index)
+                with mock.patch.object(static_parameters, 'ontology_library', ontology_library), \
+                        mock.patch.object(static_parameters, 'biosamples_library', library):
+                    submission = Submission.Submission("test")
+                    submission.load_data(filename, section='sample')
+                    self.assertTrue(submission.is_data_ready())
+                    submission.load_ruleset(static_parameters.ruleset_filename, snapshot_dir="")
+                    submission.validate()
+            statuses = [result.get_overall_status() for result in submission.get_validation_results()]
+            # every record follows the ruleset unless an error has been introduced
+            self.assertListEqual(statuses, ["Error" if error_rate else "Pass"] * 100)
+
+    def test_run(self):
+        with tempfile.TemporaryDirectory() as workdir:
+            output = os.path.join(workdir, 'report.json')
+            report = run.main(['--sizes', '20', '--error-rate', '0.5', '--output', output])
+            self.assertTrue(os.path.exists(output))
+        self.assertListEqual([result['stage'] for result in report['results']], run.STAGES)
+        for result in report['results']:
+            self.assertEqual(result['records'], 20)
+            self.assertGreater(result['peak_rss_kb'], 0)
+        self.assertListEqual(sorted(report['results'][1]['latency_ms'].keys()), ['max', 'p50', 'p90', 'p99'])
+        self.assertEqual(sum(report['results'][2]['summary'].values()), 20)
+        self.assertEqual(run.get_percentiles([0.001, 0.002, 0.003, 0.004])['p50'], 2)
+
+    def test_run_stand_in_server(self):
+        args = ['--sizes', '20', '--error-rate', '0.5', '--stages', 'submission_validate', '--output', os.devnull]
+        summary = run.main(args)['results'][0]['summary']
+        ols_url = use_ontology.OLS_URL
+        report = run.main(args + ['--stand-in-server'])
+        # the lookups through HTTP give the same results
+        self.assertTrue(report['stand_in_server'])
+        self.assertDictEqual(report['results'][0]['summary'], summary)
+        self.assertEqual(use_ontology.OLS_URL, ols_url)
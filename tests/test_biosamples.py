@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import requests
+
+from image_validation import biosamples
+from image_validation import cache_backends
+
+
+def get(url, **kwargs):
+    accession = url.rsplit('/', 1)[1]
+    if accession == 'SAMEA_DOWN':
+        raise requests.exceptions.ConnectionError("BioSamples down")
+    response = mock.Mock()
+    response.status_code = {'SAMEA1': 200, 'SAMEA_ERROR': 503, 'SAMEA_LIMITED': 429}.get(accession, 404)
+    return response
+
+
+class TestBioSamples(unittest.TestCase):
+    def test_get_status(self):
+        library = biosamples.BioSamplesCache()
+        self.assertRaises(TypeError, library.get_status, 12)
+        with mock.patch.object(biosamples.http_client, 'get', side_effect=get) as http_get:
+            self.assertEqual(library.get_status('SAMEA1'), 200)
+            self.assertEqual(library.get_status('SAMEA1'), 200)
+            self.assertEqual(library.get_status('SAMEA2'), 404)
+            self.assertEqual(http_get.call_count, 2)
+            http_get.assert_called_with(biosamples.BIOSAMPLES_URL + 'SAMEA2')
+            # failures are tried again
+            self.assertIsNone(library.get_status('SAMEA_DOWN'))
+            self.assertEqual(library.get_status('SAMEA_ERROR'), 503)
+            self.assertSetEqual(library.get_missing(['SAMEA1', 'SAMEA_DOWN', 'SAMEA_ERROR']),
+                                {'SAMEA_DOWN', 'SAMEA_ERROR'})
+            self.assertDictEqual(library.get_stats(), {'hits': 1, 'misses': 4, 'size': 2})
+
+    def test_prefetch(self):
+        library = biosamples.BioSamplesCache()
+        self.assertRaises(TypeError, library.prefetch, [], '8')
+        self.assertRaises(ValueError, library.prefetch, [], 0)
+        with mock.patch.object(biosamples.http_client, 'get', side_effect=get) as http_get:
+            library.prefetch(['SAMEA1', 'SAMEA2', 'SAMEA1', 'SAMEA_DOWN'], max_workers=2)
+            self.assertEqual(http_get.call_count, 3)
+            library.prefetch(['SAMEA1', 'SAMEA2'])
+            self.assertEqual(http_get.call_count, 3)
+        self.assertDictEqual(dict(library.statuses.items()), {'SAMEA1': 200, 'SAMEA2': 404})
+
+    def test_backend(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            backend = cache_backends.SQLiteCacheBackend(os.path.join(tmpdir, "cache.sqlite"))
+            with mock.patch.object(biosamples.http_client, 'get', side_effect=get) as http_get:
+                biosamples.BioSamplesCache(backend).prefetch(['SAMEA1', 'SAMEA2', 'SAMEA_ERROR'])
+                # shared with the next runs, except server errors
+                library = biosamples.BioSamplesCache(backend)
+                self.assertEqual(library.get_status('SAMEA1'), 200)
+                self.assertEqual(library.get_status('SAMEA2'), 404)
+                self.assertEqual(http_get.call_count, 3)
+                self.assertEqual(library.get_status('SAMEA_ERROR'), 503)
+                self.assertEqual(http_get.call_count, 4)
+                # nor rate limiting once the retries are exhausted
+                self.assertEqual(library.get_status('SAMEA_LIMITED'), 429)
+                self.assertNotIn('SAMEA_LIMITED', library.statuses)
+                self.assertIsNone(backend.get('biosamples', 'SAMEA_LIMITED'))
+                self.assertEqual(library.get_status('SAMEA_LIMITED'), 429)
+                self.assertEqual(http_get.call_count, 6)
+            with mock.patch.object(cache_backends.time, 'time',
+                                   return_value=cache_backends.time.time() + biosamples.MISSING_TTL + 1):
+                # missing records expire sooner
+                self.assertEqual(backend.get('biosamples', 'SAMEA1'), 200)
+                self.assertIsNone(backend.get('biosamples', 'SAMEA2'))
+            backend.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
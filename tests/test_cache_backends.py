@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*
+
+import fnmatch
+import os
+import pickle
+import tempfile
+import threading
+import unittest
+
+from image_validation import cache_backends
+
+
+class FakeRedis:
+    """
+    Stand-in for redis.Redis keeping the values in memory
+    """
+    def __init__(self):
+        self.values = {}
+        self.expires = {}
+        self.closed = False
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value, ex=None):
+        self.values[key] = value.encode()
+        self.expires[key] = ex
+
+    def scan_iter(self, match):
+        return [key for key in list(self.values.keys()) if fnmatch.fnmatch(key, match)]
+
+    def delete(self, key):
+        del self.values[key]
+
+    def close(self):
+        self.closed = True
+
+
+class TestCacheBackends(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.tmpdir.name, "ontology_cache.sqlite")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_lru_cache_types(self):
+        self.assertRaises(TypeError, cache_backends.LRUCache, "12")
+        self.assertRaises(ValueError, cache_backends.LRUCache, 0)
+
+    def test_lru_cache(self):
+        cache = cache_backends.LRUCache(2)
+        self.assertIsNone(cache.get('a'))
+        cache.set('a', False)
+        cache.set('b', True)
+        self.assertFalse(cache.get('a', 'missing'))
+        # b is the least recently used
+        cache.set('c', True)
+        self.assertEqual(cache.get('b', 'missing'), 'missing')
+        self.assertTrue(cache.get('c'))
+        self.assertEqual(len(cache), 2)
+        self.assertDictEqual(cache.get_stats(), {'hits': 2, 'misses': 2, 'size': 2})
+        cache.clear()
+        self.assertDictEqual(cache.get_stats(), {'hits': 2, 'misses': 2, 'size': 0})
+
+    def test_lru_cache_dict(self):
+        cache = cache_backends.LRUCache(2)
+        cache['a'] = {}
+        cache.setdefault('a', {'x': True})['y'] = False
+        self.assertDictEqual(cache['a'], {'y': False})
+        self.assertDictEqual(cache.setdefault('b', {'x': True}), {'x': True})
+        self.assertIn('b', cache)
+        self.assertRaises(KeyError, cache.__getitem__, 'c')
+        self.assertDictEqual(cache.pop('b'), {'x': True})
+        self.assertIsNone(cache.pop('b'))
+        copied = pickle.loads(pickle.dumps(cache))
+        self.assertListEqual(copied.items(), [('a', {'y': False})])
+        # counters are only updated by get
+        self.assertDictEqual(copied.get_stats(), {'hits': 0, 'misses': 0, 'size': 1})
+        # the least recently used entry is dropped by setdefault too
+        cache.setdefault('c', 1)
+        cache.setdefault('d', 2)
+        self.assertListEqual(cache.items(), [('c', 1), ('d', 2)])
+
+    def test_lru_cache_setdefault_threads(self):
+        cache = cache_backends.LRUCache(2)
+        barrier = threading.Barrier(8)
+        stored = []
+
+        def setdefault():
+            value = {}
+            barrier.wait()
+            stored.append(cache.setdefault('a', value))
+
+        threads = [threading.Thread(target=setdefault) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # every thread gets the value stored by the first one
+        self.assertTrue(all(value is cache['a'] for value in stored))
+
+    def test_cache_backend_abstract(self):
+        self.assertRaises(TypeError, cache_backends.CacheBackend)
+
+    def test_memory_backend(self):
+        self.assertRaises(TypeError, cache_backends.MemoryCacheBackend, 10, "12")
+        backend = cache_backends.MemoryCacheBackend(maxsize=2)
+        detail = {'iri': 'http://purl.obolibrary.org/obo/PATO_0000384', 'label': 'male'}
+        backend.set('terms', 'PATO_0000384', detail)
+        backend.set('children', 'PATO_0000384', True, ttl=-1)
+        self.assertDictEqual(backend.get('terms', 'PATO_0000384'), detail)
+        # values are copied
+        self.assertIsNot(backend.get('terms', 'PATO_0000384'), backend.get('terms', 'PATO_0000384'))
+        self.assertIsNone(backend.get('children', 'PATO_0000384'))
+        backend.purge()
+        self.assertEqual(len(backend.entries), 1)
+        backend.set('terms', 'PATO_0000383', detail)
+        backend.set('terms', 'PATO_0002365', detail)
+        self.assertIsNone(backend.get('terms', 'PATO_0000384'))
+        backend.clear()
+        self.assertIsNone(backend.get('terms', 'PATO_0000383'))
+        backend.close()
+
+    def test_redis_backend(self):
+        self.assertRaises(TypeError, cache_backends.RedisCacheBackend, 12)
+        self.assertRaises(TypeError, cache_backends.RedisCacheBackend, "redis://localhost", "12")
+        self.assertRaises(TypeError, cache_backends.RedisCacheBackend, "redis://localhost", 12, None)
+        client = FakeRedis()
+        backend = cache_backends.RedisCacheBackend(ttl=100, client=client)
+        detail = {'iri': 'http://purl.obolibrary.org/obo/PATO_0000384', 'label': 'male'}
+        backend.set('terms', 'PATO_0000384', detail)
+        backend.set('biosamples', 'SAMEA1', 404, ttl=10)
+        self.assertDictEqual(backend.get('terms', 'PATO_0000384'), detail)
+        self.assertEqual(backend.get('biosamples', 'SAMEA1'), 404)
+        self.assertIsNone(backend.get('terms', 'PATO_0000383'))
+        self.assertEqual(client.expires['image_validation:terms:PATO_0000384'], 100)
+        self.assertEqual(client.expires['image_validation:biosamples:SAMEA1'], 10)
+        # only the keys of the cache are removed
+        client.set('other:key', '1')
+        backend.clear()
+        self.assertListEqual(list(client.values.keys()), ['other:key'])
+        # the client is not pickled, the copy connects to the server itself
+        copied = pickle.loads(pickle.dumps(backend))
+        self.assertIsNone(copied.client)
+        self.assertEqual(copied.url, cache_backends.DEFAULT_REDIS_URL)
+        backend.close()
+        self.assertTrue(client.closed)
+        self.assertIsNone(backend.client)
+
+    def test_create_backend(self):
+        self.assertIsNone(cache_backends.create_backend(""))
+        self.assertIsInstance(cache_backends.create_backend("sqlite", filename=self.filename),
+                              cache_backends.SQLiteCacheBackend)
+        self.assertIsInstance(cache_backends.create_backend("redis", url="redis://cache:6379/1"),
+                              cache_backends.RedisCacheBackend)
+        backend = cache_backends.create_backend("memory", maxsize=10, ttl=60)
+        self.assertIsInstance(backend, cache_backends.MemoryCacheBackend)
+        self.assertEqual(backend.entries.maxsize, 10)
+        self.assertRaises(ValueError, cache_backends.create_backend, "mongodb")
+
+    def test_sqlite_backend_types(self):
+        self.assertRaises(TypeError, cache_backends.SQLiteCacheBackend, 12)
+        self.assertRaises(TypeError, cache_backends.SQLiteCacheBackend, "file", "12")
+
+    def test_sqlite_backend(self):
+        backend = cache_backends.SQLiteCacheBackend(self.filename)
+        # connection is only opened at the first lookup
+        self.assertIsNone(backend.connection)
+        self.assertIsNone(backend.get('terms', 'PATO_0000384'))
+        self.assertIsNotNone(backend.connection)
+
+        detail = {'iri': 'http://purl.obolibrary.org/obo/PATO_0000384', 'label': 'male'}
+        backend.set('terms', 'PATO_0000384', detail)
+        backend.set('children', 'PATO_0000384|PATO_0000047', True)
+        self.assertDictEqual(backend.get('terms', 'PATO_0000384'), detail)
+        self.assertIsNone(backend.get('children', 'PATO_0000384'))
+        self.assertTrue(backend.get('children', 'PATO_0000384|PATO_0000047'))
+
+        # shared with another instance (e.g. another process) using the same file
+        another = cache_backends.SQLiteCacheBackend(self.filename)
+        self.assertDictEqual(another.get('terms', 'PATO_0000384'), detail)
+        another.close()
+
+        # expired entries are not returned
+        backend.set('terms', 'PATO_0000383', {'label': 'female'}, ttl=-1)
+        self.assertIsNone(backend.get('terms', 'PATO_0000383'))
+        backend.purge()
+        self.assertIsNotNone(backend.get('terms', 'PATO_0000384'))
+        backend.clear()
+        self.assertIsNone(backend.get('terms', 'PATO_0000384'))
+        backend.close()
+        self.assertIsNone(backend.connection)
+
+
+if __name__ == '__main__':
+    unittest.main()
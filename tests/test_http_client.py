@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*
+
+import unittest
+from unittest import mock
+
+import requests
+
+from image_validation import http_client
+
+
+class TestHttpClient(unittest.TestCase):
+    def tearDown(self):
+        http_client.configure(timeout=http_client.DEFAULT_TIMEOUT, retries=http_client.DEFAULT_RETRIES,
+                              backoff_factor=http_client.DEFAULT_BACKOFF_FACTOR,
+                              pool_size=http_client.DEFAULT_POOL_SIZE)
+
+    def test_configure_types(self):
+        self.assertRaises(TypeError, http_client.configure, retries='3')
+        self.assertRaises(TypeError, http_client.configure, pool_size=2.5)
+
+    def test_get_session(self):
+        session = http_client.get_session()
+        # the same session is shared
+        self.assertIs(session, http_client.get_session())
+        adapter = session.get_adapter("https://www.ebi.ac.uk/ols/api/terms")
+        self.assertEqual(adapter.max_retries.total, http_client.DEFAULT_RETRIES)
+        self.assertIn(503, adapter.max_retries.status_forcelist)
+        self.assertIn(429, adapter.max_retries.status_forcelist)
+        self.assertEqual(adapter._pool_maxsize, http_client.DEFAULT_POOL_SIZE)
+
+        # new session with the new settings
+        http_client.configure(retries=5, backoff_factor=1, pool_size=4)
+        another = http_client.get_session()
+        self.assertIsNot(session, another)
+        adapter = another.get_adapter("http://www.ebi.ac.uk/ols/api/terms")
+        self.assertEqual(adapter.max_retries.total, 5)
+        self.assertEqual(adapter.max_retries.backoff_factor, 1)
+        self.assertEqual(adapter._pool_maxsize, 4)
+
+    def test_get(self):
+        http_client.configure(timeout=12)
+        with mock.patch.object(http_client.get_session(), 'get') as get:
+            get.return_value.status_code = 200
+            http_client.get("https://www.ebi.ac.uk/biosamples/samples/SAMEA000004")
+            get.assert_called_once_with("https://www.ebi.ac.uk/biosamples/samples/SAMEA000004", timeout=12)
+            http_client.get("https://www.ebi.ac.uk/biosamples/samples/SAMEA000004", timeout=1)
+            get.assert_called_with("https://www.ebi.ac.uk/biosamples/samples/SAMEA000004", timeout=1)
+
+    def test_get_stats(self):
+        http_client.stats.reset()
+        with mock.patch.object(http_client.get_session(), 'get') as get:
+            get.return_value.status_code = 200
+            http_client.get("https://www.ebi.ac.uk/biosamples/samples/SAMEA000004")
+            get.return_value.status_code = 503
+            http_client.get("https://www.ebi.ac.uk/biosamples/samples/SAMEA000004")
+            get.side_effect = requests.exceptions.ConnectionError("down")
+            self.assertRaises(requests.exceptions.ConnectionError, http_client.get, "http://localhost:8080/ols/api")
+        stats = http_client.stats.get_stats()
+        self.assertEqual(stats['timers']['http:www.ebi.ac.uk']['count'], 2)
+        self.assertEqual(stats['timers']['http:localhost:8080']['count'], 1)
+        self.assertDictEqual(stats['counters'], {'http_failed:www.ebi.ac.uk': 1, 'http_failed:localhost:8080': 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*
+
+import pickle
+import unittest
+from unittest import mock
+
+from image_validation import instrumentation
+
+
+class TestInstrumentation(unittest.TestCase):
+    def test_histogram(self):
+        histogram = instrumentation.Histogram([0.1, 1])
+        for seconds in [0.05, 0.1, 0.5, 2]:
+            histogram.observe(seconds)
+        self.assertDictEqual(histogram.get_stats(), {'count': 4, 'seconds': 2.65,
+                                                     'buckets': {'0.1': 2, '1': 3, '+Inf': 4}})
+        other = instrumentation.Histogram([0.1, 1])
+        other.observe(0.01)
+        histogram.merge(other)
+        self.assertDictEqual(histogram.get_stats()['buckets'], {'0.1': 3, '1': 4, '+Inf': 5})
+        self.assertRaises(ValueError, histogram.merge, instrumentation.Histogram([1]))
+
+    def test_stats(self):
+        stats = instrumentation.Stats()
+        with stats.time('stage'):
+            pass
+        with self.assertRaises(KeyError):
+            with stats.time('stage'):
+                raise KeyError('error')
+        stats.increment('records', 3)
+        stats.increment('records')
+        result = stats.get_stats()
+        self.assertEqual(result['timers']['stage']['count'], 2)
+        self.assertDictEqual(result['counters'], {'records': 4})
+
+        # e.g. sent back by a worker process
+        copied = pickle.loads(pickle.dumps(stats))
+        copied.observe('field:Sex', 0.002)
+        stats.merge(copied)
+        result = stats.get_stats()
+        self.assertEqual(result['timers']['stage']['count'], 4)
+        self.assertEqual(result['timers']['field:Sex']['count'], 1)
+        self.assertDictEqual(result['counters'], {'records': 8})
+
+        # e.g. timed by a loop
+        timer = instrumentation.Histogram(stats.bounds)
+        timer.observe(0.01)
+        stats.merge_timer('field:Sex', timer)
+        stats.merge_timer('record', timer)
+        result = stats.get_stats()
+        self.assertEqual(result['timers']['field:Sex']['count'], 2)
+        self.assertEqual(result['timers']['record']['count'], 1)
+        self.assertRaises(ValueError, stats.merge_timer, 'record', instrumentation.Histogram([1]))
+        stats.reset()
+        self.assertDictEqual(stats.get_stats(), {'timers': {}, 'counters': {}})
+
+    def test_tracer(self):
+        tracer = mock.MagicMock()
+        stats = instrumentation.Stats(tracer=tracer)
+        with stats.time('first_scan'):
+            pass
+        tracer.start_as_current_span.assert_called_once_with('first_scan')
+        self.assertIsNone(pickle.loads(pickle.dumps(stats)).tracer)
+
+    def test_progress(self):
+        self.assertRaises(TypeError, instrumentation.Progress, "Validated", "10")
+        self.assertRaises(ValueError, instrumentation.Progress, "Validated", interval=-1)
+        with self.assertLogs('image_validation.instrumentation', 'INFO') as logs:
+            progress = instrumentation.Progress("Validated", 250, interval=0)
+            for _ in range(250):
+                progress.update()
+            progress.finish()
+        # the time is only checked every few records
+        self.assertEqual(len(logs.output), 3)
+        self.assertRegex(logs.output[0], r"Validated 100/250 records, [0-9.]+ records/s, ETA [0-9]+s")
+        self.assertRegex(logs.output[2], r"Validated 250 records in [0-9.]+s")
+
+        progress = instrumentation.Progress("Validated")
+        with mock.patch.object(progress, 'log') as log:
+            for _ in range(1000):
+                progress.update()
+            # not logged before the interval has elapsed
+            log.assert_not_called()
+
+    def test_format_prometheus(self):
+        stats = instrumentation.Stats([1])
+        stats.observe('http:www.ebi.ac.uk', 0.5)
+        stats.increment('records_validated', 2)
+        result = stats.get_stats()
+        result['caches'] = {'biosamples': {'hits': 3, 'misses': 1, 'size': 1}}
+        lines = instrumentation.format_prometheus(result, 'test').splitlines()
+        self.assertListEqual(lines, [
+            '# TYPE test_duration_seconds histogram',
+            'test_duration_seconds_bucket{name="http:www.ebi.ac.uk",le="1"} 1',
+            'test_duration_seconds_bucket{name="http:www.ebi.ac.uk",le="+Inf"} 1',
+            'test_duration_seconds_sum{name="http:www.ebi.ac.uk"} 0.5',
+            'test_duration_seconds_count{name="http:www.ebi.ac.uk"} 1',
+            '# TYPE test_events_total counter',
+            'test_events_total{name="records_validated"} 2',
+            '# TYPE test_cache_hits_total counter',
+            'test_cache_hits_total{cache="biosamples"} 3',
+            '# TYPE test_cache_misses_total counter',
+            'test_cache_misses_total{cache="biosamples"} 1',
+            '# TYPE test_cache_size gauge',
+            'test_cache_size{cache="biosamples"} 1'
+        ])
+        self.assertEqual(instrumentation.escape_label('a "b"\\'), 'a \\"b\\"\\\\')
+        self.assertEqual(instrumentation.format_prometheus({}), "\n")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*
+
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from image_validation import json_stream
+
+
+class TestJsonStream(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write(self, content: str) -> str:
+        filename = os.path.join(self.tmpdir.name, "data.json")
+        with open(filename, "w") as outfile:
+            outfile.write(content)
+        return filename
+
+    def test_iter_json_array(self):
+        with open("test_data/submission_example.json") as infile:
+            expected = json.load(infile)['sample']
+        # chunks smaller than records and numbers
+        for chunk_size in [1, 7, json_stream.CHUNK_SIZE]:
+            records = list(json_stream.iter_json_array("test_data/submission_example.json", "sample", chunk_size))
+            self.assertListEqual(records, expected)
+
+        filename = self.write(' [ 12345 , {"a": [1, 2]}, "text", true ] ')
+        self.assertListEqual(list(json_stream.iter_json_array(filename, chunk_size=2)),
+                             [12345, {"a": [1, 2]}, "text", True])
+        self.assertListEqual(list(json_stream.iter_json_array(self.write('[]'))), [])
+        # section ignored when the array is at top level
+        self.assertListEqual(list(json_stream.iter_json_array(self.write('[1]'), "sample")), [1])
+        # other sections are skipped
+        filename = self.write('{"animal": [{"alias": "a"}], "other": 1, "sample": [{"alias": "s"}], "more": {}}')
+        self.assertListEqual(list(json_stream.iter_json_array(filename, "sample", 3)), [{"alias": "s"}])
+
+    def test_iter_json_array_errors(self):
+        self.assertRaises(FileNotFoundError, list, json_stream.iter_json_array("random file"))
+        self.assertRaises(json.JSONDecodeError, list, json_stream.iter_json_array(self.write('')))
+        self.assertRaises(json.JSONDecodeError, list, json_stream.iter_json_array(self.write('[1, 2')))
+        self.assertRaises(json.JSONDecodeError, list, json_stream.iter_json_array(self.write('[1 2]')))
+        self.assertRaises(json.JSONDecodeError, list, json_stream.iter_json_array(self.write('[{"a": }]')))
+        self.assertRaises(json_stream.NotArrayError, list, json_stream.iter_json_array(self.write('{"a": 1}')))
+        self.assertRaises(json_stream.NotArrayError, list,
+                          json_stream.iter_json_array(self.write('{"a": [1]}'), "sample"))
+        self.assertRaises(json_stream.NotArrayError, list,
+                          json_stream.iter_json_array(self.write('{"sample": 1}'), "sample"))
+
+    def test_iter_json_array_malformed_record(self):
+        records = [json.dumps({'alias': f"record_{i}", 'attributes': {'Name': [{'value': f"name {i}"}]}})
+                   for i in range(5000)]
+        # a real syntax error in the middle of the file
+        records[2500] = '{"alias": "record_2500", "attributes": {"Name": [{"value": "name 2500"}]},}'
+        content = '[' + ', '.join(records) + ']'
+        filename = self.write(content)
+        decoded = []
+        with mock.patch.object(json_stream.JSONStreamReader, 'read_more', autospec=True,
+                               side_effect=json_stream.JSONStreamReader.read_more) as read_more:
+            with self.assertRaises(json.JSONDecodeError):
+                for record in json_stream.iter_json_array(filename, chunk_size=1024):
+                    decoded.append(record)
+        self.assertEqual(len(decoded), 2500)
+        # the rest of the file is not read
+        self.assertLess(read_more.call_count, len(content) // 2 // 1024 + 3)
+
+        # strings and literals cut at the end of a chunk are still read
+        filename = self.write('[' + ', '.join(['"' + 'x' * 100 + '"', 'true', 'null', '"\\u00e9"'] * 50) + ']')
+        self.assertEqual(len(list(json_stream.iter_json_array(filename, chunk_size=7))), 200)
+
+        # values too long are not read into memory
+        filename = self.write('[' + '"' + 'x' * 10000 + '"' + ']')
+        self.assertRaises(json.JSONDecodeError, list, json_stream.iter_json_array(filename, chunk_size=64,
+                                                                                  max_value_size=1000))
+        self.assertEqual(len(list(json_stream.iter_json_array(filename, chunk_size=64))[0]), 10000)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -134,6 +134,24 @@ class TestMisc(unittest.TestCase):
                          'The date value 20-1-09 does not match to the format YYYY-MM')
         self.assertEqual(misc.get_matched_date("09-07-2012", "YYYY-MM-DD"),
                          'The date value 09-07-2012 does not match to the format YYYY-MM-DD')
+        # strictly year, month and day
+        self.assertEqual(misc.get_matched_date("2012-13-07", "YYYY-MM-DD"), "Unrecognized date value 2012-13-07")
+        self.assertEqual(misc.get_matched_date("2012-00", "YYYY-MM"), "Unrecognized date value 2012-00")
+        self.assertEqual(misc.get_matched_date("2011-02-29", "YYYY-MM-DD"), "Unrecognized date value 2011-02-29")
+        self.assertEqual(misc.get_matched_date("2012-02-29", "YYYY-MM-DD"), "")
+        self.assertEqual(misc.get_matched_date("0000", "YYYY"), "Unrecognized date value 0000")
+        self.assertEqual(misc.get_matched_date("２０１２-09", "YYYY-MM"), "Unrecognized date value ２０１２-09")
+
+    def test_validators_memo(self):
+        misc.get_matched_date.cache_clear()
+        for _ in range(3):
+            self.assertEqual(misc.get_matched_date("2012-09-07", "YYYY-MM-DD"), "")
+        self.assertEqual(misc.get_matched_date.cache_info().hits, 2)
+        self.assertEqual(misc.get_matched_date.cache_info().misses, 1)
+        # only the valid inputs are remembered
+        self.assertRaises(TypeError, misc.is_url, True)
+        self.assertRaises(TypeError, misc.is_url, True)
+        self.assertRaises(TypeError, misc.is_url, ['www.google.com'])
 
     def test_get_matched_date_types(self):
         self.assertRaises(TypeError, misc.get_matched_date, 34, 34)
@@ -150,6 +168,15 @@ class TestMisc(unittest.TestCase):
         self.assertRaises(TypeError, misc.extract_ontology_id_from_iri, -12.34)
         self.assertRaises(TypeError, misc.extract_ontology_id_from_iri, True)
 
+    def test_get_iri_from_short_term(self):
+        self.assertEqual(misc.get_iri_from_short_term('EFO_0001741'), 'http://www.ebi.ac.uk/efo/EFO_0001741')
+        self.assertEqual(misc.get_iri_from_short_term('NCIT_C54269'), 'http://purl.obolibrary.org/obo/NCIT_C54269')
+        self.assertEqual(misc.get_iri_from_short_term('LBO_0000001'), 'http://purl.obolibrary.org/obo/LBO_0000001')
+
+    def test_get_iri_from_short_term_types(self):
+        self.assertRaises(TypeError, misc.get_iri_from_short_term, 34)
+        self.assertRaises(TypeError, misc.get_iri_from_short_term, True)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*
+
+import unittest
+
+from image_validation import ontology_index, use_ontology
+
+
+class TestOntologyIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = ontology_index.OntologyIndex()
+        self.index.load("test_data/ontology/test_pato.obo")
+        self.index.load("test_data/ontology/test_lbo.json")
+
+    def test_load_types(self):
+        self.assertRaises(TypeError, self.index.load, 12)
+        self.assertRaises(FileNotFoundError, self.index.load, "random file")
+
+    def test_load_obo(self):
+        self.assertTrue(self.index.contains('PATO_0000384'))
+        self.assertTrue(self.index.contains('http://purl.obolibrary.org/obo/PATO_0000384'))
+        # obsolete terms are skipped
+        self.assertFalse(self.index.contains('PATO_0000000'))
+        # typedef is not a term
+        self.assertFalse(self.index.contains('part_of'))
+        detail = self.index.get_detail('PATO_0002365')
+        self.assertEqual(detail['iri'], 'http://purl.obolibrary.org/obo/PATO_0002365')
+        self.assertEqual(detail['label'], 'intact female')
+        self.assertListEqual(detail['synonyms'], ['entire female'])
+        self.assertEqual(detail['ontology_name'], 'pato')
+        self.assertFalse(detail['has_children'])
+        self.assertTrue(self.index.get_detail('PATO_0000383')['has_children'])
+        self.assertIsNone(self.index.get_detail('PATO_1234567'))
+
+    def test_load_obographs(self):
+        self.assertTrue(self.index.contains('LBO_0000347'))
+        self.assertFalse(self.index.contains('LBO_9999999'))
+        self.assertFalse(self.index.contains('BFO_0000050'))
+        detail = self.index.get_detail('LBO_0000347')
+        self.assertEqual(detail['label'], 'Bentheim Black Pied')
+        self.assertListEqual(detail['synonyms'], ['Bunte Bentheimer'])
+        self.assertEqual(detail['ontology_name'], 'lbo')
+
+    def test_has_parent(self):
+        self.assertSetEqual(set(self.index.get_ancestors('PATO_0002365')),
+                            {'PATO_0000383', 'PATO_0000047', 'PATO_0000001'})
+        self.assertTrue(self.index.has_parent('PATO_0002365', 'PATO_0000001'))
+        self.assertTrue(self.index.has_parent('http://purl.obolibrary.org/obo/LBO_0000347', 'LBO_0000000'))
+        # wrong direction
+        self.assertFalse(self.index.has_parent('PATO_0000001', 'PATO_0002365'))
+        # term itself is not its own parent
+        self.assertFalse(self.index.has_parent('PATO_0000383', 'PATO_0000383'))
+        # only is_a relationships are followed
+        self.assertTrue(self.index.has_parent('LBO_0000010', 'LBO_0000001'))
+        self.assertFalse(self.index.has_parent('LBO_0000010', 'LBO_0000003'))
+        # not in the index
+        self.assertFalse(self.index.has_parent('UBERON_0001037', 'LBO_0000000'))
+        # closure is computed again after loading more terms
+        self.index.add_term('LBO_0000011', 'Red Angus', [], ['LBO_0000010'], 'lbo')
+        self.assertTrue(self.index.has_parent('LBO_0000011', 'LBO_0000000'))
+        self.assertTrue(self.index.get_detail('LBO_0000010')['has_children'])
+
+    def test_get_ancestors_lazily(self):
+        self.assertEqual(self.index.ancestors, {})
+        self.index.get_ancestors('PATO_0002365')
+        # only the queried term and its ancestors are memoised
+        self.assertSetEqual(set(self.index.ancestors),
+                            {'PATO_0002365', 'PATO_0000383', 'PATO_0000047', 'PATO_0000001'})
+        self.assertEqual(self.index.get_ancestors('PATO_0000047'), frozenset(['PATO_0000001']))
+        self.assertEqual(self.index.get_ancestors('UBERON_0001037'), frozenset())
+        self.assertNotIn('UBERON_0001037', self.index.ancestors)
+
+    def test_ontology_cache_offline(self):
+        cache = use_ontology.OntologyCache(index=self.index)
+        male = cache.get_ontology('PATO_0000384')
+        self.assertTrue(male.found)
+        self.assertEqual(male.get_iri(), 'http://purl.obolibrary.org/obo/PATO_0000384')
+        self.assertTrue(male.is_leaf())
+        self.assertTrue(male.label_match_ontology('Male', False))
+        self.assertTrue(cache.has_parent('LBO_0001036', 'LBO_0000001'))
+        self.assertFalse(cache.has_parent('LBO_0000347', 'LBO_0000001'))
+        # terms missing from the index are reported as not found rather than searched on OLS
+        missing = cache.get_ontology('UBERON_0001037')
+        self.assertFalse(missing.found)
+        self.assertEqual(missing.get_iri(), "")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*
+
+import unittest
+
+from image_validation import relationship_graph
+
+
+def get_record(alias, material, relationships=()):
+    return {
+        'alias': alias,
+        'attributes': {'Material': [{'value': material}]},
+        'sampleRelationships': list(relationships)
+    }
+
+
+class TestRelationshipGraph(unittest.TestCase):
+    def setUp(self):
+        self.graph = relationship_graph.RelationshipGraph([
+            get_record('mother', 'organism'),
+            get_record('father', 'organism'),
+            get_record('child', 'organism', [
+                {'alias': 'mother', 'relationshipNature': 'child of'},
+                {'alias': 'father', 'relationshipNature': 'child of'},
+                {'alias': 'unknown', 'relationshipNature': 'child of'}
+            ]),
+            get_record('specimen', 'specimen from organism', [
+                {'alias': 'child', 'relationshipNature': 'derived from'},
+                {'alias': 'mother', 'relationshipNature': 'same as'}
+            ]),
+            get_record('specimen_accession', 'specimen from organism', [
+                {'accession': 'SAMEA1', 'relationshipNature': 'derived from'}
+            ]),
+            get_record('specimen_of_specimen', 'specimen from organism', [
+                {'alias': 'specimen', 'relationshipNature': 'derived from'}
+            ]),
+            get_record('orphan', 'specimen from organism', [
+                {'alias': 'mother', 'relationshipNature': 'same as'}
+            ])
+        ])
+
+    def test_get_targets(self):
+        self.assertEqual(len(self.graph), 7)
+        self.assertEqual(self.graph.get_targets('child'), ['mother', 'father', 'unknown'])
+        self.assertEqual(self.graph.get_targets('specimen'), ['child', 'mother'])
+        self.assertEqual(self.graph.get_targets('specimen', 'derived from'), ['child'])
+        self.assertEqual(self.graph.get_targets('specimen', 'recurated from'), [])
+        self.assertEqual(self.graph.get_targets('specimen_accession'), [])
+        self.assertRaises(ValueError, self.graph.get_targets, 'unknown')
+
+    def test_get_sources(self):
+        self.assertEqual(self.graph.get_sources('mother'), ['child', 'specimen', 'orphan'])
+        self.assertEqual(self.graph.get_sources('mother', 'child of'), ['child'])
+        self.assertEqual(self.graph.get_sources('specimen_of_specimen'), [])
+        self.assertRaises(ValueError, self.graph.get_sources, 'unknown')
+
+    def test_get_organism(self):
+        self.assertEqual(self.graph.get_organism('child')['alias'], 'child')
+        self.assertIsNone(self.graph.get_organism('specimen'))
+        self.assertIsNone(self.graph.get_organism('unknown'))
+
+    def test_find_cycles(self):
+        self.assertEqual(self.graph.find_cycles(), [])
+        graph = relationship_graph.RelationshipGraph([
+            get_record('a', 'organism', [{'alias': 'b', 'relationshipNature': 'child of'}]),
+            get_record('b', 'organism', [{'alias': 'a', 'relationshipNature': 'child of'}]),
+            get_record('c', 'organism', [{'alias': 'c', 'relationshipNature': 'child of'}]),
+            get_record('d', 'organism', [{'alias': 'e', 'relationshipNature': 'same as'}]),
+            get_record('e', 'organism', [{'alias': 'd', 'relationshipNature': 'same as'}])
+        ])
+        self.assertEqual(graph.find_cycles(), [['a', 'b'], ['c']])
+        self.assertEqual(graph.find_cycles(['same as']), [['d', 'e']])
+        # the cycle starts where the path leads back to
+        graph = relationship_graph.RelationshipGraph([
+            get_record('f', 'organism', [{'alias': 'g', 'relationshipNature': 'child of'}]),
+            get_record('g', 'organism', [{'alias': 'h', 'relationshipNature': 'child of'}]),
+            get_record('h', 'organism', [{'alias': 'g', 'relationshipNature': 'child of'},
+                                         {'alias': 'f', 'relationshipNature': 'child of'}])
+        ])
+        self.assertEqual(graph.find_cycles(), [['g', 'h'], ['f', 'g', 'h']])
+
+    def test_get_orphaned_specimens(self):
+        # the relationship to a specimen is reported by the relationship check instead
+        self.assertEqual(self.graph.get_orphaned_specimens(), ['orphan'])
+
+    def test_add_record(self):
+        self.assertRaises(TypeError, self.graph.add_record, 'record')
+        self.assertRaises(ValueError, self.graph.add_record, get_record('mother', 'organism'))
+        self.graph.add_record(get_record('unknown', 'organism'))
+        self.assertFalse(self.graph.built)
+        self.assertEqual(self.graph.find_cycles(), [])
+        self.assertTrue(self.graph.built)
+        # resolved once the record is added
+        self.assertEqual(self.graph.get_sources('unknown'), ['child'])
+        self.graph.add_record(get_record('grandchild', 'organism', [
+            {'alias': 'child', 'relationshipNature': 'child of'}]))
+        self.assertEqual(self.graph.get_targets('grandchild'), ['child'])
+        self.assertEqual(self.graph.get_sources('child', 'child of'), ['grandchild'])
+        self.graph.add_record(get_record('grandmother', 'organism', [
+            {'alias': 'grandchild', 'relationshipNature': 'child of'}]))
+        self.graph.add_record(get_record('unknown_sample', 'specimen from organism'))
+        self.assertEqual(self.graph.find_cycles(), [])
+        self.assertEqual(self.graph.get_orphaned_specimens(), ['orphan', 'unknown_sample'])
@@ -1,10 +1,13 @@
 import unittest
 import json
+import pickle
 from typing import List, Dict
+from unittest import mock
 
 from image_validation import Ruleset
 from image_validation import validation
 from image_validation import ValidationResult
+from image_validation import static_parameters
 
 
 class TestRuleset(unittest.TestCase):
@@ -61,6 +64,49 @@ class TestRuleset(unittest.TestCase):
         # intact male (PATO_0002366) is child of male (PATO_0000384), but the term dow not allow descendant
         self.assertFalse(terms[0].is_allowed('PATO_0002366'))
 
+    def test_ontology_condition_lazy_iri(self):
+        library = mock.Mock()
+        library.get_ontology.return_value.get_iri.return_value = "http://purl.obolibrary.org/obo/PATO_0000383"
+        with mock.patch.object(static_parameters, 'ontology_library', library):
+            condition = Ruleset.OntologyCondition("PATO_0000383", True, False, True)
+            library.get_ontology.assert_not_called()
+            # not needed when descendants and the term itself are allowed
+            library.has_parent.return_value = True
+            self.assertTrue(condition.is_allowed("PATO_0002365"))
+            self.assertNotIn("PATO_0000383", [call[0][0] for call in library.get_ontology.call_args_list])
+            self.assertEqual(condition.iri, "http://purl.obolibrary.org/obo/PATO_0000383")
+            self.assertEqual(condition.iri, "http://purl.obolibrary.org/obo/PATO_0000383")
+            library.get_ontology.assert_called_with("PATO_0000383")
+            self.assertEqual(library.get_ontology.call_count, 2)
+            self.assertEqual(json.loads(json.dumps(condition, default=Ruleset.to_serializable)), {
+                'term': "PATO_0000383", 'include_descendant': True, 'only_leaf': False, 'include_self': True,
+                'iri': "http://purl.obolibrary.org/obo/PATO_0000383"})
+
+    def test_check_ontology_allowed_decisions(self):
+        library = mock.Mock()
+        library.has_parent.side_effect = lambda child, parent: child == "PATO_0002365"
+        library.get_ontology.return_value.get_iri.return_value = "http://purl.obolibrary.org/obo/PATO_0000383"
+        with mock.patch.object(static_parameters, 'ontology_library', library):
+            rule_field = Ruleset.RuleField("sex", "ontology_id", "mandatory")
+            rule_field.set_allowed_terms([{"term": "PATO_0000383", "allow_descendants": 1}])
+            self.assertRaises(TypeError, rule_field.check_ontology_allowed, 12)
+            for _ in range(3):
+                self.assertTrue(rule_field.check_ontology_allowed("PATO_0002365"))
+                self.assertFalse(rule_field.check_ontology_allowed("PATO_0000384"))
+            self.assertEqual(library.has_parent.call_count, 2)
+            self.assertEqual(rule_field.get_decision_stats(), {'hits': 4, 'misses': 2, 'size': 2})
+            self.assertNotIn('_decisions', json.loads(json.dumps(rule_field, default=Ruleset.to_serializable)))
+
+            rule_section = Ruleset.RuleSection("standard")
+            rule_section.add_rule(rule_field)
+            ruleset = Ruleset.RuleSet()
+            ruleset.add_rule_section(rule_section)
+            self.assertEqual(ruleset.get_decision_stats(), {'hits': 4, 'misses': 2, 'size': 2})
+
+            # changing the allowed terms discards the decisions
+            rule_field.set_allowed_terms([{"term": "PATO_0000384"}])
+            self.assertEqual(rule_field.get_decision_stats()['size'], 0)
+
     def test_rule_field_types(self):
         self.assertRaises(TypeError, Ruleset.RuleField, "test", 12, "haha")
         self.assertRaises(TypeError, Ruleset.RuleField, -12.34, "12", "haha")
@@ -125,6 +171,194 @@ class TestRuleset(unittest.TestCase):
         self.assertFalse(rule_field_1.check_ontology_allowed("NCBITaxon_28890"))
         self.assertFalse(rule_field_1.check_ontology_allowed("NCBITaxon_9605"))
 
+    def test_rule_field_validate(self):
+        def messages(rule_field, entries):
+            return [result.get_comparable_str() for result in rule_field.validate(entries, "standard", "id")]
+
+        number = Ruleset.RuleField("age", "number", "mandatory")
+        number.set_allowed_units(["days", "years"])
+        self.assertListEqual(messages(number, [{'value': 12, 'units': 'years'}]), [])
+        self.assertListEqual(messages(number, [{'value': 12, 'units': 'months'}]), [
+            'Error: months for field age is not in the valid units list (days, years) (standard section)'])
+        self.assertListEqual(messages(number, [{'value': 12}]), [
+            'Error: One of days, years need to be present for the field age (standard section)'])
+        self.assertListEqual(messages(number, [{'value': '12', 'units': 'days'}]), [
+            'Error: For field age the provided value 12 is not represented as/of the expected type Number '
+            '(standard section)'])
+        self.assertListEqual(messages(number, []), ['Error: Mandatory field age has empty value (standard section)'])
+
+        limited = Ruleset.RuleField("storage", "limited value", "optional", multiple="max 2")
+        limited.set_allowed_values(["frozen", "fresh"])
+        self.assertListEqual(messages(limited, [{'value': 'fresh'}, {'value': 'frozen'}]), [])
+        self.assertListEqual(messages(limited, [{'value': 'dried'}]), [
+            'Error: <dried> of field storage is not in the valid values list (<frozen>, <fresh>) (standard section)'])
+        # not hashable value is reported rather than raising an exception
+        self.assertListEqual(messages(limited, [{'value': ['fresh']}]), [
+            "Error: <['fresh']> of field storage is not in the valid values list (<frozen>, <fresh>) "
+            "(standard section)"])
+        self.assertListEqual(messages(limited, [{'value': 'fresh', 'units': 'kg'}]), [
+            'Warning: No units required but kg is used as unit for field storage (standard section)'])
+        self.assertListEqual(messages(limited, [{'value': 'fresh'}] * 3), [
+            'Error: Maximum of 2 values allowed for field storage but 3 values provided (standard section)'])
+        self.assertListEqual(messages(limited, []), [
+            'Warning: optional field storage has empty value, better remove the field (standard section)'])
+
+        date = Ruleset.RuleField("birth", "date", "recommended")
+        date.set_allowed_units(["YYYY-MM-DD", "YYYY"])
+        self.assertListEqual(messages(date, [{'value': '2019-03-20', 'units': 'YYYY-MM-DD'}]), [])
+        self.assertListEqual(messages(date, [{'value': '2019-03', 'units': 'YYYY'}]), [
+            'Error: The date value 2019-03 does not match to the format YYYY (standard section)'])
+        self.assertListEqual(messages(date, [{'value': 2019, 'units': 'YYYY'}]), [
+            'Error: For field birth the provided value 2019 is not of the expected type date (standard section)'])
+
+        uri = Ruleset.RuleField("email", "uri", "mandatory", multiple="yes")
+        self.assertListEqual(messages(uri, [{'value': 'mailto:info@a.com'}, {'value': 'http://www.a.com'}]), [])
+        self.assertListEqual(messages(uri, [{'value': 'info@a.com'}]), [
+            'Error: Email address must have prefix "mailto:" in the field email (standard section)'])
+
+        doi = Ruleset.RuleField("publication", "doi", "optional")
+        self.assertListEqual(messages(doi, [{'value': 'doi:10.1000/abc'}]), [])
+        self.assertListEqual(messages(doi, [{'value': 'doi:10.100/abc'}]), [
+            'Error: Invalid DOI value supplied in the field publication (standard section)'])
+
+        text = Ruleset.RuleField("name", "text", "optional")
+        self.assertListEqual(messages(text, [{'value': 'name', 'terms': [{'url': 'PATO_0000384'}]}]), [
+            'Warning: Ontology provided for field name however there is no requirement in the ruleset '
+            '(standard section)'])
+
+        # compiled settings are not exported
+        rule_section = Ruleset.RuleSection('test')
+        rule_section.add_rule(limited)
+        exported = json.loads(rule_section.to_json())['rules']['optional']['storage']
+        self.assertListEqual(sorted(exported.keys()), ['allowed_terms', 'allowed_units', 'allowed_values',
+                                                       'description', 'multiple', 'name', 'required', 'type'])
+
+    def test_validate_column(self):
+        number = Ruleset.RuleField("age", "number", "mandatory", multiple="yes")
+        number.set_allowed_units(["days", "years"])
+        column = [
+            ("id_1", [{'value': 12, 'units': 'years'}]),
+            ("id_2", [{'value': 12, 'units': 'months'}]),
+            ("id_3", [{'value': 12.0, 'units': 'years'}]),
+            ("id_4", [{'value': '12', 'units': 'years'}]),
+            ("id_5", [{'value': 12, 'units': 'months'}]),
+            ("id_6", [{'value': 12}]),
+            ("id_7", [{'value': [12], 'units': 'years'}]),
+            ("id_8", [{'value': 12, 'units': 'years'}, {'value': 12, 'units': 'months'}]),
+            ("id_9", [])
+        ]
+        expected = [number.validate(entries, "standard", record_id) for record_id, entries in column]
+        results = number.validate_column(column, "standard")
+        self.assertListEqual([[one.get_comparable_str() for one in result] for result in results],
+                             [[one.get_comparable_str() for one in result] for result in expected])
+        self.assertListEqual([[one.record_id for one in result] for result in results],
+                             [[record_id] * len(result) for (record_id, _), result in zip(column, expected)])
+        self.assertListEqual(results[0], [])
+        self.assertEqual(len(results[1]), 1)
+
+    def test_rule_set_validate_batch(self):
+        standard = Ruleset.RuleSection("standard")
+        standard.add_rule(Ruleset.RuleField("Data source ID", "text", "mandatory"))
+        standard.add_rule(Ruleset.RuleField("Material", "text", "mandatory"))
+        standard.add_rule(Ruleset.RuleField("Name", "text", "mandatory"))
+        storage = Ruleset.RuleField("Storage", "limited value", "optional")
+        storage.set_allowed_values(["frozen", "fresh"])
+        standard.add_rule(storage)
+        date = Ruleset.RuleField("Collection date", "date", "recommended")
+        date.set_allowed_units(["YYYY-MM-DD", "YYYY"])
+        standard.add_rule(date)
+        animal = Ruleset.RuleSection("animal")
+        animal.add_condition("Material", "organism")
+        weight = Ruleset.RuleField("Weight", "number", "mandatory")
+        weight.set_allowed_units(["kg"])
+        animal.add_rule(weight)
+        animal.add_rule(Ruleset.RuleField("Publication", "doi", "optional"))
+        ruleset = Ruleset.RuleSet()
+        ruleset.add_rule_section(standard)
+        ruleset.add_rule_section(animal)
+
+        records = []
+        for i in range(30):
+            attributes = {
+                'Data source ID': [{'value': f"id_{i}"}],
+                'Material': [{'value': "organism" if i % 2 else "specimen"}],
+                'Storage': [{'value': ["fresh", "frozen", "dried"][i % 3]}],
+                'Collection date': [{'value': ["2019-03-20", "2019-03", "2019"][i % 3],
+                                     'units': ["YYYY-MM-DD", "YYYY"][i % 2]}],
+                'Weight': [{'value': [12, "12", 12.5][i % 3], 'units': ["kg", "g"][i % 2]}],
+                'Publication': [{'value': ["doi:10.1000/abc", "doi:10.100/abc"][i % 2]}]
+            }
+            if i % 5:
+                attributes['Name'] = [{'value': f"name {i}"}]
+            if i % 7 == 0:
+                attributes['Unknown'] = [{'value': "something"}]
+            if i % 11 == 0:
+                del attributes['Weight']
+            records.append({'attributes': attributes})
+
+        results = ruleset.validate_batch(records)
+        expected = [ruleset.validate(record) for record in records]
+        self.assertListEqual([result.record_id for result in results], [f"id_{i}" for i in range(30)])
+        self.assertListEqual([result.get_messages() for result in results],
+                             [result.get_messages() for result in expected])
+        self.assertListEqual(ruleset.validate_batch([]), [])
+
+        # the same results when the details are logged
+        with self.assertLogs('image_validation.Ruleset', 'DEBUG') as logs:
+            debugged = [ruleset.validate(record) for record in records]
+        self.assertIn("DEBUG:image_validation.Ruleset:Applying animal ruleset to record id_1", logs.output)
+        self.assertListEqual([result.get_messages() for result in debugged],
+                             [result.get_messages() for result in expected])
+
+    def test_get_applicable_sections(self):
+        standard = Ruleset.RuleSection("standard")
+        standard.add_rule(Ruleset.RuleField("Data source ID", "text", "mandatory"))
+        standard.add_rule(Ruleset.RuleField("Material", "text", "mandatory"))
+        animal = Ruleset.RuleSection("animal")
+        animal.add_condition("Material", "organism")
+        animal.add_rule(Ruleset.RuleField("Sex", "text", "mandatory"))
+        sample = Ruleset.RuleSection("sample")
+        sample.add_condition("Material", "specimen")
+        sample.add_rule(Ruleset.RuleField("Organism part", "text", "mandatory"))
+        ruleset = Ruleset.RuleSet()
+        for section in [standard, animal, sample]:
+            ruleset.add_rule_section(section)
+
+        def get_record(*materials):
+            return {'attributes': {'Material': [{'value': material} for material in materials]}}
+
+        sections, mapped = ruleset.get_applicable_sections(get_record("organism"))
+        self.assertListEqual(sections, [standard, animal])
+        self.assertSetEqual(mapped, {"Data source ID", "Material", "Sex"})
+        self.assertListEqual(ruleset.get_applicable_sections(get_record("specimen", "organism"))[0],
+                             [standard, animal, sample])
+        self.assertListEqual(ruleset.get_applicable_sections({'attributes': {}})[0], [standard])
+        # values which could not be hashed are still checked
+        self.assertListEqual(ruleset.get_applicable_sections(get_record(["organism"]))[0], [standard])
+        # worked out once for every material
+        self.assertIs(ruleset.get_applicable_sections(get_record("organism"))[0], sections)
+        self.assertDictEqual(ruleset._dispatch.get_stats(), {'hits': 1, 'misses': 3, 'size': 3})
+
+        # the index follows the changes of the sections
+        animal.add_rule(Ruleset.RuleField("Weight", "number", "optional"))
+        self.assertIn("Weight", ruleset.get_applicable_sections(get_record("organism"))[1])
+        other = Ruleset.RuleSection("other")
+        other.add_condition("Project", "IMAGE")
+        ruleset.add_rule_section(other)
+        record = get_record("specimen")
+        record['attributes']['Project'] = [{'value': "IMAGE"}]
+        self.assertListEqual(ruleset.get_applicable_sections(record)[0], [standard, sample, other])
+        self.assertIsNone(pickle.loads(pickle.dumps(ruleset))._dispatch)
+        self.assertNotIn('_dispatch', json.loads(ruleset.to_json()))
+
+        # the sections of other rulesets changing do not start the index again
+        dispatch = ruleset._dispatch
+        unrelated = Ruleset.RuleSection("unrelated")
+        Ruleset.RuleSet().add_rule_section(unrelated)
+        unrelated.add_rule(Ruleset.RuleField("Name", "text", "optional"))
+        ruleset.get_applicable_sections(record)
+        self.assertIs(ruleset._dispatch, dispatch)
+
     def test_rule_section_types(self):
         self.assertRaises(TypeError, Ruleset.RuleSection, 12)
         self.assertRaises(TypeError, Ruleset.RuleSection, -12.34)
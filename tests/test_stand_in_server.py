@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*
+
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from image_validation import biosamples
+from image_validation import http_client
+from image_validation import ontology_index
+from image_validation import stand_in_server
+from image_validation import use_ontology
+
+
+def get_index():
+    index = ontology_index.OntologyIndex()
+    index.add_term('UBERON_0001062', 'anatomical entity', [], [], 'uberon')
+    index.add_term('UBERON_0000465', 'material anatomical entity', [], ['UBERON_0001062'], 'uberon')
+    index.add_term('UBERON_0000955', 'brain', ['encephalon'], ['UBERON_0000465'], 'uberon')
+    return index
+
+
+class TestStandInServer(unittest.TestCase):
+    def setUp(self):
+        self.server = stand_in_server.StandInServer(seed=1)
+        self.server.add_index(get_index())
+        self.server.add_fixtures({'biosamples': ['SAMEA1']})
+        self.server.start()
+        self.addCleanup(self.server.stop)
+        urls = self.server.get_urls()
+        for module, name, url in [(use_ontology, 'OLS_URL', urls['IMAGE_VALIDATION_OLS_URL']),
+                                  (use_ontology, 'ZOOMA_URL', urls['IMAGE_VALIDATION_ZOOMA_URL']),
+                                  (biosamples, 'BIOSAMPLES_URL', urls['IMAGE_VALIDATION_BIOSAMPLES_URL'])]:
+            patcher = mock.patch.object(module, name, url)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_constructor(self):
+        self.assertRaises(ValueError, stand_in_server.StandInServer, latency=-1)
+        self.assertRaises(ValueError, stand_in_server.StandInServer, error_rate=2)
+        self.assertRaises(TypeError, self.server.add_fixtures, ['SAMEA1'])
+        self.assertRaises(TypeError, self.server.add_term, 12, 'brain', 'uberon')
+
+    def test_ontology(self):
+        brain = use_ontology.Ontology('UBERON_0000955')
+        self.assertTrue(brain.found)
+        self.assertEqual(brain.get_label(), 'brain')
+        self.assertListEqual(brain.detail['synonyms'], ['encephalon'])
+        self.assertFalse(use_ontology.Ontology('UBERON_9999999').found)
+        self.assertSetEqual(set(use_ontology.retrieve_ancestors(brain.detail)),
+                            {'UBERON_0000465', 'UBERON_0001062'})
+        # the following pages are linked
+        with mock.patch.object(use_ontology, 'ANCESTORS_PAGE_SIZE', 1):
+            self.assertSetEqual(set(use_ontology.retrieve_ancestors(brain.detail)),
+                                {'UBERON_0000465', 'UBERON_0001062'})
+        self.assertEqual(self.server.requests['/ols/api/terms'], 2)
+
+    def test_use_zooma(self):
+        self.assertDictEqual(use_ontology.use_zooma('Brain', 'organism part'), {
+            'type': 'organism part',
+            'confidence': 'High',
+            'text': 'brain',
+            'ontologyTerms': 'http://purl.obolibrary.org/obo/UBERON_0000955'
+        })
+        self.assertIsNone(use_ontology.use_zooma('unknown', 'organism part'))
+
+    def test_biosamples(self):
+        library = biosamples.BioSamplesCache()
+        self.assertEqual(library.get_status('SAMEA1'), 200)
+        self.assertEqual(library.get_status('SAMEA2'), 404)
+
+    def test_error_rate(self):
+        self.server.error_rate = 1
+        # the failures are not retried by the test
+        with mock.patch.dict(http_client.settings, {'retries': 0}), \
+                mock.patch.object(http_client, '_session', None):
+            self.assertEqual(biosamples.BioSamplesCache().get_status('SAMEA1'), 503)
+
+    def test_load(self):
+        with tempfile.TemporaryDirectory() as workdir:
+            filename = os.path.join(workdir, 'fixtures.json')
+            with open(filename, 'w') as outfile:
+                json.dump({'terms': {'PATO_0000384': {'label': 'male', 'ontology_name': 'pato'}},
+                           'biosamples': ['SAMEA2']}, outfile)
+            self.server.load(filename)
+        self.assertTrue(use_ontology.Ontology('PATO_0000384').found)
+        self.assertEqual(biosamples.BioSamplesCache().get_status('SAMEA2'), 200)
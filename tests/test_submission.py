@@ -1,7 +1,42 @@
+import asyncio
+import json
+import pickle
+import shutil
+import tempfile
+import time
 import unittest
 from typing import List
+from unittest import mock
 
-from image_validation import Submission, static_parameters
+from image_validation import Submission, static_parameters, Ruleset, validation, use_ontology, ontology_index, \
+    biosamples
+
+
+def get_records_submission():
+    """
+    The submission of 25 records with errors and warnings, and the messages expected when validating them one by one
+    """
+    submission = Submission.Submission("test")
+    section = Ruleset.RuleSection("standard")
+    section.add_rule(Ruleset.RuleField("Data source ID", "text", "mandatory"))
+    section.add_rule(Ruleset.RuleField("Name", "text", "mandatory"))
+    rule = Ruleset.RuleField("Project", "limited value", "recommended")
+    rule.set_allowed_values(["IMAGE"])
+    section.add_rule(rule)
+    submission.ruleset = Ruleset.RuleSet()
+    submission.ruleset.add_rule_section(section)
+    submission.data = []
+    for i in range(25):
+        attributes = {'Data source ID': [{'value': f"id_{i}"}], 'Project': [{'value': "IMAGE"}]}
+        if i % 3:
+            attributes['Name'] = [{'value': f"name {i}"}]
+        if i % 4 == 0:
+            attributes['Project'] = [{'value': "other"}]
+        if i % 5 == 0:
+            attributes['Unknown'] = [{'value': "something"}]
+        submission.data.append({'alias': f"alias_{i}", 'attributes': attributes})
+    expected = [result.get_messages() for _, result in submission.validate_records()]
+    return submission, expected
 
 
 class TestRuleset(unittest.TestCase):
@@ -73,6 +108,30 @@ class TestRuleset(unittest.TestCase):
         load_ruleset_result = submission.load_ruleset("test_data/test_ruleset.json")
         self.assertListEqual(load_ruleset_result.get_messages(), list())
 
+    def test_load_ruleset_snapshot(self):
+        snapshot_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, snapshot_dir)
+        # offline, the terms are not needed to check snapshots
+        offline_library = use_ontology.OntologyCache(index=ontology_index.OntologyIndex())
+        patcher = mock.patch.object(static_parameters, 'ontology_library', offline_library)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        submission = Submission.Submission("test")
+        submission.load_ruleset("test_data/test_error_ruleset.json", snapshot_dir)
+        self.assertFalse(submission.is_ruleset_ready())
+        # rulesets failing the check are not saved
+        self.assertIsNone(validation.load_ruleset_snapshot("test_data/test_error_ruleset.json", snapshot_dir))
+
+        submission.load_ruleset("test_data/test_ruleset.json", snapshot_dir)
+        self.assertTrue(submission.is_ruleset_ready())
+        expected = json.dumps(submission.ruleset.to_json())
+        with mock.patch.object(validation, 'read_in_ruleset') as read_in_ruleset:
+            load_ruleset_result = submission.load_ruleset("test_data/test_ruleset.json", snapshot_dir)
+            read_in_ruleset.assert_not_called()
+        self.assertListEqual(load_ruleset_result.get_messages(), list())
+        self.assertTrue(submission.is_ruleset_ready())
+        self.assertEqual(json.dumps(submission.ruleset.to_json()), expected)
+
     # more intuitive to test those two method together
     def test_validate_and_get_validation_results(self):
         submission = Submission.Submission("test")
@@ -86,3 +145,310 @@ class TestRuleset(unittest.TestCase):
         submission.validate()
         print(submission.get_validation_results())
 
+    def test_validate_records(self):
+        submission, expected = get_records_submission()
+        for chunk_size in [0, 2]:
+            validated = list(submission.validate_records(workers=2, chunk_size=chunk_size))
+            # same results and same order
+            self.assertListEqual([record['alias'] for record, _ in validated], [f"alias_{i}" for i in range(25)])
+            results = [result for _, result in validated]
+            self.assertListEqual([result.get_messages() for result in results], expected)
+            self.assertListEqual([result.record_id for result in results], [f"id_{i}" for i in range(25)])
+            self.assertEqual(results[0].get_overall_status(), "Error")
+            self.assertEqual(results[1].get_overall_status(), "Pass")
+
+        self.assertRaises(TypeError, next, submission.validate_records('2'))
+        self.assertRaises(ValueError, next, submission.validate_records(0))
+
+    def test_validate_records_columnar(self):
+        submission, expected = get_records_submission()
+        submission.columnar = True
+        for workers, chunk_size in [(1, 0), (1, 4), (2, 2)]:
+            validated = list(submission.validate_records(workers=workers, chunk_size=chunk_size))
+            self.assertListEqual([record['alias'] for record, _ in validated], [f"alias_{i}" for i in range(25)])
+            self.assertListEqual([result.get_messages() for _, result in validated], expected)
+
+    def test_validate_records_field_timing(self):
+        submission, _ = get_records_submission()
+        # the validation time of every field is also collected by the worker processes
+        submission.field_timing = True
+        for workers in [1, 2]:
+            submission.stats.reset()
+            list(submission.validate_records(workers=workers))
+            stats = submission.stats.get_stats()
+            self.assertEqual(stats['counters']['records_validated'], 25)
+            self.assertIn('field:Project', stats['timers'])
+            self.assertEqual(stats['timers']['field:Project']['count'], 16)
+        # not timed by default
+        submission.field_timing = False
+        submission.stats.reset()
+        list(submission.validate_records())
+        self.assertNotIn('field:Project', submission.stats.get_stats()['timers'])
+
+    def test_avalidate(self):
+        section = Ruleset.RuleSection("standard")
+        section.add_rule(Ruleset.RuleField("Data source ID", "text", "mandatory"))
+        for field in ["Material", "Collection place accuracy", "Species"]:
+            section.add_rule(Ruleset.RuleField(field, "text", "mandatory"))
+        ruleset = Ruleset.RuleSet()
+        ruleset.add_rule_section(section)
+        data = []
+        for i in range(6):
+            attributes = {
+                'Data source ID': [{'value': f"id_{i}"}],
+                'Material': [{'value': "specimen from organism" if i % 3 else "pool of specimens"}],
+                'Collection place accuracy': [{'value': "missing geographic information"}],
+                'Species': [{'value': "Sus scrofa",
+                             'terms': [{'url': "http://purl.obolibrary.org/obo/NCBITaxon_9823"}]}]
+            }
+            relationships = [{'accession': f"SAMEA{i % 2}", 'relationshipNature': "derived from"}] if i % 3 else []
+            data.append({'alias': f"alias_{i}", 'taxonId': 9823, 'attributes': attributes,
+                         'sampleRelationships': relationships})
+
+        def get(url, **kwargs):
+            response = mock.Mock()
+            response.status_code = 200 if url.endswith("SAMEA1") else 404
+            return response
+
+        offline_library = use_ontology.OntologyCache(index=ontology_index.OntologyIndex())
+        workdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, workdir)
+        data_file = f"{workdir}/data.json"
+        with open(data_file, 'w') as outfile:
+            json.dump(data, outfile)
+        results = []
+        for mode in ["validate", "avalidate", "streaming"]:
+            with mock.patch.object(static_parameters, 'ontology_library', offline_library), \
+                    mock.patch.object(static_parameters, 'biosamples_library', biosamples.BioSamplesCache()), \
+                    mock.patch.object(biosamples.http_client, 'get', side_effect=get) as http_get:
+                submission = Submission.Submission("test")
+                submission.data = data
+                submission.ruleset = ruleset
+                submission.data_ready_flag = True
+                submission.ruleset_pass_flag = True
+                if mode == "avalidate":
+                    asyncio.get_event_loop().run_until_complete(submission.avalidate(concurrency=2))
+                elif mode == "streaming":
+                    # the records are read from the file, not checked again by load_data
+                    submission.data = None
+                    submission.streaming = True
+                    submission.data_file = data_file
+                    with mock.patch.object(Submission.json_stream, 'iter_json_array',
+                                           wraps=Submission.json_stream.iter_json_array) as iter_json_array:
+                        submission.validate(prefetch_workers=2)
+                    # the lookups are collected with the fingerprints, the graph is built by the first scan
+                    self.assertEqual(iter_json_array.call_count, 3)
+                else:
+                    submission.validate()
+                results.append([result.get_messages() for result in submission.get_validation_results()])
+                # every accession is only checked once
+                self.assertEqual(http_get.call_count, 2)
+                stats = submission.get_stats()
+                self.assertEqual(stats['counters']['records_validated'], 6)
+                self.assertEqual(stats['timers']['context_validation']['count'], 6)
+                self.assertEqual(stats['timers']['ruleset_validate']['count'], 6)
+                self.assertEqual(stats['caches']['biosamples']['size'], 2)
+                self.assertIn('image_validation_duration_seconds_count{name="first_scan"} 1',
+                              submission.get_prometheus_metrics())
+        self.assertListEqual(results[0], results[1])
+        self.assertListEqual(results[0], results[2])
+        expected = 'Fail to retrieve record SAMEA0 from BioSamples as required in the relationship'
+        self.assertListEqual([expected in messages for messages in results[1]],
+                             [False, False, True, False, True, False])
+
+        submission = Submission.Submission("test")
+        loop = asyncio.get_event_loop()
+        self.assertRaises(TypeError, loop.run_until_complete, submission.avalidate('8'))
+        self.assertRaises(ValueError, loop.run_until_complete, submission.avalidate(0))
+        # not ready, nothing validated
+        loop.run_until_complete(submission.avalidate())
+        self.assertListEqual(submission.get_validation_results(), [])
+
+    def test_avalidate_responsive(self):
+        submission = Submission.Submission("test")
+        submission.data = []
+        submission.ruleset = Ruleset.RuleSet()
+        submission.data_ready_flag = True
+        submission.ruleset_pass_flag = True
+
+        def scan(*args):
+            # e.g. cache misses answered by OLS
+            time.sleep(0.3)
+
+        async def tick(task):
+            ticks = 0
+            while not task.done():
+                await asyncio.sleep(0.01)
+                ticks += 1
+            return ticks
+
+        async def run():
+            task = asyncio.ensure_future(submission.avalidate())
+            ticks = await tick(task)
+            await task
+            return ticks
+
+        with mock.patch.object(submission, 'scan', side_effect=scan) as mock_scan:
+            ticks = asyncio.get_event_loop().run_until_complete(run())
+        mock_scan.assert_called_once()
+        # the other coroutines keep running while the records are scanned
+        self.assertGreater(ticks, 10)
+
+    def test_validate_incremental(self):
+        section = Ruleset.RuleSection("standard")
+        for field in ["Data source ID", "Material", "Species", "Sex", "Birth location accuracy", "Organism part",
+                      "Collection place accuracy"]:
+            section.add_rule(Ruleset.RuleField(field, "text", "optional"))
+        ruleset = Ruleset.RuleSet()
+        ruleset.add_rule_section(section)
+
+        def species(name, taxon_id):
+            return [{'value': name, 'terms': [{'url': f"http://purl.obolibrary.org/obo/NCBITaxon_{taxon_id}"}]}]
+
+        data = []
+        for i in range(3):
+            data.append({'alias': f"animal_{i}", 'taxonId': 9823, 'attributes': {
+                'Data source ID': [{'value': f"animal_{i}"}], 'Material': [{'value': "organism"}],
+                'Species': species("Sus scrofa", 9823),
+                'Sex': [{'value': "male", 'terms': [{'url': "http://purl.obolibrary.org/obo/PATO_0000384"}]}],
+                'Birth location accuracy': [{'value': "missing geographic information"}]}})
+        for i in range(6):
+            data.append({'alias': f"sample_{i}", 'taxonId': 9823, 'attributes': {
+                'Data source ID': [{'value': f"sample_{i}"}], 'Material': [{'value': "specimen from organism"}],
+                'Species': species("Sus scrofa", 9823),
+                'Organism part': [{'value': "semen",
+                                   'terms': [{'url': "http://purl.obolibrary.org/obo/UBERON_0001968"}]}],
+                'Collection place accuracy': [{'value': "missing geographic information"}]},
+                'sampleRelationships': [{'alias': f"animal_{i % 3}", 'relationshipNature': "derived from"}]})
+
+        def validate(records, submission=None):
+            if submission is None:
+                submission = Submission.Submission("test")
+                submission.ruleset = ruleset
+                submission.data_ready_flag = True
+                submission.ruleset_pass_flag = True
+            submission.data = records
+            with mock.patch.object(ruleset, 'validate', wraps=ruleset.validate) as validate_record:
+                submission.validate(prefetch_workers=0, incremental=True)
+            validated = sorted(call[0][0]['alias'] for call in validate_record.call_args_list)
+            results = [(result.record_id, result.get_messages()) for result in submission.get_validation_results()]
+            return submission, validated, results
+
+        with mock.patch.object(static_parameters, 'ontology_library',
+                               use_ontology.OntologyCache(index=ontology_index.OntologyIndex())):
+            submission, validated, results = validate(data)
+            # the first validation checks every record
+            self.assertEqual(len(validated), 9)
+            submission, validated, incremental_results = validate(data, submission)
+            self.assertListEqual(validated, [])
+            self.assertListEqual(incremental_results, results)
+
+            # the animal changed, its specimens are checked again using the results of the first scan
+            data[0] = json.loads(json.dumps(data[0]))
+            data[0]['taxonId'] = 9913
+            data[0]['attributes']['Species'] = species("Bos taurus", 9913)
+            submission, validated, incremental_results = validate(data, submission)
+            self.assertListEqual(validated, ['animal_0'])
+            # the specimens referencing the animal are found from the reverse edges of the graph
+            affected = submission.get_affected_records({'animal_0'}, submission.relationship_graph)
+            self.assertListEqual([record['alias'] for record in affected], ['animal_0', 'sample_0', 'sample_3'])
+            _, _, expected = validate(data)
+            self.assertListEqual(incremental_results, expected)
+            self.assertNotEqual(incremental_results, results)
+
+            # removed records
+            data = [record for record in data if record['alias'] != 'animal_1']
+            submission, validated, incremental_results = validate(data, submission)
+            self.assertListEqual(validated, [])
+            _, _, expected = validate(data)
+            self.assertListEqual(incremental_results, expected)
+            self.assertIn('Could not locate the referenced record animal_1', incremental_results[3][1][0])
+
+            # everything is checked again with another ruleset
+            submission.ruleset = pickle.loads(pickle.dumps(ruleset))
+            submission.validate(prefetch_workers=0, incremental=True)
+            self.assertEqual(submission.validated_ruleset, submission.ruleset)
+            self.assertEqual(len(submission.first_scan_results), 8)
+
+    def test_validate_pedigree(self):
+        section = Ruleset.RuleSection("standard")
+        for field in ["Data source ID", "Material", "Species", "Sex", "Birth location accuracy", "Organism part",
+                      "Collection place accuracy"]:
+            section.add_rule(Ruleset.RuleField(field, "text", "optional"))
+        ruleset = Ruleset.RuleSet()
+        ruleset.add_rule_section(section)
+
+        def get_record(alias, material, relationships):
+            attributes = {'Data source ID': [{'value': alias}], 'Material': [{'value': material}],
+                          'Species': [{'value': "Sus scrofa",
+                                       'terms': [{'url': "http://purl.obolibrary.org/obo/NCBITaxon_9823"}]}]}
+            if material == "organism":
+                attributes['Sex'] = [{'value': "male"}]
+                attributes['Birth location accuracy'] = [{'value': "missing geographic information"}]
+            else:
+                attributes['Organism part'] = [{'value': "hair",
+                                                'terms': [{'url': "http://purl.obolibrary.org/obo/UBERON_0001037"}]}]
+                attributes['Collection place accuracy'] = [{'value': "missing geographic information"}]
+            return {'alias': alias, 'taxonId': 9823, 'attributes': attributes,
+                    'sampleRelationships': [{'alias': target, 'relationshipNature': nature}
+                                            for target, nature in relationships]}
+
+        data = [
+            get_record('animal_1', "organism", [('animal_2', "child of")]),
+            get_record('animal_2', "organism", [('animal_3', "child of")]),
+            get_record('animal_3', "organism", [('animal_1', "child of")]),
+            get_record('sample_1', "specimen from organism", [('animal_1', "derived from")]),
+            get_record('sample_2', "specimen from organism", [('animal_1', "same as")])
+        ]
+
+        def get_errors(submission):
+            return {result.record_id: [message for message in result.get_messages()
+                                       if not message.startswith("Warning")]
+                    for result in submission.get_validation_results()}
+
+        submission = Submission.Submission("test")
+        submission.data = data
+        submission.ruleset = ruleset
+        submission.data_ready_flag = True
+        submission.ruleset_pass_flag = True
+        with mock.patch.object(static_parameters, 'ontology_library',
+                               use_ontology.OntologyCache(index=ontology_index.OntologyIndex())):
+            submission.validate(prefetch_workers=0, incremental=True)
+            errors = get_errors(submission)
+            self.assertListEqual(errors['animal_2'],
+                                 ['Circular relationships found: animal_1 -> animal_2 -> animal_3 -> animal_1'])
+            self.assertListEqual(errors['sample_1'], [])
+            self.assertListEqual(errors['sample_2'], ['Specimen is not derived from any animal'])
+
+            # breaking the cycle also validates again the records of the cycle which have not changed
+            data[0] = get_record('animal_1', "organism", [])
+            submission.validate(prefetch_workers=0, incremental=True)
+            self.assertDictEqual(submission.cycles, {})
+            errors = get_errors(submission)
+            self.assertListEqual(errors['animal_2'], [])
+            self.assertListEqual(errors['animal_3'], [])
+
+    def test_load_data_streaming(self):
+        submission = Submission.Submission("test", id_field='id')
+        submission.load_data("test_data/usi/test_error_duplicate_alias.json", streaming=True)
+        self.assertFalse(submission.is_data_ready())
+        submission.load_data("test_data/data/test_error_rule_types.json", streaming=True)
+        self.assertTrue(submission.is_data_ready())
+        # records are not kept in memory
+        self.assertIsNone(submission.data)
+        with open("test_data/data/test_error_rule_types.json") as infile:
+            self.assertListEqual(list(submission.iter_records()), json.load(infile))
+
+        # same results as loading the whole file
+        for filename in ["test_data/usi/file_no_existing.json", "test_data/test_empty.json",
+                         "test_data/usi/test_error_duplicate_alias.json", "test_data/test_error_duplicate_id.json",
+                         "test_data/usi/test_error_not_array.json", "test_data/usi/test_error_not_dict.json"]:
+            expected = submission.load_data(filename).get_messages()
+            self.assertListEqual(submission.load_data(filename, streaming=True).get_messages(), expected)
+
+        submission = Submission.Submission("test")
+        submission.load_data("test_data/submission_example.json", section="sample", streaming=True)
+        self.assertTrue(submission.is_data_ready())
+        self.assertEqual(len(list(submission.iter_records())), 25)
+        submission.load_data("test_data/submission_example.json", section="wrong", streaming=True)
+        self.assertFalse(submission.is_data_ready())
@@ -1,9 +1,13 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*
 
+import os
+import pickle
+import tempfile
 import unittest
+from unittest import mock
 
-from image_validation import use_ontology
+from image_validation import use_ontology, cache_backends
 
 class TestUseOntology(unittest.TestCase):
 
@@ -251,6 +255,107 @@ class TestUseOntology(unittest.TestCase):
         self.assertRaises(TypeError, cache.contains, 12)
         self.assertRaises(TypeError, cache.contains, True)
 
+    def test_ontology_cache_backend(self):
+        detail = {
+            'iri': 'http://purl.obolibrary.org/obo/PATO_0002365',
+            'label': 'intact female',
+            'ontology_name': 'pato',
+            'has_children': False,
+            'is_defining_ontology': True
+        }
+        with tempfile.TemporaryDirectory() as tmpdir:
+            backend = cache_backends.SQLiteCacheBackend(os.path.join(tmpdir, "cache.sqlite"))
+            backend.set('terms', 'PATO_0002365', detail)
+            backend.set('ancestors', 'PATO_0002365', ['PATO_0000383', 'PATO_0000047', 'PATO_0000001'])
+            # both answered from the persistent storage, no OLS request
+            cache = use_ontology.OntologyCache(backend)
+            ontology = cache.get_ontology('PATO_0002365')
+            self.assertTrue(ontology.found)
+            self.assertEqual(ontology.get_label(), 'intact female')
+            self.assertTrue(ontology.is_leaf())
+            self.assertTrue(cache.contains('PATO_0002365'))
+            self.assertTrue(cache.has_parent('PATO_0002365', 'PATO_0000383'))
+            self.assertTrue(cache.has_parent('PATO_0002365', 'http://purl.obolibrary.org/obo/PATO_0000001'))
+            self.assertFalse(cache.has_parent('PATO_0002365', 'PATO_0000384'))
+            backend.close()
+
+        self.assertRaises(TypeError, use_ontology.Ontology.from_detail, 12, detail)
+        self.assertRaises(TypeError, use_ontology.Ontology.from_detail, 'PATO_0002365', 'detail')
+
+    def test_ontology_cache_prefetch(self):
+        cache = use_ontology.OntologyCache()
+        cache.add_ontology(use_ontology.Ontology.from_detail('PATO_0000384', {'iri': 'PATO_0000384'}))
+        with mock.patch.object(cache, 'get_ontology') as get_ontology, \
+                mock.patch.object(cache, 'get_ancestors', side_effect=ValueError("OLS down")) as get_ancestors:
+            cache.prefetch(['PATO_0000384', 'PATO_0000383', 'PATO_0000383'],
+                           [('LBO_0000010', 'LBO_0000000'), ('LBO_0000010', 'LBO_0000001')], max_workers=2)
+            # already cached term is not retrieved again, parents are not needed
+            retrieved = sorted(call[0][0] for call in get_ontology.call_args_list)
+            self.assertListEqual(retrieved, ['LBO_0000010', 'PATO_0000383'])
+            # the ancestors are retrieved once per child, failures are left to be reported by validation
+            get_ancestors.assert_called_once_with('LBO_0000010')
+
+        self.assertRaises(TypeError, cache.prefetch, [], [], '8')
+
+    def test_ontology_cache_ancestors(self):
+        detail = {
+            'iri': 'http://purl.obolibrary.org/obo/LBO_0000010',
+            'short_form': 'LBO_0000010',
+            'ontology_name': 'lbo',
+            'is_defining_ontology': True
+        }
+        pages = [
+            {'_embedded': {'terms': [{'short_form': 'LBO_0000001'}, {'short_form': 'LBO_0000000'}]},
+             '_links': {'next': {'href': 'https://www.ebi.ac.uk/ols/api/next'}}},
+            {'_embedded': {'terms': [{'short_form': 'BFO_0000001'}]}, '_links': {}}
+        ]
+        cache = use_ontology.OntologyCache()
+        cache.add_ontology(use_ontology.Ontology.from_detail('LBO_0000010', detail))
+        cache.add_ontology(use_ontology.Ontology.from_detail('LBO_0000011', None))
+        with mock.patch.object(use_ontology.http_client, 'get') as get:
+            get.return_value.json.side_effect = pages
+            self.assertTrue(cache.has_parent('LBO_0000010', 'LBO_0000001'))
+            self.assertTrue(cache.has_parent('LBO_0000010', 'http://purl.obolibrary.org/obo/BFO_0000001'))
+            self.assertFalse(cache.has_parent('LBO_0000010', 'LBO_0000012'))
+            self.assertSetEqual(set(cache.get_ancestors('LBO_0000010')), {'LBO_0000001', 'LBO_0000000', 'BFO_0000001'})
+            # a term not found has no ancestors
+            self.assertFalse(cache.has_parent('LBO_0000011', 'LBO_0000000'))
+            self.assertEqual(get.call_count, 2)
+            self.assertEqual(get.call_args_list[0][0][0], 'https://www.ebi.ac.uk/ols/api/ontologies/lbo/terms/'
+                                                          'http%253A%252F%252Fpurl.obolibrary.org%252Fobo%252F'
+                                                          'LBO_0000010/ancestors')
+            self.assertEqual(get.call_args_list[1][0][0], 'https://www.ebi.ac.uk/ols/api/next')
+        self.assertRaises(TypeError, cache.get_ancestors, 12)
+
+    def test_ontology_cache_memory(self):
+        cache = use_ontology.OntologyCache(memory_size=2)
+        another = use_ontology.OntologyCache()
+        for short_term in ['PATO_0000383', 'PATO_0000384', 'PATO_0002365']:
+            cache.add_ontology(use_ontology.Ontology.from_detail(short_term, {'iri': short_term}))
+            cache.ancestors[short_term] = frozenset(['PATO_0000001'])
+        # the least recently used term is dropped
+        self.assertFalse(cache.contains('PATO_0000383'))
+        self.assertTrue(cache.contains('PATO_0002365'))
+        self.assertEqual(len(cache.ancestors), 2)
+        # nothing shared between instances
+        self.assertEqual(len(another.ancestors), 0)
+        self.assertFalse(another.contains('PATO_0002365'))
+        cache.get_ontology('PATO_0002365')
+        self.assertDictEqual(cache.get_stats(), {
+            'ontology_terms': {'hits': 1, 'misses': 0, 'size': 2},
+            'ontology_ancestors': {'hits': 0, 'misses': 0, 'size': 2}
+        })
+
+    def test_ontology_cache_pickle(self):
+        cache = use_ontology.OntologyCache()
+        cache.add_ontology(use_ontology.Ontology.from_detail('PATO_0002365', {'iri': 'PATO_0002365'}))
+        cache.ancestors['PATO_0002365'] = frozenset(['PATO_0000383'])
+        copied = pickle.loads(pickle.dumps(cache))
+        self.assertTrue(copied.contains('PATO_0002365'))
+        # the ancestors are shipped with the cache
+        self.assertTrue(copied.has_parent('PATO_0002365', 'PATO_0000383'))
+        self.assertRaises(ValueError, cache.prefetch, [], [], 0)
+
 
 if __name__ == '__main__':
     unittest.main()
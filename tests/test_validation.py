@@ -1,10 +1,15 @@
 import unittest
 import json
+import os
+import shutil
+import tempfile
 from typing import List, Dict
+from unittest import mock
 
 from image_validation import validation
 from image_validation import static_parameters
 from image_validation import ValidationResult
+from image_validation import Ruleset, ontology_index, use_ontology
 
 
 class TestValidation(unittest.TestCase):
@@ -22,6 +27,33 @@ class TestValidation(unittest.TestCase):
     def test_read_in_ruleset(self):
         pass
 
+    def test_ruleset_snapshot(self):
+        snapshot_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, snapshot_dir)
+        # offline, the terms are not needed to check snapshots
+        offline_library = use_ontology.OntologyCache(index=ontology_index.OntologyIndex())
+        patcher = mock.patch.object(static_parameters, 'ontology_library', offline_library)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        filename = "test_data/test_ruleset.json"
+        self.assertIsNone(validation.load_ruleset_snapshot(filename, snapshot_dir))
+        self.assertRaises(TypeError, validation.load_ruleset_snapshot, 12, snapshot_dir)
+        self.assertRaises(TypeError, validation.save_ruleset_snapshot, 'ruleset', filename, snapshot_dir)
+
+        ruleset = validation.read_in_ruleset(filename)
+        validation.save_ruleset_snapshot(ruleset, filename, snapshot_dir)
+        self.assertEqual(os.listdir(snapshot_dir),
+                         [os.path.basename(validation.get_ruleset_snapshot_filename(filename, snapshot_dir))])
+        loaded = validation.load_ruleset_snapshot(filename, snapshot_dir)
+        self.assertEqual(json.dumps(ruleset.to_json()), json.dumps(loaded.to_json()))
+        # snapshots of other ruleset files are not used
+        self.assertIsNone(validation.load_ruleset_snapshot("test_data/test_error_ruleset.json", snapshot_dir))
+
+        # a corrupted snapshot is ignored
+        with open(validation.get_ruleset_snapshot_filename(filename, snapshot_dir), 'wb') as outfile:
+            outfile.write(b"not a pickle")
+        self.assertIsNone(validation.load_ruleset_snapshot(filename, snapshot_dir))
+
     def test_check_ruleset_type(self):
         self.assertRaises(TypeError, validation.check_ruleset, 'ruleset')
         self.assertRaises(TypeError, validation.check_ruleset, 12)
@@ -381,6 +413,52 @@ class TestValidation(unittest.TestCase):
             existing_results = validation.context_validation(record, existing_results, related)
             self.assertListEqual(existing_results.get_messages(), expected_results[i])
 
+    def test_collect_remote_lookups(self):
+        index = ontology_index.OntologyIndex()
+        index.load("test_data/ontology/test_pato.obo")
+        index.load("test_data/ontology/test_lbo.json")
+        with mock.patch.object(static_parameters, 'ontology_library', use_ontology.OntologyCache(index=index)):
+            sex = Ruleset.RuleField("Sex", "ontology_id", "mandatory")
+            sex.set_allowed_terms([{'term': 'PATO_0000384'}, {'term': 'PATO_0000383'}])
+            breed = Ruleset.RuleField("Mapped breed", "ontology_id", "recommended")
+            breed.set_allowed_terms([{'term': 'LBO_0000000', 'allow_descendants': 1, 'include_root': 0}])
+            section = Ruleset.RuleSection("organism")
+            section.add_rule(sex)
+            section.add_rule(breed)
+            ruleset = Ruleset.RuleSet()
+            ruleset.add_rule_section(section)
+
+        records = [
+            {
+                'alias': 'animal_1',
+                'attributes': {
+                    'Sex': [{'value': 'male', 'terms': [{'url': 'http://purl.obolibrary.org/obo/PATO_0000384'}]}],
+                    'Mapped breed': [{'value': 'Angus',
+                                      'terms': [{'url': 'http://purl.obolibrary.org/obo/LBO_0000010'}]}]
+                }
+            },
+            {
+                'alias': 'animal_2',
+                'attributes': {
+                    'Mapped breed': [{'value': 'Bentheim Black Pied',
+                                      'terms': [{'url': 'http://purl.obolibrary.org/obo/LBO_0000347'}]}],
+                    # given as a short term rather than an iri, left to the validation and not retrieved
+                    'Organism part': [{'value': 'hair', 'terms': [{'url': 'UBERON_0001037'}]}],
+                    # invalid values are left to the validation
+                    'Species': [{'value': 'pig', 'terms': [{'url': 'not a url'}, 'not a dict']}]
+                }
+            }
+        ]
+        records[1]['sampleRelationships'] = [{'accession': 'SAMEA1', 'relationshipNature': 'child of'},
+                                             {'alias': 'animal_1', 'relationshipNature': 'child of'}]
+        # the records are read only once, e.g. from a streamed file
+        terms, pairs, accessions = validation.collect_remote_lookups(iter(records), ruleset)
+        self.assertSetEqual(terms, {'PATO_0000384', 'PATO_0000383', 'LBO_0000010', 'LBO_0000347',
+                                    'LBO_0000000'})
+        self.assertSetEqual(pairs, {('LBO_0000010', 'LBO_0000000'), ('LBO_0000347', 'LBO_0000000')})
+        self.assertSetEqual(accessions, {'SAMEA1'})
+        self.assertTupleEqual(validation.collect_remote_lookups([], ruleset), (set(), set(), set()))
+
     def test_image_animal(self):
         # get image test file
         filename = "test_data/image_animal.json"